@@ -0,0 +1,1289 @@
+# Benchmarks for the PPEC Inventory System, run from the "Code" directory, for example "python benchmarks.py index-validation"
+# Each benchmark prints a table of timings so that changes to the program can be compared with the original code
+import argparse
+import datetime
+import importlib.util
+import json
+import subprocess
+import threading
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The benchmarks use the headless inventory engine, only the "suite" benchmark needs the menu
+import inventory_core
+
+
+# The menu file name has a "-" in it so it cannot be imported normally, instead it is loaded from its path
+def load_inventory_menu():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory-system.py")
+    spec = importlib.util.spec_from_file_location("inventory_system", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["inventory_system"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# This function runs a piece of code several times and returns the fastest time in seconds
+def best_time(function, repeats):
+    best = None
+    for x in range(0, repeats):
+        start = time.perf_counter()
+        function()
+        taken = time.perf_counter() - start
+        if best is None or taken < best:
+            best = taken
+    return best
+
+
+# This function generates the contents of a BatchIndex.json file with the given amount of batch numbers
+# Batch numbers are made the same way as "new_batch_number" makes them, up to 9999 batches per day
+def generate_batch_index(amount):
+    batch_numbers = []
+    for x in range(0, amount):
+        day = datetime.date(2020, 1, 1) + datetime.timedelta(days=x // 9999)
+        batch_numbers.append(day.strftime('%Y%m%d') + str(x % 9999 + 1).zfill(4))
+    return json.dumps(batch_numbers)
+
+
+# Compares the original character by character check of BatchIndex.json with the parse once check
+def benchmark_index_validation(inventory, sizes, repeats):
+    print("%12s %16s %16s %10s" % ("Batches", "Characters (s)", "Parsed (s)", "Speedup"))
+    for amount in sizes:
+        read_json_file = generate_batch_index(amount)
+
+        # Both checks must agree that the generated index is valid
+        assert inventory.count_batch_index_errors(read_json_file) == 0
+        assert inventory.parse_batch_index(read_json_file) is not None
+
+        characters_time = best_time(lambda: (inventory.count_batch_index_errors(read_json_file),
+                                             json.loads(read_json_file)), repeats)
+        parsed_time = best_time(lambda: inventory.parse_batch_index(read_json_file), repeats)
+        print("%12d %16.5f %16.5f %9.1fx" % (amount, characters_time, parsed_time, characters_time / parsed_time))
+
+
+# Times adding batch numbers to indexes of different sizes, the time per batch should not grow with the size of the index
+def benchmark_index_append(inventory, sizes, appends):
+    print("%12s %22s" % ("Batches", "Per new batch (ms)"))
+    for amount in sizes:
+        with tempfile.TemporaryDirectory() as data_directory:
+            os.environ["INVENTORY_DATA_DIR"] = data_directory
+            with open(os.path.join(data_directory, "BatchIndex.json"), 'w') as outfile:
+                outfile.write(generate_batch_index(amount))
+            # The first call starts BatchIndex.log from the existing BatchIndex.json
+            inventory.get_batch_index()
+
+            start = time.perf_counter()
+            for x in range(0, appends):
+                inventory.save_index(inventory.new_batch_number("20991231"))
+            taken = time.perf_counter() - start
+        print("%12d %22.4f" % (amount, taken / appends * 1000))
+
+
+# This function adds up the size of every record file in a "Data" directory, the index files are left out
+def record_bytes(data_directory):
+    total = 0
+    for name in os.listdir(data_directory):
+        if name.endswith(".pck"):
+            total = total + os.path.getsize(os.path.join(data_directory, name))
+    return total
+
+
+# Times creating one batch with each storage backend and measures the files and bytes it writes
+def benchmark_batch_create(inventory, amounts, backends):
+    print("%10s %10s %12s %8s %14s" % ("Backend", "Components", "Time (ms)", "Files", "Record bytes"))
+    for backend in backends:
+        for amount in amounts:
+            with tempfile.TemporaryDirectory() as data_directory:
+                os.environ["INVENTORY_DATA_DIR"] = data_directory
+                os.environ["INVENTORY_STORAGE"] = backend
+                summary = inventory.create_batches([{"amount": amount, "component_type": "Rudder Pivot Pin",
+                                                     "size": "10mm diameter x 75mm length"}])
+                files = len([name for name in os.listdir(data_directory) if name.endswith(".pck")])
+                print("%10s %10d %12.2f %8d %14d" % (backend, amount, summary["seconds"] * 1000, files,
+                                                     record_bytes(data_directory)))
+
+
+# This function makes the finish of each component in a batch, most are unfinished and the rest are polished or painted
+# The paint codes are taken from a palette of the given size, the paint shop only uses a handful of colours at a time
+def generate_finishes(amount, palette_size, seed=1):
+    generator = random.Random(seed)
+    palette = []
+    for x in range(0, palette_size):
+        palette.append("Paint:" + chr(65 + x // 26 % 26) + chr(65 + x % 26) + str(x % 100).zfill(2))
+    finishes = []
+    for x in range(0, amount):
+        choice = generator.random()
+        if choice < 0.6:
+            finishes.append("Unfinished")
+        elif choice < 0.8:
+            finishes.append("Polished")
+        else:
+            finishes.append(generator.choice(palette))
+    return finishes
+
+
+# This function returns how many bytes of memory were used while running a piece of code, and what it returned
+def traced_memory(function):
+    tracemalloc.start()
+    result = function()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, result
+
+
+# Compares the memory and pickled size of the batch status as a list of strings and as a StatusColumn
+def benchmark_status_memory(inventory, amounts, palette_size):
+    print("%10s %14s %16s %14s %16s" % ("Components", "List (bytes)", "Column (bytes)", "List pickle", "Column pickle"))
+    for amount in amounts:
+        finishes = generate_finishes(amount, palette_size)
+
+        # The list is built the way the original add_component built it, with a new string for each component
+        def build_list():
+            return ["Manufactured" + "-" + finish for finish in finishes]
+
+        def build_column():
+            column = inventory.StatusColumn()
+            for finish in finishes:
+                column.append("Manufactured" + "-" + finish)
+            return column
+
+        list_bytes, status_list = traced_memory(build_list)
+        column_bytes, status_column = traced_memory(build_column)
+        assert list(status_column) == status_list
+        print("%10d %14d %16d %14d %16d" % (amount, list_bytes, column_bytes, len(pickle.dumps(status_list)),
+                                            len(pickle.dumps(status_column))))
+
+
+# These functions build the list of all batches and the search results the way the original program did
+# Lists and strings are made longer by joining them to a new item, which copies everything already in them each time
+def legacy_batch_list_report(batch_list):
+    batches = []
+    types = []
+    sizes = []
+    quantities = []
+    locations = []
+    for batch_data in batch_list:
+        batches = batches + [batch_data.batch_number]
+        types = types + [batch_data.component_type]
+        sizes = sizes + [batch_data.size]
+        quantities = quantities + [str(batch_data.amount_components)]
+        locations = locations + [batch_data.location]
+
+    message = "Batch Number" + "\t" + "\t" + "Component Type" + "\t" + "\t" + " "*3 + "Size/Fitment" + "\t" + "\t" + " "*3 + "Location" + "\t" + "\t" + "Quantity"
+    table_format = "-"*12 + "\t" + "\t" + "-"*14 + "\t" + "\t" + " "*3 + "-"*12 + "\t" + "\t" + " "*3 + "-"*8 + "\t" + "\t" + "-"*8
+    message = message + "\n" + table_format
+    for x in range(0, len(batches)):
+        if sizes[x] == "10mm diameter x 75mm length":
+            sizes[x] = "10mm//75mm"
+        elif sizes[x] == "12mm diameter x 100mm length":
+            sizes[x] = "12mm//100mm"
+        elif sizes[x] == "16mm diameter x 150mm length":
+            sizes[x] = "16mm//150mm"
+        elif sizes[x] == "":
+            sizes[x] = "N/A"
+        if types[x] == "Winglet Attachment Strut":
+            types[x] = "Winglet Strut"
+        elif types[x] == "Door Seal Clamp Handle":
+            types[x] = "Door Handle"
+        elif types[x] == "Rudder Pivot Pin":
+            types[x] = "Rudder Pin"
+        if locations[x] == "Factory Floor - Warehouse Not Allocated":
+            locations[x] = "-"
+        new_message = batches[x] + "\t" + "\t" + types[x] + "\t" + "\t" + " "*3 + sizes[x] + "\t" + "\t" + " "*4 + locations[x] + "\t" + "\t" + quantities[x]
+        message = message + "\n" + new_message
+    return message
+
+
+def legacy_product_report(matching_components):
+    serials = []
+    dates_formatted = []
+    finishes = []
+    locations = []
+    for serial, manufacture_date, location, finish in matching_components:
+        if finish == "Unfinished":
+            serials = serials + [serial]
+            dates_formatted = dates_formatted + [manufacture_date[0:4] + "-" + manufacture_date[4:6] + "-" + manufacture_date[6:8]]
+            finishes = finishes + [finish]
+            locations = locations + [location]
+
+    message = "Unfinished Products" + "\n" + "-"*19 + "\n" + "\n" + 'The following "' + "A380 Series" + '" ' + \
+              "Winglet Attachment Strut" + "(s), are currently available in stock:" + "\n" + "\n" + "\n" + \
+              "Component Serial#" + "\t" + "\t" + "\t" + "Location" + "\t" + "\t" + "Finish" + "\t" \
+              + "\t" + "Date"
+    table_format = "-" * 17 + "\t" + "\t" + "\t" + "-" * 8 + "\t" + "\t" + "-" * 6 + "\t" + "\t" + "-" * 4
+    message = message + "\n" + table_format
+    for x in range(0, len(serials)):
+        if locations[x] == "Factory Floor - Warehouse Not Allocated":
+            locations[x] = "Unallocated"
+        new_message = serials[x] + "\t" + "\t" + "\t" + locations[x] + "\t" + "\t" + finishes[x] + "\t" + "\t" + dates_formatted[x]
+        message = message + "\n" + new_message
+    return message
+
+
+# This function makes batches in memory for the list of all batches benchmark, they are never saved
+def generate_batches(inventory, amount):
+    batches = []
+    locations = ["Factory Floor - Warehouse Not Allocated", "Paisley", "Dubai"]
+    for x in range(0, amount):
+        batch_number = "20200101" + str(x % 9999 + 1).zfill(4)
+        batch = inventory.Batch(batch_number, 100, inventory.SerialNumberRange(batch_number, 100), locations[x % 3])
+        batch.manufacture_date = "20200101"
+        batch.component_type = "Rudder Pivot Pin"
+        batch.size = "12mm diameter x 100mm length"
+        batches.append(batch)
+    return batches
+
+
+# This function makes the rows that "search_product_index" returns for the search results benchmark
+def generate_product_rows(amount):
+    rows = []
+    for x in range(0, amount):
+        rows.append(["2020010100" + str(x // 9999 % 100).zfill(2) + "-" + str(x % 9999 + 1).zfill(4), "20200101",
+                     "Paisley", "Unfinished"])
+    return rows
+
+
+# Compares building the list of all batches and the search results the original way and with the report generators
+# For small reports the two take about the same time, as the reports grow the original way slows down much faster
+def benchmark_report_build(inventory, sizes, repeats):
+    print("%10s %10s %16s %16s %10s" % ("Report", "Rows", "Original (s)", "Generators (s)", "Speedup"))
+    for amount in sizes:
+        batches = generate_batches(inventory, amount)
+        assert legacy_batch_list_report(batches) == inventory.batch_list_report(batches)
+        original_time = best_time(lambda: legacy_batch_list_report(batches), repeats)
+        generator_time = best_time(lambda: inventory.batch_list_report(batches), repeats)
+        print("%10s %10d %16.5f %16.5f %9.1fx" % ("batches", amount, original_time, generator_time,
+                                                  original_time / generator_time))
+
+    for amount in sizes:
+        rows = generate_product_rows(amount)
+        new_report = lambda: inventory.product_report(rows, "Winglet Attachment Strut", "A380 Series", False)
+        assert legacy_product_report(rows) == new_report()
+        original_time = best_time(lambda: legacy_product_report(rows), repeats)
+        generator_time = best_time(new_report, repeats)
+        print("%10s %10d %16.5f %16.5f %9.1fx" % ("search", amount, original_time, generator_time,
+                                                  original_time / generator_time))
+
+
+# This function fills the Inventory.db database of the "sqlite" storage backend with batches of 9999 components
+# Batches are numbered from 1 on each day from 1 January 2020, the same way "new_batch_number" numbers them
+def fill_sqlite_store(inventory, store, components):
+    x = 0
+    while components > 0:
+        amount = min(components, 9999)
+        day = datetime.date(2020, 1, 1) + datetime.timedelta(days=x // 9999)
+        batch_number = day.strftime('%Y%m%d') + str(x % 9999 + 1).zfill(4)
+        batch = inventory.build_lazy_batch(batch_number, day.strftime('%Y%m%d'), amount, "Rudder Pivot Pin",
+                                           "10mm diameter x 75mm length", "Paisley")
+        store.create_batch_records(batch, [])
+        components = components - amount
+        x = x + 1
+    return store.batch_numbers()
+
+
+# Times the point queries of the "sqlite" storage backend as the amount of components in the database grows
+# Each query is run for random components and the average time is shown, loading a whole batch of 9999 components is shown for comparison
+def benchmark_sqlite_query(inventory, sizes, queries):
+    print("%12s %10s %16s %16s %16s %16s %12s" % ("Components", "Fill (s)", "Component (ms)", "Finish (ms)",
+                                                   "Batch no. (ms)", "Load batch (ms)", "Size (MB)"))
+    generator = random.Random(1)
+    for components in sizes:
+        with tempfile.TemporaryDirectory() as data_directory:
+            data_directory = data_directory + os.sep
+            store = inventory.SqliteStore(data_directory)
+            start = time.perf_counter()
+            batch_numbers = fill_sqlite_store(inventory, store, components)
+            fill_time = time.perf_counter() - start
+
+            serial_numbers = []
+            for x in range(0, queries):
+                position = generator.randrange(0, components)
+                serial_numbers.append(batch_numbers[position // 9999] + "-" + str(position % 9999 + 1).zfill(4))
+
+            start = time.perf_counter()
+            found = [store.load_component(serial_number) for serial_number in serial_numbers]
+            component_time = (time.perf_counter() - start) / queries
+            assert None not in found
+
+            start = time.perf_counter()
+            for component in found:
+                component.finish = "Polished"
+                store.save_component(component, None)
+            finish_time = (time.perf_counter() - start) / queries
+
+            start = time.perf_counter()
+            for x in range(0, queries):
+                store.new_batch_number("20991231")
+            batch_number_time = (time.perf_counter() - start) / queries
+
+            load_batch_time = best_time(lambda: store.load_batch(batch_numbers[0]), 5)
+            store.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size = os.path.getsize(data_directory + "Inventory.db") / 1000000
+            inventory.close_sqlite_connection(data_directory)
+        print("%12d %10.1f %16.4f %16.4f %16.4f %16.2f %12.1f" % (components, fill_time, component_time * 1000,
+                                                                 finish_time * 1000, batch_number_time * 1000,
+                                                                 load_batch_time * 1000, size))
+
+
+# Each station is a separate process with its own copy of the program, the same as a terminal running the menu
+# "fsync_latency" milliseconds are added to every fsync the station makes, to imitate a slower disk than the one the benchmark runs on
+def start_station(data_directory, backend, fsync_latency=0.0):
+    os.environ["INVENTORY_DATA_DIR"] = data_directory
+    os.environ["INVENTORY_STORAGE"] = backend
+    if fsync_latency > 0:
+        fsync = os.fsync
+
+        def slow_fsync(file_number):
+            time.sleep(fsync_latency / 1000.0)
+            fsync(file_number)
+        os.fsync = slow_fsync
+
+
+def station_create_batches(amount):
+    for x in range(0, amount):
+        inventory_core.create_batches([{"amount": 10, "component_type": "Door Seal Clamp Handle", "size": ""}])
+
+
+def station_finish_components(serial_numbers):
+    store = inventory_core.get_store()
+    for serial_number in serial_numbers:
+        assert store.finish_component(serial_number, "Polished") == "Unfinished"
+
+
+# Runs the same work on several stations at once against one "Data" directory and checks nothing was lost
+# Every batch created must get its own batch number, and every component finished must keep its finish
+# Finishing is timed with each station working on its own batch and with every station working on the same batch
+def benchmark_stations(inventory, station_counts, backends, operations, fsync_latency):
+    print("%10s %9s %16s %20s %20s" % ("Backend", "Stations", "Create (/s)", "Finish own (/s)", "Finish shared (/s)"))
+    for backend in backends:
+        for stations in station_counts:
+            with tempfile.TemporaryDirectory() as data_directory:
+                data_directory = data_directory + os.sep
+                with multiprocessing.Pool(stations, start_station, (data_directory, backend, fsync_latency)) as pool:
+                    start = time.perf_counter()
+                    pool.map(station_create_batches, [operations] * stations)
+                    create_rate = stations * operations / (time.perf_counter() - start)
+
+                    os.environ["INVENTORY_DATA_DIR"] = data_directory
+                    os.environ["INVENTORY_STORAGE"] = backend
+                    batch_numbers = inventory.get_store().batch_numbers()
+                    assert len(batch_numbers) == len(set(batch_numbers)) == stations * operations
+
+                    # Each station finishes the components of its own batches, then every station finishes components of one shared batch
+                    own_work = []
+                    for x in range(0, stations):
+                        own_work.append([batch_number + "-" + str(y).zfill(4) for batch_number in
+                                         batch_numbers[x * operations:(x + 1) * operations] for y in range(1, 3)])
+                    start = time.perf_counter()
+                    pool.map(station_finish_components, own_work)
+                    own_rate = sum(len(work) for work in own_work) / (time.perf_counter() - start)
+
+                    shared = inventory.create_batches([{"amount": 9999, "component_type": "Door Seal Clamp Handle",
+                                                        "size": ""}])["batch_numbers"][0]
+                    shared_work = []
+                    for x in range(0, stations):
+                        shared_work.append([shared + "-" + str(y).zfill(4) for y in range(x + 1, operations * 2 + 1, stations)])
+                    start = time.perf_counter()
+                    pool.map(station_finish_components, shared_work)
+                    shared_rate = sum(len(work) for work in shared_work) / (time.perf_counter() - start)
+
+                store = inventory.get_store()
+                for work in own_work + shared_work:
+                    for serial_number in work:
+                        assert store.load_component(serial_number).finish == "Polished"
+                inventory.close_sqlite_connection(data_directory)
+            print("%10s %9d %16.1f %20.1f %20.1f" % (backend, stations, create_rate, own_rate, shared_rate))
+
+
+# This function starts an inventory server for a "Data" directory as a separate program and returns it with its address
+def start_server(data_directory, backend):
+    environment = dict(os.environ, INVENTORY_DATA_DIR=data_directory, INVENTORY_STORAGE=backend)
+    environment.pop("INVENTORY_SERVER", None)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory-system.py")
+    server = subprocess.Popen([sys.executable, path, "serve", "--port", "0"], env=environment, stdout=subprocess.PIPE,
+                              universal_newlines=True)
+    address = server.stdout.readline().strip().split(" on ")[-1]
+    return server, address
+
+
+# Runs the "create-batches" and "finish" tools as a station using the inventory server would, with INVENTORY_SERVER set
+# Both have to work through the server, which owns the "Data" directory, and the batch and finish they make must be seen by the server
+def check_server_tools(inventory, address):
+    environment = dict(os.environ, INVENTORY_SERVER=address)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as specs_file:
+        specs_file.write("amount,component_type,size\n4,Door Seal Clamp Handle,\n")
+    try:
+        created = subprocess.run([sys.executable, "inventory-system.py", "create-batches", specs_file.name], cwd=directory,
+                                 env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    finally:
+        os.remove(specs_file.name)
+    assert created.returncode == 0, created.stdout
+    batch_number = created.stdout.split()[0]
+    finished = subprocess.run([sys.executable, "inventory-system.py", "finish", "Polished", batch_number + "-0001..0004"],
+                              cwd=directory, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+    assert finished.returncode == 0, finished.stdout
+    batch = inventory.RemoteStore(address).load_batch(batch_number)
+    assert batch is not None and list(batch.batch_status) == ["Manufactured-Polished"] * 4, batch
+
+
+# Compares each terminal reading the "Data" directory itself with asking the inventory server, for one component, one batch and a search
+# "Cold" is a terminal that has to read the files again for each operation, "warm" keeps what it has read in memory like the server does
+# The last column is how many component lookups the server answers each second with several stations asking at once
+def benchmark_server(inventory, batches, backend, repeats, stations):
+    print("%22s %12s %12s %12s" % ("Operation (ms)", "Cold", "Warm", "Server"))
+    with tempfile.TemporaryDirectory() as data_directory:
+        data_directory = data_directory + os.sep
+        os.environ["INVENTORY_DATA_DIR"] = data_directory
+        os.environ["INVENTORY_STORAGE"] = backend
+        os.environ.pop("INVENTORY_SERVER", None)
+        batch_numbers = inventory.create_batches([{"amount": 100, "component_type": "Rudder Pivot Pin",
+                                                   "size": "10mm diameter x 75mm length"}] * batches)["batch_numbers"]
+        serial_number = batch_numbers[len(batch_numbers) // 2] + "-0050"
+
+        server, address = start_server(data_directory, backend)
+        try:
+            check_server_tools(inventory, address)
+            local = inventory.get_store()
+            remote = inventory.RemoteStore(address)
+            operations = [("view component", lambda store: store.load_component(serial_number)),
+                          ("view batch", lambda store: store.load_batch(batch_numbers[0])),
+                          ("search", lambda store: store.search_product("Rudder Pivot Pin", "10mm diameter x 75mm length"))]
+            for name, operation in operations:
+                def cold():
+                    inventory.batch_cache.clear()
+                    inventory.clear_index_files()
+                    inventory.batch_index_cache.clear()
+                    operation(local)
+                cold_time = best_time(cold, repeats)
+                warm_time = best_time(lambda: operation(local), repeats)
+                remote_time = best_time(lambda: operation(remote), repeats)
+                print("%22s %12.3f %12.3f %12.3f" % (name, cold_time * 1000, warm_time * 1000, remote_time * 1000))
+
+            for count in stations:
+                def station():
+                    for x in range(0, 100):
+                        assert remote.load_component(serial_number) is not None
+                threads = [threading.Thread(target=station) for x in range(0, count)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                print("%22s %12d %25.1f" % ("stations, lookups/s", count, count * 100 / (time.perf_counter() - start)))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+# A copy of the original Component class, which kept its attributes in a dictionary for each component and did not intern them
+class LegacyComponent:
+    def __init__(self, manufacture_date, component_type, serial, size, status, finish):
+        self.manufacture_date = manufacture_date
+        self.component_type = component_type
+        self.serial = serial
+        self.size = size
+        self.status = status
+        self.finish = finish
+
+
+# Compares the memory used by a working set of components with the original Component class and the slotted, interned one
+# Each component gets its own copy of each string, as it would when every component record is loaded from its own file
+def benchmark_model_memory(inventory, sizes):
+    print("%12s %22s %22s %16s" % ("Components", "Original (bytes/comp)", "Slotted (bytes/comp)", "10M slotted (GB)"))
+    values = ["20261018", "Rudder Pivot Pin", "10mm diameter x 75mm length", "Manufactured", "Unfinished"]
+    for amount in sizes:
+        results = []
+        for component_class in [LegacyComponent, inventory.Component]:
+            def build():
+                components = []
+                for x in range(0, amount):
+                    # Slicing and adding back a character makes a new copy of the string
+                    copies = [value[:-1] + value[-1] for value in values]
+                    serial = "20261018" + str(x // 9999 + 1).zfill(4) + "-" + str(x % 9999 + 1).zfill(4)
+                    components.append(component_class(copies[0], copies[1], serial, copies[2], copies[3], copies[4]))
+                return components
+            used, components = traced_memory(build)
+            results.append(used / float(amount))
+            del components
+        print("%12d %22.1f %22.1f %16.2f" % (amount, results[0], results[1], results[1] * 10000000 / 1024 ** 3))
+
+
+# This function makes the records for an amount of components, saved either as one record per component or as batches of 1000 components
+# Batches of the "batchfile" backend keep their components inside the batch record, the others only keep the batch status
+def generate_records(inventory, amount, kind):
+    records = []
+    for first in range(0, amount, 1000):
+        batch_number = "20200101" + str(first // 1000 + 1).zfill(4)
+        size = min(1000, amount - first)
+        batch, components = inventory.build_batch(batch_number, batch_number[0:8], size, "Rudder Pivot Pin",
+                                                  "10mm diameter x 75mm length", "Paisley")
+        for x in range(0, size, 7):
+            components[x].finish = "Paint:AB12"
+            batch.batch_status[x] = "Manufactured-Paint:AB12"
+        if kind == "component":
+            records.extend(components)
+        elif kind == "batchfile":
+            batch.components = components
+            records.append(batch)
+        elif kind == "lazy":
+            records.append(inventory.make_lazy_batch(batch))
+        else:
+            records.append(batch)
+    return records
+
+
+# Compares saving and loading records in the "pickle" and "json" record formats, in components saved or loaded each second
+# Only turning the records into bytes and back is timed, so the speed of the disk does not hide the difference between the formats
+def benchmark_record_format(inventory, sizes, kinds):
+    print("%10s %10s %8s %16s %16s %12s" % ("Records", "Components", "Format", "Save (comp/s)", "Load (comp/s)",
+                                            "Bytes/comp"))
+    for kind in kinds:
+        for amount in sizes:
+            records = generate_records(inventory, amount, kind)
+            for record_format, encode in [("pickle", pickle.dumps), ("json", inventory.encode_record)]:
+                start = time.perf_counter()
+                saved = [encode(record) for record in records]
+                save_time = time.perf_counter() - start
+                start = time.perf_counter()
+                loaded = [inventory.decode_record(data) for data in saved]
+                load_time = time.perf_counter() - start
+                # The loaded records must hold the same statuses as the ones that were saved
+                if kind == "component":
+                    assert [record.finish for record in loaded] == [record.finish for record in records]
+                else:
+                    assert [list(record.batch_status) for record in loaded] == [list(record.batch_status) for record in records]
+                print("%10s %10d %8s %16.0f %16.0f %12.1f" % (kind, amount, record_format, amount / save_time, amount / load_time,
+                                                              sum(len(data) for data in saved) / float(amount)))
+                del saved, loaded
+
+
+# Compares recovering a lost BatchIndex.json from BatchIndex.checkpoint and BatchIndex.log with rebuilding it from every file
+# The records are empty files with the names the "pickle" backend uses, one per batch and one per component, as only the names are listed
+def benchmark_index_restore(inventory, sizes, components, repeats):
+    print("%10s %10s %18s %16s %14s" % ("Batches", "Files", "Checkpoint (ms)", "Full scan (ms)", "Files looked at"))
+    for amount in sizes:
+        with tempfile.TemporaryDirectory() as data_directory:
+            data_directory = data_directory + os.sep
+            os.environ["INVENTORY_DATA_DIR"] = data_directory
+            batch_numbers = json.loads(generate_batch_index(amount))
+            for batch_number in batch_numbers:
+                open(data_directory + batch_number + ".pck", "w").close()
+                for position in range(1, components + 1):
+                    open(data_directory + batch_number + "-" + str(position).zfill(4) + ".pck", "w").close()
+            assert inventory.restore_batch_index(data_directory) == batch_numbers
+            files_looked_at = inventory.last_index_scan["files"]
+
+            def recover():
+                os.remove(data_directory + "BatchIndex.json")
+                assert inventory.read_batch_index(data_directory) == batch_numbers
+
+            def full_scan():
+                os.remove(data_directory + "BatchIndex.json")
+                os.rename(data_directory + "BatchIndex.checkpoint", data_directory + "BatchIndex.saved")
+                try:
+                    assert inventory.read_batch_index(data_directory) == batch_numbers
+                finally:
+                    os.replace(data_directory + "BatchIndex.saved", data_directory + "BatchIndex.checkpoint")
+
+            checkpoint_time = best_time(recover, repeats)
+            full_time = best_time(full_scan, repeats)
+            print("%10d %10d %18.1f %16.1f %14d" % (amount, amount * (components + 1), checkpoint_time * 1000, full_time * 1000,
+                                                    files_looked_at))
+
+
+# Compares finding the batch files in the "flat" and "dated" layouts, for every day and for a single day
+# The records are empty files with the names the "pickle" backend uses, one per batch and one per component, as only the names are listed
+def benchmark_layout(inventory, days, batches, components, repeats):
+    print("%8s %10s %18s %18s %16s" % ("Layout", "Files", "Every day (ms)", "One day (ms)", "Largest dir"))
+    for layout in inventory.DATA_LAYOUTS:
+        with tempfile.TemporaryDirectory() as data_directory:
+            data_directory = data_directory + os.sep
+            os.environ["INVENTORY_LAYOUT"] = layout
+            for day in range(0, days):
+                date = (datetime.date(2020, 1, 1) + datetime.timedelta(days=day)).strftime('%Y%m%d')
+                directory = inventory.record_directory(data_directory, date, layout)
+                os.makedirs(directory, exist_ok=True)
+                for batch in range(1, batches + 1):
+                    batch_number = date + str(batch).zfill(4)
+                    open(directory + batch_number + ".pck", "w").close()
+                    for position in range(1, components + 1):
+                        open(directory + batch_number + "-" + str(position).zfill(4) + ".pck", "w").close()
+
+            middle_day = (datetime.date(2020, 1, 1) + datetime.timedelta(days=days // 2)).strftime('%Y%m%d')
+            assert len(inventory.batch_record_numbers(data_directory)) == days * batches
+            assert len(inventory.batch_record_numbers(data_directory, middle_day, middle_day)) == batches
+            every_day = best_time(lambda: inventory.batch_record_numbers(data_directory), repeats)
+            one_day = best_time(lambda: inventory.batch_record_numbers(data_directory, middle_day, middle_day), repeats)
+            largest = max(len(files) for root, directories, files in os.walk(data_directory))
+            print("%8s %10d %18.1f %18.1f %16d" % (layout, days * batches * (components + 1), every_day * 1000, one_day * 1000,
+                                                   largest))
+    os.environ.pop("INVENTORY_LAYOUT", None)
+
+
+# Compares making the whole list of all batches, as the original menu did, with making one page of it
+# The peak is the most memory that was in use at once while the message was made, the batch cache is emptied before each one
+def benchmark_batch_list(inventory, sizes, backends):
+    print("%10s %10s %14s %16s %14s %16s" % ("Backend", "Batches", "Whole (s)", "Whole peak (KB)", "Page (s)",
+                                             "Page peak (KB)"))
+    for backend in backends:
+        for amount in sizes:
+            with tempfile.TemporaryDirectory() as data_directory:
+                data_directory = data_directory + os.sep
+                os.environ["INVENTORY_DATA_DIR"] = data_directory
+                os.environ["INVENTORY_STORAGE"] = backend
+                # Only 9999 batches can be made in a day, so the batches are spread over several days of 5000
+                batch_numbers = []
+                for first in range(0, amount, 5000):
+                    day = (datetime.date(2020, 1, 1) + datetime.timedelta(days=first // 5000)).strftime('%Y%m%d')
+                    batch_numbers.extend(inventory.create_batches([{"amount": 10, "component_type": "Rudder Pivot Pin",
+                                                                    "size": "10mm diameter x 75mm length"}] *
+                                                                  min(5000, amount - first), day)["batch_numbers"])
+                store = inventory.get_store()
+
+                def whole():
+                    return inventory.batch_list_report(store.list_batches(store.batch_numbers()))
+
+                # The middle page is used so the cursor has to find its place in the index
+                def page():
+                    return inventory.batch_list_report(store.batch_page(inventory.BATCH_PAGE_SIZE, after=batch_numbers[amount // 2],
+                                                                        count_total=True)["batches"])
+
+                results = []
+                for function in [whole, page]:
+                    inventory.batch_cache.clear()
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    function()
+                    taken = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    results.extend([taken, peak / 1024.0])
+                print("%10s %10d %14.3f %16.1f %14.4f %16.1f" % (backend, amount, results[0], results[1], results[2], results[3]))
+            inventory.close_sqlite_connection(data_directory)
+
+
+# Compares loading every batch one at a time with the scan threads, for the list of all batches and for rebuilding the product index
+# A network share is imitated by waiting "latency" milliseconds each time a record file is opened, the files themselves are local
+# With "--processes" the batch files larger than "--large-bytes" are unpickled by that many processes when the product index is rebuilt
+def benchmark_scan(inventory, batches, amount, latency, workers, processes, large_bytes):
+    load_record = inventory.load_record
+
+    def slow_load_record(path):
+        time.sleep(latency / 1000.0)
+        return load_record(path)
+
+    print("%8s %18s %10s %22s %10s" % ("Workers", "List batches (s)", "Speedup", "Rebuild product (s)", "Speedup"))
+    with tempfile.TemporaryDirectory() as data_directory:
+        data_directory = data_directory + os.sep
+        os.environ["INVENTORY_DATA_DIR"] = data_directory
+        os.environ["INVENTORY_STORAGE"] = "batchfile"
+        os.environ["INVENTORY_SCAN_PROCESSES"] = str(processes)
+        inventory.LARGE_BATCH_BYTES = large_bytes
+        batch_numbers = inventory.create_batches([{"amount": amount, "component_type": "Rudder Pivot Pin",
+                                                   "size": "10mm diameter x 75mm length"}] * batches)["batch_numbers"]
+        store = inventory.get_store()
+        inventory.load_record = slow_load_record
+        try:
+            first_list = None
+            first_rebuild = None
+            expected = None
+            for count in workers:
+                os.environ["INVENTORY_SCAN_WORKERS"] = str(count)
+
+                inventory.batch_cache.clear()
+                start = time.perf_counter()
+                listed = [batch.batch_number for batch in store.list_batches(batch_numbers)]
+                list_time = time.perf_counter() - start
+                assert listed == batch_numbers
+
+                inventory.batch_cache.clear()
+                start = time.perf_counter()
+                product_index = inventory.restore_product_index(data_directory, batch_numbers)
+                rebuild_time = time.perf_counter() - start
+                # Every worker count must rebuild exactly the same product index
+                if expected is None:
+                    expected = product_index
+                assert product_index == expected
+
+                if first_list is None:
+                    first_list = list_time
+                    first_rebuild = rebuild_time
+                print("%8d %18.3f %10.1f %22.3f %10.1f" % (count, list_time, first_list / list_time, rebuild_time,
+                                                          first_rebuild / rebuild_time))
+        finally:
+            inventory.load_record = load_record
+
+
+
+# Compares creating batches with and without the write-ahead log, with one thread and with several threads at once like the inventory server
+# Every fsync is counted, including those of the checkpoints, which flush the record files of the logged batches together once the log is full
+def benchmark_write_ahead_log(inventory, batches, amount, thread_counts, backends):
+    fsync = os.fsync
+    counts = {"fsync": 0}
+
+    def counted_fsync(handle):
+        counts["fsync"] = counts["fsync"] + 1
+        return fsync(handle)
+
+    print("%10s %6s %8s %14s %16s" % ("Backend", "Log", "Threads", "Batches/s", "Fsyncs/batch"))
+    os.fsync = counted_fsync
+    try:
+        for backend in backends:
+            for logged in ["0", "1"]:
+                for threads in thread_counts:
+                    with tempfile.TemporaryDirectory() as data_directory:
+                        data_directory = data_directory + os.sep
+                        os.environ["INVENTORY_DATA_DIR"] = data_directory
+                        os.environ["INVENTORY_STORAGE"] = backend
+                        os.environ["INVENTORY_WAL"] = logged
+                        store = inventory.get_store()
+
+                        def create(count):
+                            for x in range(0, count):
+                                store.create_batch("20200101", amount, "Rudder Pivot Pin", "10mm diameter x 75mm length",
+                                                   "Factory Floor - Warehouse Not Allocated")
+
+                        counts["fsync"] = 0
+                        workers = [threading.Thread(target=create, args=(batches // threads,)) for x in range(0, threads)]
+                        start = time.perf_counter()
+                        for worker in workers:
+                            worker.start()
+                        for worker in workers:
+                            worker.join()
+                        # The batches still in the log are flushed as well, so every batch counted is on the disk either way
+                        if logged == "1":
+                            inventory.get_write_ahead_log(data_directory).checkpoint(True)
+                        taken = time.perf_counter() - start
+                        created = batches // threads * threads
+                        assert len(list(store.list_batches(store.batch_numbers()))) == created
+                        print("%10s %6s %8d %14.1f %16.2f" % (backend, "on" if logged == "1" else "off", threads,
+                                                               created / taken, counts["fsync"] / float(created)))
+    finally:
+        os.fsync = fsync
+        os.environ.pop("INVENTORY_WAL", None)
+
+
+# Times starting a new Python process for a scripted job, the fastest of several starts is taken for each
+# The command line tools and inventory_core do not import easygui, the last row is what the menu adds once it shows a dialog
+def benchmark_startup(repeats):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    commands = [["Python on its own", [sys.executable, "-c", "pass"]],
+                ["import inventory_core", [sys.executable, "-c", "import inventory_core"]],
+                ["inventory-system.py --help", [sys.executable, "inventory-system.py", "--help"]],
+                ["inventory_core and easygui", [sys.executable, "-c", "import inventory_core, easygui"]]]
+    print("%28s %12s" % ("Start", "Time (ms)"))
+    for name, command in commands:
+        taken = best_time(lambda: subprocess.run(command, cwd=directory, stdout=subprocess.DEVNULL, check=True), repeats)
+        print("%28s %12.1f" % (name, taken * 1000))
+
+
+# The menu operations timed by the "suite" benchmark, and the dialog titles they show when they have worked
+# A search that finds nothing still works, so "No stock available" is one of the titles a search can end with
+SUITE_OPERATIONS = {"create_batch": ["Batch Records"],
+                    "list_all_batches": ["List of all batches"],
+                    "search_product": ["Unfinished Products", "Finished Products", "No stock available"],
+                    "view_component_details": ["Component details"],
+                    "allocate_manufactured_stock": ["Batch allocated"],
+                    "finish_component": ["Finish Confirmed"],
+                    "view_stock_levels": ["Stock Levels", "No stock available"]}
+
+
+# create class ScriptedDialogs - answers the easygui dialogs of the menu with answers given before each operation
+# Every message box is answered with "OK", every other dialog takes the next answer, and the titles shown are kept to check the operation worked
+class ScriptedDialogs:
+    def __init__(self, inventory):
+        self.answers = []
+        self.titles = []
+        self.originals = {}
+        for name in ["msgbox", "ynbox", "choicebox", "enterbox", "integerbox", "buttonbox"]:
+            self.originals[name] = getattr(inventory, name)
+            setattr(inventory, name, self.dialog(name))
+        self.inventory = inventory
+
+    def dialog(self, name):
+        def answer(message="", title="", *arguments, **keywords):
+            self.titles.append(title)
+            if name == "msgbox":
+                return "OK"
+            if len(self.answers) == 0:
+                raise RuntimeError("No answer was given for the " + name + " titled " + repr(title))
+            return self.answers.pop(0)
+        return answer
+
+    def feed(self, answers):
+        self.answers = list(answers)
+        self.titles = []
+
+    # Checks that every answer was used and that one of the expected dialogs was shown
+    def check(self, operation):
+        if len(self.answers) > 0:
+            raise RuntimeError(operation + " did not use the answers " + repr(self.answers))
+        if not any(title in self.titles for title in SUITE_OPERATIONS[operation]):
+            raise RuntimeError(operation + " did not work, it showed " + repr(self.titles))
+
+    def restore(self):
+        for name in self.originals:
+            setattr(self.inventory, name, self.originals[name])
+
+
+# The record files opened and the directories listed while an operation runs are counted with an audit hook
+# An audit hook cannot be removed, so it is added once and only counts while "suite_counters" is switched on
+suite_counters = {"on": False, "directory": "", "files_opened": 0, "directories_listed": 0}
+
+
+def count_file_access(event, arguments):
+    if not suite_counters["on"]:
+        return
+    if event == "open" and isinstance(arguments[0], str) and arguments[0].startswith(suite_counters["directory"]):
+        suite_counters["files_opened"] = suite_counters["files_opened"] + 1
+    elif event in ["os.listdir", "os.scandir"] and str(arguments[0]).startswith(suite_counters["directory"]):
+        suite_counters["directories_listed"] = suite_counters["directories_listed"] + 1
+
+
+# This function returns how many bytes this process has read and written so far, including the reads of SQLite and of the scan threads
+# It comes from /proc/self/io so it is only available on Linux, None is returned anywhere else
+def process_io():
+    try:
+        with open("/proc/self/io") as in_file:
+            counters = {}
+            for line in in_file:
+                name, value = line.split(":")
+                counters[name] = int(value)
+        return counters["rchar"], counters["wchar"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# This function writes a record straight to its file, in the same format and place as "save_record" would
+# The synthetic inventory is not fsynced, so that making a large one does not take longer than the benchmark itself
+def write_synthetic_record(inventory, store, record, name):
+    path = store.record_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if inventory.get_record_format() == "json":
+        data = inventory.encode_record(record)
+    else:
+        data = pickle.dumps(record)
+    with open(path, "wb") as out_file:
+        out_file.write(data)
+
+
+# This function fills the "Data" directory with a synthetic inventory made from the real Batch and Component classes
+# The component type, size, finishes and location of each batch are picked with a seeded random generator, so the same seed makes the same inventory
+# Batches are spread over days of "per_day" batches from 1st January 2020, the record files are written the way the chosen backend keeps them
+# and the batch, serial and product indexes are built once at the end instead of being rewritten for every batch
+# The batch numbers still in the factory and the serial numbers still unfinished are returned for the operations that change them
+def generate_inventory(inventory, batches, components, seed, finished, allocated, per_day, palette_size):
+    generator = random.Random(seed)
+    store = inventory.get_store()
+    data_directory = inventory.get_data_directory()
+    backend = inventory.get_storage_backend()
+    palette = []
+    for x in range(0, palette_size):
+        palette.append("Paint:" + chr(65 + x // 26 % 26) + chr(65 + x % 26) + str(x % 100).zfill(2))
+
+    batch_numbers = []
+    unallocated = []
+    unfinished = []
+    for x in range(0, batches):
+        day = (datetime.date(2020, 1, 1) + datetime.timedelta(days=x // per_day)).strftime('%Y%m%d')
+        batch_number = day + str(x % per_day + 1).zfill(4)
+        component_type = generator.choice(list(inventory.COMPONENT_SIZES))
+        size = generator.choice(inventory.COMPONENT_SIZES[component_type])
+        if generator.random() < allocated:
+            location = generator.choice(["Paisley", "Dubai"])
+        else:
+            location = "Factory Floor - Warehouse Not Allocated"
+            unallocated.append(batch_number)
+
+        batch, batch_components = inventory.build_batch(batch_number, day, components, component_type, size, location)
+        for position in range(0, components):
+            if generator.random() < finished:
+                finish = generator.choice(["Polished"] + palette)
+                batch_components[position].finish = finish
+                batch.batch_status[position] = "Manufactured-" + finish
+            else:
+                unfinished.append(batch.serial_numbers[position])
+
+        if backend == "sqlite":
+            store.create_batch_records(inventory.make_lazy_batch(batch), [])
+        elif backend == "lazy":
+            write_synthetic_record(inventory, store, inventory.make_lazy_batch(batch), batch_number)
+        elif backend == "batchfile":
+            batch.components = batch_components
+            write_synthetic_record(inventory, store, batch, batch_number)
+        else:
+            for component in batch_components:
+                write_synthetic_record(inventory, store, component, component.serial)
+            write_synthetic_record(inventory, store, batch, batch_number)
+        batch_numbers.append(batch_number)
+
+    if backend != "sqlite":
+        with open(data_directory + "BatchIndex.json", "w") as out_file:
+            json.dump(batch_numbers, out_file)
+        inventory.get_serial_index(data_directory)
+        inventory.get_product_index(data_directory)
+    return batch_numbers, unallocated, unfinished
+
+
+# This function makes the dialog answers for one run of a menu operation, the batches and components it changes are taken from the pools
+def suite_answers(inventory, operation, generator, batch_numbers, unallocated, unfinished, create_amount):
+    component_type = generator.choice(list(inventory.COMPONENT_SIZES))
+    size = generator.choice(inventory.COMPONENT_SIZES[component_type])
+    if component_type == "Door Seal Clamp Handle":
+        product = [component_type]
+    else:
+        product = [component_type, size]
+
+    if operation == "create_batch":
+        return [create_amount] + product + [True, False]
+    if operation == "list_all_batches":
+        return ["OK"]
+    if operation == "view_stock_levels":
+        return []
+    if operation == "search_product":
+        return product + [True]
+    if operation == "view_component_details":
+        return [generator.choice(batch_numbers) + "-0001"]
+    if operation == "allocate_manufactured_stock":
+        return [unallocated.pop(generator.randrange(len(unallocated))), generator.choice(["Paisley", "Dubai"])]
+    serial_number = unfinished.pop(generator.randrange(len(unfinished)))
+    if generator.random() < 0.5:
+        return [serial_number, True, "Polished"]
+    return [serial_number, True, "Painted", "AB" + str(generator.randrange(100)).zfill(2)]
+
+
+# This function empties every cache of the program, so that the next operation reads everything from the "Data" directory again
+def clear_caches(inventory, data_directory):
+    inventory.batch_cache.clear()
+    inventory.clear_index_files()
+    inventory.batch_index_cache.clear()
+    inventory.close_sqlite_connection(data_directory)
+
+
+# This function runs one menu operation with its answers and returns its time, the files it opened and the bytes it read and wrote
+def measure_operation(inventory, dialogs, operation, answers):
+    dialogs.feed(answers)
+    suite_counters["files_opened"] = 0
+    suite_counters["directories_listed"] = 0
+    io_before = process_io()
+    suite_counters["on"] = True
+    start = time.perf_counter()
+    getattr(inventory, operation)()
+    taken = time.perf_counter() - start
+    suite_counters["on"] = False
+    io_after = process_io()
+    dialogs.check(operation)
+    if io_before is None or io_after is None:
+        bytes_read = None
+        bytes_written = None
+    else:
+        bytes_read = io_after[0] - io_before[0] - suite_counters["io_overhead"]
+        bytes_written = io_after[1] - io_before[1]
+    return {"seconds": taken, "files_opened": suite_counters["files_opened"],
+            "directories_listed": suite_counters["directories_listed"], "bytes_read": bytes_read,
+            "bytes_written": bytes_written}
+
+
+# Returns the middle value of a list of numbers, None is returned if any of them is None
+def median(values):
+    if len(values) == 0 or None in values:
+        return None
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+# Times the main menu operations against a synthetic inventory, driving the real menu functions with scripted dialog answers
+# Each operation is run "repeats" times, then once more with tracemalloc to find the most memory it used at once, which is not timed
+# With "cold" every cache is emptied before each run, like a station that has just been started, otherwise the caches are kept like a station left running
+# The results are printed as a table and written as JSON, and a JSON file from an earlier run can be given to print how much each number has changed
+def benchmark_suite(inventory, options):
+    operations = options.operations
+    for operation in operations:
+        if operation not in SUITE_OPERATIONS:
+            raise SystemExit("Unknown operation " + operation + ", choose from " + ", ".join(SUITE_OPERATIONS))
+    if options.per_day < 1 or options.per_day > 9999:
+        raise SystemExit("--per-day must be from 1 to 9999")
+    if options.components < 1 or options.components > 9999:
+        raise SystemExit("--components must be from 1 to 9999")
+
+    if not suite_counters.get("hooked"):
+        sys.addaudithook(count_file_access)
+        suite_counters["hooked"] = True
+    # Reading /proc/self/io is itself a read, so the bytes it takes are not counted as part of the operation
+    io_before = process_io()
+    io_after = process_io()
+    if io_before is None or io_after is None:
+        suite_counters["io_overhead"] = 0
+    else:
+        suite_counters["io_overhead"] = io_after[0] - io_before[0]
+
+    with tempfile.TemporaryDirectory() as data_directory:
+        data_directory = data_directory + os.sep
+        os.environ["INVENTORY_DATA_DIR"] = data_directory
+        os.environ["INVENTORY_STORAGE"] = options.backend
+        os.environ["INVENTORY_LAYOUT"] = options.layout
+        os.environ["INVENTORY_RECORD_FORMAT"] = options.record_format
+        os.environ.pop("INVENTORY_SERVER", None)
+        suite_counters["directory"] = data_directory
+
+        start = time.perf_counter()
+        batch_numbers, unallocated, unfinished = generate_inventory(inventory, options.batches, options.components,
+                                                                    options.seed, options.finished, options.allocated,
+                                                                    options.per_day, options.palette)
+        generate_seconds = time.perf_counter() - start
+
+        # Each run that changes something needs a batch that is not allocated or a component that is not finished
+        runs = options.repeats + 1
+        if "allocate_manufactured_stock" in operations and len(unallocated) < runs:
+            raise SystemExit("Only " + str(len(unallocated)) + " batches are not allocated, lower --allocated or --repeats")
+        if "finish_component" in operations and len(unfinished) < runs:
+            raise SystemExit("Only " + str(len(unfinished)) + " components are not finished, lower --finished or --repeats")
+
+        generator = random.Random(options.seed + 1)
+        dialogs = ScriptedDialogs(inventory)
+        results = {}
+        print("%28s %12s %12s %8s %8s %14s %12s" % ("Operation", "Best (ms)", "Median (ms)", "Files", "Dirs",
+                                                   "Bytes read", "Peak (KB)"))
+        try:
+            for operation in operations:
+                runs = []
+                for x in range(0, options.repeats):
+                    answers = suite_answers(inventory, operation, generator, batch_numbers, unallocated, unfinished,
+                                            options.components)
+                    if options.cold:
+                        clear_caches(inventory, data_directory)
+                    runs.append(measure_operation(inventory, dialogs, operation, answers))
+
+                answers = suite_answers(inventory, operation, generator, batch_numbers, unallocated, unfinished,
+                                        options.components)
+                if options.cold:
+                    clear_caches(inventory, data_directory)
+                tracemalloc.start()
+                measure_operation(inventory, dialogs, operation, answers)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                seconds = [run["seconds"] for run in runs]
+                results[operation] = {"best_seconds": min(seconds), "median_seconds": median(seconds),
+                                      "files_opened": median([run["files_opened"] for run in runs]),
+                                      "directories_listed": median([run["directories_listed"] for run in runs]),
+                                      "bytes_read": median([run["bytes_read"] for run in runs]),
+                                      "bytes_written": median([run["bytes_written"] for run in runs]),
+                                      "peak_bytes": peak, "runs": runs}
+                result = results[operation]
+                if result["bytes_read"] is None:
+                    bytes_read = "n/a"
+                else:
+                    bytes_read = str(int(result["bytes_read"]))
+                print("%28s %12.2f %12.2f %8g %8g %14s %12.1f" % (operation, result["best_seconds"] * 1000,
+                                                                  result["median_seconds"] * 1000, result["files_opened"],
+                                                                  result["directories_listed"], bytes_read, peak / 1024.0))
+        finally:
+            dialogs.restore()
+            inventory.close_sqlite_connection(data_directory)
+
+    for name in ["INVENTORY_LAYOUT", "INVENTORY_RECORD_FORMAT"]:
+        os.environ.pop(name, None)
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    report = {"meta": {"batches": options.batches, "components": options.components, "seed": options.seed,
+                       "finished": options.finished, "allocated": options.allocated, "per_day": options.per_day,
+                       "palette": options.palette, "repeats": options.repeats, "cold": options.cold,
+                       "backend": options.backend, "layout": options.layout, "record_format": options.record_format,
+                       "generate_seconds": generate_seconds, "commit": commit, "python": sys.version.split()[0],
+                       "platform": sys.platform},
+              "results": results}
+
+    if options.output is not None:
+        with open(options.output, "w") as out_file:
+            json.dump(report, out_file, indent=2)
+        print("Results written to " + options.output)
+
+    if options.compare is not None:
+        compare_suite_results(options.compare, report)
+    return report
+
+
+# Prints how each operation has changed since an earlier run of the suite, as new divided by old, so below 1.0 is an improvement
+# The runs should have the same scale, seed, backend, layout and record format, any setting that differs is printed first
+def compare_suite_results(path, report):
+    with open(path) as in_file:
+        previous = json.load(in_file)
+    for name in report["meta"]:
+        if name not in ["generate_seconds", "commit"] and previous["meta"].get(name) != report["meta"][name]:
+            print("Warning: " + name + " was " + repr(previous["meta"].get(name)) + " and is now " + repr(report["meta"][name]))
+
+    print("%28s %14s %14s %14s %14s" % ("Compared with " + os.path.basename(path), "Median time", "Files", "Bytes read",
+                                        "Peak memory"))
+    for operation in report["results"]:
+        if operation not in previous["results"]:
+            continue
+        ratios = []
+        for name in ["median_seconds", "files_opened", "bytes_read", "peak_bytes"]:
+            old = previous["results"][operation][name]
+            new = report["results"][operation][name]
+            if old is None or new is None:
+                ratios.append("n/a")
+            elif old == 0:
+                ratios.append("same" if new == 0 else "new")
+            else:
+                ratios.append("%.2fx" % (new / float(old)))
+        print("%28s %14s %14s %14s %14s" % (operation, ratios[0], ratios[1], ratios[2], ratios[3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PPEC Inventory System benchmarks")
+    commands = parser.add_subparsers(dest="command")
+
+    index_validation = commands.add_parser("index-validation", help="BatchIndex.json validation, characters vs parsed")
+    index_validation.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    index_validation.add_argument("--repeats", type=int, default=3)
+
+    index_append = commands.add_parser("index-append", help="new_batch_number and save_index as the index grows")
+    index_append.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    index_append.add_argument("--appends", type=int, default=500)
+
+    batch_create = commands.add_parser("batch-create", help="time and size of creating one batch with each storage backend")
+    batch_create.add_argument("--amounts", type=int, nargs="+", default=[100, 1000, 9999])
+    batch_create.add_argument("--backends", nargs="+", default=["pickle", "batchfile", "lazy"])
+
+    status_memory = commands.add_parser("status-memory", help="memory used by the batch status, list vs StatusColumn")
+    status_memory.add_argument("--amounts", type=int, nargs="+", default=[100, 1000, 9999])
+    status_memory.add_argument("--palette", type=int, default=12, help="how many different paint codes are used")
+
+    report_build = commands.add_parser("report-build", help="list of all batches and search results, original vs generators")
+    report_build.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 30000])
+    report_build.add_argument("--repeats", type=int, default=3)
+
+    sqlite_query = commands.add_parser("sqlite-query", help="point queries of the sqlite storage backend as it grows")
+    sqlite_query.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    sqlite_query.add_argument("--queries", type=int, default=1000)
+
+    stations = commands.add_parser("stations", help="several stations creating batches and finishing components at once")
+    stations.add_argument("--stations", type=int, nargs="+", default=[1, 2, 4, 8])
+    stations.add_argument("--backends", nargs="+", default=["batchfile", "lazy", "sqlite"])
+    stations.add_argument("--operations", type=int, default=50, help="batches each station creates")
+    stations.add_argument("--fsync-latency", type=float, default=0.0, help="milliseconds added to each fsync a station makes")
+
+    server = commands.add_parser("server", help="terminals reading the Data directory vs asking the inventory server")
+    server.add_argument("--batches", type=int, default=1000)
+    server.add_argument("--backend", default="lazy")
+    server.add_argument("--repeats", type=int, default=20)
+    server.add_argument("--stations", type=int, nargs="+", default=[1, 4, 16])
+
+    scan = commands.add_parser("scan", help="loading every batch one at a time vs the scan threads, with a network delay per file")
+    scan.add_argument("--batches", type=int, default=500)
+    scan.add_argument("--amount", type=int, default=100, help="components in each batch")
+    scan.add_argument("--latency", type=float, default=5.0, help="milliseconds added to each file that is opened")
+    scan.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    scan.add_argument("--processes", type=int, default=0, help="processes for unpickling large batches, 0 uses threads only")
+    scan.add_argument("--large-bytes", type=int, default=1024 * 1024, help="batch files larger than this go to the processes")
+
+    batch_list = commands.add_parser("batch-list", help="the whole list of all batches vs one page of it")
+    batch_list.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    batch_list.add_argument("--backends", nargs="+", default=["lazy", "sqlite"])
+
+    layout = commands.add_parser("layout", help="finding batch files in the flat vs dated layout")
+    layout.add_argument("--days", type=int, default=30)
+    layout.add_argument("--batches", type=int, default=100, help="batches made each day")
+    layout.add_argument("--components", type=int, default=50, help="components in each batch")
+    layout.add_argument("--repeats", type=int, default=5)
+
+    index_restore = commands.add_parser("index-restore", help="recovering BatchIndex.json from its checkpoint vs a full scan")
+    index_restore.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    index_restore.add_argument("--components", type=int, default=10, help="component files for each batch")
+    index_restore.add_argument("--repeats", type=int, default=3)
+
+    record_format = commands.add_parser("record-format", help="saving and loading records as pickle vs the json record format")
+    record_format.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    record_format.add_argument("--kinds", nargs="+", default=["component", "batchfile", "batch", "lazy"],
+                               help="one record per component, batches holding their components, batches and lazy batches")
+
+    model_memory = commands.add_parser("model-memory", help="memory of loaded components, original class vs slotted and interned")
+    model_memory.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+
+    write_ahead_log = commands.add_parser("write-ahead-log", help="creating batches with and without the write-ahead log")
+    write_ahead_log.add_argument("--batches", type=int, default=200)
+    write_ahead_log.add_argument("--amount", type=int, default=50, help="components in each batch")
+    write_ahead_log.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    write_ahead_log.add_argument("--backends", nargs="+", default=["pickle", "batchfile", "lazy"])
+
+    startup = commands.add_parser("startup", help="time to start a scripted job, with and without easygui")
+    startup.add_argument("--repeats", type=int, default=10)
+
+    suite = commands.add_parser("suite", help="the main menu operations against a synthetic inventory, written as JSON")
+    suite.add_argument("--batches", type=int, default=500, help="batches in the synthetic inventory")
+    suite.add_argument("--components", type=int, default=100, help="components in each batch, and in each batch created")
+    suite.add_argument("--seed", type=int, default=1, help="the same seed makes the same inventory and the same operations")
+    suite.add_argument("--finished", type=float, default=0.4, help="share of components that are polished or painted")
+    suite.add_argument("--allocated", type=float, default=0.5, help="share of batches allocated to Paisley or Dubai")
+    suite.add_argument("--per-day", type=int, default=200, help="batches made each day, from 1st January 2020")
+    suite.add_argument("--palette", type=int, default=12, help="paint codes in use")
+    suite.add_argument("--backend", default="pickle", choices=["pickle", "batchfile", "lazy", "sqlite"])
+    suite.add_argument("--layout", default="flat", choices=["flat", "dated"])
+    suite.add_argument("--record-format", default="pickle", choices=["pickle", "json"])
+    suite.add_argument("--operations", nargs="+", default=list(SUITE_OPERATIONS))
+    suite.add_argument("--repeats", type=int, default=5)
+    suite.add_argument("--cold", action="store_true", help="empty every cache before each run")
+    suite.add_argument("--output", help="JSON file to write the results to")
+    suite.add_argument("--compare", help="JSON file of an earlier run to compare the results with")
+
+    options = parser.parse_args()
+    inventory = inventory_core
+
+    if options.command == "index-validation":
+        benchmark_index_validation(inventory, options.sizes, options.repeats)
+    elif options.command == "index-append":
+        benchmark_index_append(inventory, options.sizes, options.appends)
+    elif options.command == "batch-create":
+        benchmark_batch_create(inventory, options.amounts, options.backends)
+    elif options.command == "status-memory":
+        benchmark_status_memory(inventory, options.amounts, options.palette)
+    elif options.command == "report-build":
+        benchmark_report_build(inventory, options.sizes, options.repeats)
+    elif options.command == "sqlite-query":
+        benchmark_sqlite_query(inventory, options.sizes, options.queries)
+    elif options.command == "stations":
+        benchmark_stations(inventory, options.stations, options.backends, options.operations, options.fsync_latency)
+    elif options.command == "server":
+        benchmark_server(inventory, options.batches, options.backend, options.repeats, options.stations)
+    elif options.command == "model-memory":
+        benchmark_model_memory(inventory, options.sizes)
+    elif options.command == "record-format":
+        benchmark_record_format(inventory, options.sizes, options.kinds)
+    elif options.command == "index-restore":
+        benchmark_index_restore(inventory, options.sizes, options.components, options.repeats)
+    elif options.command == "layout":
+        benchmark_layout(inventory, options.days, options.batches, options.components, options.repeats)
+    elif options.command == "batch-list":
+        benchmark_batch_list(inventory, options.sizes, options.backends)
+    elif options.command == "write-ahead-log":
+        benchmark_write_ahead_log(inventory, options.batches, options.amount, options.threads, options.backends)
+    elif options.command == "startup":
+        benchmark_startup(options.repeats)
+    elif options.command == "suite":
+        benchmark_suite(load_inventory_menu(), options)
+    elif options.command == "scan":
+        benchmark_scan(inventory, options.batches, options.amount, options.latency, options.workers, options.processes,
+                       options.large_bytes)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
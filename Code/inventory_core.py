@@ -0,0 +1,3781 @@
+# The inventory engine of the PPEC Inventory System, which is everything apart from the menu and its dialogs
+# Batch numbers, creating batches, the list of all batches, allocating, finishing and searching are all here, along with the stores,
+# the index files, the inventory server and the command line tools
+# It does not use easygui, so scripts, cron jobs and the inventory server can import it on a computer without a display, for example
+#     import inventory_core
+#     inventory_core.create_batches([{"amount": 10, "component_type": "Door Seal Clamp Handle", "size": ""}])
+# Libraries that are used in this code are imported here
+import datetime
+import sys
+import json
+import os
+import pickle
+import argparse
+import array
+import atexit
+import base64
+import bisect
+import collections
+import csv
+import io
+import itertools
+import time
+import sqlite3
+import tempfile
+import threading
+import contextlib
+import zlib
+import concurrent.futures
+import urllib.parse
+
+# Files are locked with fcntl on Linux and macOS and with msvcrt on Windows, whichever one this computer has
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# The dates, component types, sizes, statuses, finishes and locations of records only have a handful of different values between them
+# These attributes are interned when a record is made or loaded, so every record with the same value shares one copy of the string
+INTERNED_ATTRIBUTES = ["manufacture_date", "component_type", "size", "status", "finish", "location"]
+
+
+def intern_text(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+# Component and Batch keep their attributes in slots rather than a dictionary for each object, which takes much less memory
+# when many of them are loaded at once, but they are still pickled as a dictionary of their attributes, the same as before
+# they had slots, so record files saved by this version and by earlier versions of the program can be loaded by either
+def record_state(record):
+    state = {}
+    for name in record.__slots__:
+        if hasattr(record, name):
+            state[name] = getattr(record, name)
+    return state
+
+
+def set_record_state(record, state):
+    # An object with slots pickled without a __getstate__ method has its attributes in the second half of a tuple
+    if isinstance(state, tuple):
+        state = dict(state[0] or {}, **(state[1] or {}))
+    for name in state:
+        if name in INTERNED_ATTRIBUTES:
+            setattr(record, name, intern_text(state[name]))
+        elif name in record.__slots__:
+            setattr(record, name, state[name])
+
+
+# create class Component - for storing attributes about the components within a batch
+# attributes for this class include the date, component type, size, status and finish of each component and a unique serial number
+class Component:
+    __slots__ = ["manufacture_date", "component_type", "serial", "size", "status", "finish"]
+
+    # create a new instance for component
+    def __init__(self, manufacture_date, component_type, serial, size, status, finish):
+        self.manufacture_date = intern_text(manufacture_date)
+        self.component_type = intern_text(component_type)
+        self.serial = serial
+        self.size = intern_text(size)
+        self.status = intern_text(status)
+        self.finish = intern_text(finish)
+
+    # a method to add this component to a particular batch
+    # every attribute of the component class is passed through this method except for the serial parameter
+    def pick_component(self, batch):
+        batch.add_component(self.manufacture_date, self.component_type, self.size, self.status, self.finish)
+
+    # This code is used to return a human readable output of a class object, helpful for testing purposes
+    def __str__(self):
+        return str(self.__class__) + ": " + str(record_state(self))
+
+    def __getstate__(self):
+        return record_state(self)
+
+    def __setstate__(self, state):
+        set_record_state(self, state)
+
+
+# create class Batch - for storing attributes about each batch
+# attributes for this class include the amount of components in a batch, a list of all the component serial numbers, storage location and a unique batch number
+# certain attributes of the batch class are not applied through the paramters but instead through the "add_component" method
+class Batch:
+    __slots__ = ["batch_number", "manufacture_date", "component_type", "size", "amount_components", "serial_numbers", "batch_status",
+                 "location", "components"]
+
+    # initialisation method
+    def __init__(self, batch_number, amount_components, serial_numbers, location):
+        # initialise components in the batch
+        self.batch_number = batch_number
+        self.manufacture_date = ""
+        self.component_type = ""
+        self.size = ""
+        self.amount_components = amount_components
+        self.serial_numbers = serial_numbers
+        self.batch_status = StatusColumn()
+        self.location = intern_text(location)
+        # This list is only filled in when the "batchfile" storage backend keeps the components inside the batch record
+        self.components = []
+
+    # This method applies attributes to the Batch class from the Component class
+    # 5 parameters are received from the "pick_component" method and applied to the batch class here
+    # the "batch_status" attribute holds the concatenated value of status and finish with a string in between for each component
+    def add_component(self, manufacture_date, component_type, size, status, finish):
+        self.manufacture_date = manufacture_date
+        self.component_type = component_type
+        self.size = size
+        self.batch_status.append(status + "-" + finish)
+
+    # This code is used to return a human readable output of a class object, helpful for testing purposes
+    def __str__(self):
+        return str(self.__class__) + ": " + str(record_state(self))
+
+    def __getstate__(self):
+        return record_state(self)
+
+    # Batches saved before the components were kept inside the batch record have no "components" attribute
+    def __setstate__(self, state):
+        self.components = []
+        set_record_state(self, state)
+
+
+# create class StatusColumn - the status of every component in a batch stored as one small number per component
+# The numbers point into a table which holds each different status once, for example "Manufactured-Unfinished" or "Manufactured-Paint:AB12"
+# It is used in the same way as a list of statuses, for example batch_status[0], batch_status[0] = "Manufactured-Polished" and len(batch_status)
+class StatusColumn:
+    def __init__(self):
+        # One byte is used for each component until there are more than 256 different statuses in the batch
+        self.codes = array.array('B')
+        self.statuses = []
+        self.status_codes = {}
+
+    # Returns the number used for a status, the status is added to the table if it has not been used in this batch before
+    def code(self, status):
+        if status not in self.status_codes:
+            self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+            if len(self.statuses) > 256 and self.codes.typecode == 'B':
+                self.codes = array.array('H', self.codes)
+            elif len(self.statuses) > 65536 and self.codes.typecode == 'H':
+                self.codes = array.array('L', self.codes)
+        return self.status_codes[status]
+
+    # The code is worked out first because a new status can replace the codes array with a wider one
+    def append(self, status):
+        code = self.code(status)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, position):
+        return self.statuses[self.codes[position]]
+
+    def __setitem__(self, position, status):
+        code = self.code(status)
+        self.codes[position] = code
+
+    def __iter__(self):
+        for code in self.codes:
+            yield self.statuses[code]
+
+    # Only the codes and the table of statuses are stored, the dictionary used to look up codes is made again when loading
+    def __getstate__(self):
+        return {"codes": self.codes, "statuses": self.statuses}
+
+    def __setstate__(self, state):
+        self.codes = state["codes"]
+        self.statuses = state["statuses"]
+        self.status_codes = {}
+        for x in range(0, len(self.statuses)):
+            self.status_codes[self.statuses[x]] = x
+
+
+# create class SerialNumberRange - the serial numbers of a batch worked out from the batch number instead of being stored one by one
+# It is used in the same way as the list of serial numbers, for example serial_numbers[0], len(serial_numbers) and serial_numbers.index(serial)
+class SerialNumberRange:
+    def __init__(self, batch_number, amount):
+        self.batch_number = batch_number
+        self.amount = amount
+
+    def __len__(self):
+        return self.amount
+
+    def __getitem__(self, position):
+        if position < 0:
+            position = position + self.amount
+        if position < 0 or position >= self.amount:
+            raise IndexError("serial number position out of range")
+        return self.batch_number + "-" + str(position + 1).zfill(4)
+
+    def __iter__(self):
+        for x in range(0, self.amount):
+            yield self[x]
+
+    # The position of a serial number is the last 4 digits of the serial number minus one
+    def index(self, serial_number):
+        if len(serial_number) == 17 and serial_number[0:13] == self.batch_number + "-" and serial_number[13:17].isdigit():
+            position = int(serial_number[13:17]) - 1
+            if 0 <= position < self.amount:
+                return position
+        raise ValueError(serial_number + " is not part of batch " + self.batch_number)
+
+    def __contains__(self, serial_number):
+        try:
+            self.index(serial_number)
+            return True
+        except ValueError:
+            return False
+
+
+# create class LazyStatusList - the status of every component in a batch stored as one shared status plus the components that differ from it
+# It is used in the same way as the list of statuses, for example batch_status[0] and batch_status[0] = "Manufactured-Polished"
+class LazyStatusList:
+    def __init__(self, amount, default_status):
+        self.amount = amount
+        self.default_status = default_status
+        # The overrides dictionary maps the position of a component to its status when it is not the shared status
+        self.overrides = {}
+
+    def __len__(self):
+        return self.amount
+
+    def position(self, position):
+        if position < 0:
+            position = position + self.amount
+        if position < 0 or position >= self.amount:
+            raise IndexError("status position out of range")
+        return position
+
+    def __getitem__(self, position):
+        return self.overrides.get(self.position(position), self.default_status)
+
+    def __setitem__(self, position, status):
+        position = self.position(position)
+        if status == self.default_status:
+            self.overrides.pop(position, None)
+        else:
+            self.overrides[position] = status
+
+    def __iter__(self):
+        for x in range(0, self.amount):
+            yield self.overrides.get(x, self.default_status)
+
+
+# A lazy batch is one whose components are not stored at all but are made from the batch when they are needed
+def is_lazy_batch(batch):
+    return isinstance(batch.batch_status, LazyStatusList)
+
+
+# This function makes the Component object for one serial number of a lazy batch, None is returned if the serial number is not in the batch
+def materialise_component(batch, serial_number):
+    try:
+        position = batch.serial_numbers.index(serial_number)
+    except ValueError:
+        return None
+    # The batch status is the status and finish joined by "-", for example "Manufactured-Paint:AB12"
+    status, finish = batch.batch_status[position].split("-", 1)
+    return Component(batch.manufacture_date, batch.component_type, serial_number, batch.size, status, finish)
+
+
+# This function makes a new batch without making any Component objects, every component starts as "Manufactured-Unfinished"
+def build_lazy_batch(batch_number, manufacture_date, amount, component_type, size, location):
+    new_batch = Batch(batch_number, amount, SerialNumberRange(batch_number, amount), location)
+    new_batch.manufacture_date = manufacture_date
+    new_batch.component_type = component_type
+    new_batch.size = size
+    new_batch.batch_status = LazyStatusList(amount, "Manufactured-Unfinished")
+    return new_batch
+
+
+# This function turns a batch into a lazy batch, the status of each component is kept and the components themselves are dropped
+def make_lazy_batch(batch):
+    lazy_status = LazyStatusList(len(batch.serial_numbers), "Manufactured-Unfinished")
+    for x in range(0, len(batch.batch_status)):
+        lazy_status[x] = batch.batch_status[x]
+    batch.batch_status = lazy_status
+    batch.serial_numbers = SerialNumberRange(batch.batch_number, len(batch.serial_numbers))
+    batch.components = []
+    return batch
+
+
+# This function is used to get a string value of the location of the "Data" directory for storing and loading files
+def get_data_directory():
+    # The INVENTORY_DATA_DIR environment variable can point scripts and tools at a "Data" directory anywhere
+    if os.environ.get("INVENTORY_DATA_DIR"):
+        return os.path.join(os.environ["INVENTORY_DATA_DIR"], "")
+
+    # Get the "current working directory" to locate the BatchIndex json file
+    cwd = os.getcwd()
+
+    # the variable "data_directory" removes the last 4 letters from the string which is "Code" and replaces with "Data\\"
+    data_directory = cwd[:-4] + "Data\\"
+    return data_directory
+    # "os.getcwd()" SOURCE: https://stackoverflow.com/questions/5137497/find-current-directory-and-files-directory
+    # We found this code that gets a string of the current working directory and used it to locate our data folder
+
+
+# This function replaces a file with new contents so that other stations never see a half written file
+# The contents are written to a temporary file next to it and flushed to the disk with fsync, then renamed over the old file
+# A file that can be written again from the write-ahead log is not flushed, "durable" is False for those
+def write_file_atomically(path, data, durable=True):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    directory = os.path.dirname(path)
+    if directory == "":
+        directory = "."
+    temp_handle, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(temp_handle, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            if durable:
+                os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# These functions lock and unlock the whole of an open file, waiting until no other program has it locked
+def lock_whole_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    else:
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass
+
+
+def unlock_whole_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# create class FileLock - stops two stations, or two threads of one station, changing the same files at the same time
+# The lock is held on a small file in the "Locks" directory of the "Data" directory, which is let go if the program stops
+# The thread holding the lock can take it again, so functions that lock can call each other
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.lock_file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self.lock_file = open(self.path, "a+b")
+                lock_whole_file(self.lock_file)
+            except BaseException:
+                if self.lock_file is not None:
+                    self.lock_file.close()
+                    self.lock_file = None
+                self.thread_lock.release()
+                raise
+        self.depth = self.depth + 1
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        self.depth = self.depth - 1
+        if self.depth == 0:
+            unlock_whole_file(self.lock_file)
+            self.lock_file.close()
+            self.lock_file = None
+        self.thread_lock.release()
+
+
+# Each lock file has one FileLock object so that the threads of this program share it
+file_locks = {}
+file_locks_guard = threading.Lock()
+
+
+# This function returns the lock with this name in a "Data" directory, for example "BatchIndex" or the batch number of a batch
+# The locks are always taken in the same order so two stations never wait for each other forever:
+# a batch first, then the serial or product index, then the batch index
+def get_file_lock(data_directory, name):
+    path = data_directory + "Locks" + os.sep + name + ".lock"
+    with file_locks_guard:
+        if path not in file_locks:
+            os.makedirs(data_directory + "Locks", exist_ok=True)
+            file_locks[path] = FileLock(path)
+        return file_locks[path]
+
+
+# These are the classes of this program that are stored in record files
+RECORD_CLASSES = ["Component", "Batch", "StatusColumn", "SerialNumberRange", "LazyStatusList"]
+
+
+# The only other things a record pickle needs are the functions that rebuild the arrays of a StatusColumn
+PICKLE_GLOBALS = [("array", "array"), ("array", "_array_reconstructor"), ("copyreg", "_reconstructor"), ("builtins", "object")]
+
+
+# Pickle remembers which module a class came from, which was "__main__" before the menu and inventory_core were split
+# This unpickler always uses the record classes of this module, so records saved by any version of the program can be read
+# Anything else a pickle asks for is refused, so a damaged or tampered record file on a shared drive cannot run code when it is loaded
+class RecordUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name in RECORD_CLASSES:
+            return globals()[name]
+        if (module, name) in PICKLE_GLOBALS:
+            return pickle.Unpickler.find_class(self, module, name)
+        raise pickle.UnpicklingError(module + "." + name + " is not allowed in a record file")
+
+
+# Records can be saved in two formats, chosen with the INVENTORY_RECORD_FORMAT environment variable
+# "pickle" (the default) is the original format which every version of this program can read
+# "json" is the line "PPEC-RECORD 1" followed by the record as json, it holds only the values of the record and not the classes of this
+# program, so it does not break when the classes change, it is never unpickled and it loads quicker
+# The number after "PPEC-RECORD" is the version of the json layout, it is increased whenever the layout changes
+# A record is always loaded in the format it was saved in, the first bytes of the file say which one, and record files keep their ".pck" name
+RECORD_FORMATS = ["pickle", "json"]
+RECORD_MAGIC = b"PPEC-RECORD "
+RECORD_VERSION = 1
+
+
+def get_record_format():
+    record_format = os.environ.get("INVENTORY_RECORD_FORMAT", "pickle")
+    if record_format not in RECORD_FORMATS:
+        record_format = "pickle"
+    return record_format
+
+
+# The array types used for the status codes of a StatusColumn, by how many bytes each code takes
+STATUS_CODE_TYPES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+# This function returns the json for the status of every component in a batch
+# A lazy batch keeps its shared status and the components that differ, any other batch keeps a StatusColumn's table of statuses and its codes
+# The codes are stored as the bytes of the array in little endian order and written in base64, which is much smaller than a list of numbers
+def batch_status_to_json(batch_status):
+    if isinstance(batch_status, LazyStatusList):
+        overrides = {}
+        for position in batch_status.overrides:
+            overrides[str(position)] = batch_status.overrides[position]
+        return {"default": batch_status.default_status, "overrides": overrides}
+
+    # Batches saved before the StatusColumn was used hold a list of statuses, they are converted when they are saved
+    if not isinstance(batch_status, StatusColumn):
+        status_column = StatusColumn()
+        for status in batch_status:
+            status_column.append(status)
+        batch_status = status_column
+    codes = batch_status.codes
+    if sys.byteorder == "big":
+        codes = array.array(codes.typecode, codes)
+        codes.byteswap()
+    return {"statuses": batch_status.statuses, "code_size": codes.itemsize,
+            "codes": base64.b64encode(codes.tobytes()).decode("ascii")}
+
+
+def batch_status_from_json(status_json, amount):
+    if "default" in status_json:
+        batch_status = LazyStatusList(amount, status_json["default"])
+        for position in status_json["overrides"]:
+            batch_status.overrides[int(position)] = status_json["overrides"][position]
+        return batch_status
+
+    codes = array.array(STATUS_CODE_TYPES[status_json["code_size"]])
+    codes.frombytes(base64.b64decode(status_json["codes"]))
+    if sys.byteorder == "big":
+        codes.byteswap()
+    batch_status = StatusColumn()
+    batch_status.__setstate__({"codes": codes, "statuses": status_json["statuses"]})
+    return batch_status
+
+
+# The last 4 digits of every serial number a batch can have, made once so the serial numbers of a batch can be checked quickly
+SERIAL_SUFFIXES = [str(x).zfill(4) for x in range(1, 10000)]
+
+
+# This function turns a batch or component into the bytes of a "json" record file
+# A component, and each component kept inside a "batchfile" batch record, is a list of its values in the order of the Component class
+# The serial numbers of a batch are left out when they are the usual ones made from the batch number, which they always are
+def encode_record(record):
+    if isinstance(record, Component):
+        record_json = ["component", record.manufacture_date, record.component_type, record.serial, record.size, record.status,
+                       record.finish]
+    else:
+        record_json = batch_to_json(record, False)
+        record_json["record"] = "batch"
+        record_json["serial_numbers"] = None
+        if not isinstance(record.serial_numbers, SerialNumberRange):
+            serial_numbers = list(record.serial_numbers)
+            prefix = record.batch_number + "-"
+            if serial_numbers != list(map(prefix.__add__, SERIAL_SUFFIXES[0:len(serial_numbers)])):
+                record_json["serial_numbers"] = serial_numbers
+        record_json["batch_status"] = batch_status_to_json(record.batch_status)
+        record_json["components"] = [[component.manufacture_date, component.component_type, component.serial, component.size,
+                                      component.status, component.finish] for component in getattr(record, "components", [])]
+    return RECORD_MAGIC + str(RECORD_VERSION).encode("ascii") + b"\n" + json.dumps(record_json, separators=(",", ":")).encode("utf-8")
+
+
+# This function turns the bytes of a record file back into a batch or component, in whichever format they were saved in
+# A record saved by a newer version of this program, with a json layout this version does not know, raises a ValueError
+def decode_record(data):
+    if not data.startswith(RECORD_MAGIC):
+        return RecordUnpickler(io.BytesIO(data)).load()
+
+    header, record_data = data.split(b"\n", 1)
+    version = header[len(RECORD_MAGIC):].decode("ascii")
+    if version != str(RECORD_VERSION):
+        raise ValueError("record version " + version + " is not known to this program")
+    record_json = json.loads(record_data)
+    if isinstance(record_json, list):
+        return Component(*record_json[1:])
+
+    record = batch_from_json(record_json)
+    if record_json["serial_numbers"] is not None:
+        record.serial_numbers = record_json["serial_numbers"]
+    record.batch_status = batch_status_from_json(record_json["batch_status"], len(record.serial_numbers))
+    record.components = [Component(*values) for values in record_json["components"]]
+    return record
+
+
+# This function loads a single record (a batch or a component) from a record file
+def load_record(path):
+    with open(path, 'rb') as in_file:
+        return decode_record(in_file.read())
+
+
+# This function saves a single record (a batch or a component) to a record file, in the format chosen with INVENTORY_RECORD_FORMAT
+# The directory of the record is made first, with the "dated" layout it is a new directory for the first batch of each day
+def save_record(path, record, durable=True):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if get_record_format() == "json":
+        write_file_atomically(path, encode_record(record), durable)
+    else:
+        write_file_atomically(path, pickle.dumps(record), durable)
+
+
+# create class BatchCache - a size bounded cache of loaded batches which is shared by all of the menu operations
+# When the cache is full the least recently used batch is dropped, and a batch is loaded again if its file has changed since it was cached
+# The hits and misses attributes count how many batch loads were answered from the cache and how many had to read the file
+class BatchCache:
+    def __init__(self, max_size, loader=None):
+        self.max_size = max_size
+        # The function that reads a file, batch files are pickle records but the index files are read the same way
+        self.loader = loader
+        self.batches = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # The cache is shared by every thread of the program so only one of them changes it at a time
+        self.lock = threading.Lock()
+
+    # Returns the batch stored at this path, None is returned if there is no such file
+    def load(self, path):
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        # The modification time, size and file number are used to tell if another station has rewritten the batch
+        # A batch file is replaced by a new file every time it is saved so its file number changes as well
+        version = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+        with self.lock:
+            if path in self.batches and self.batches[path][0] == version:
+                self.batches.move_to_end(path)
+                self.hits = self.hits + 1
+                return self.batches[path][1]
+            self.misses = self.misses + 1
+
+        if self.loader is None:
+            batch = load_record(path)
+        else:
+            batch = self.loader(path)
+        if self.max_size > 0:
+            with self.lock:
+                self.batches[path] = (version, batch)
+                self.batches.move_to_end(path)
+                if len(self.batches) > self.max_size:
+                    self.batches.popitem(last=False)
+        return batch
+
+    # Removes a batch from the cache, this is called whenever a batch file is rewritten
+    def invalidate(self, path):
+        with self.lock:
+            self.batches.pop(path, None)
+
+    def clear(self):
+        with self.lock:
+            self.batches.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"size": len(self.batches), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+# The batch cache holds up to 128 batches unless the INVENTORY_BATCH_CACHE_SIZE environment variable says otherwise, 0 turns it off
+batch_cache = BatchCache(int(os.environ.get("INVENTORY_BATCH_CACHE_SIZE", "128")))
+
+
+# Full scans, like the list of all batches or rebuilding an index file, have to load every batch file in the "Data" directory
+# On a network share most of the time is spent waiting for each file to be opened, so a pool of threads loads several files at once
+# INVENTORY_SCAN_WORKERS sets how many threads are used, 1 loads the batch files one at a time like the original code
+def get_scan_workers():
+    try:
+        return max(1, int(os.environ.get("INVENTORY_SCAN_WORKERS", "8")))
+    except ValueError:
+        return 8
+
+
+# Only one thread can run python code at a time, so unpickling a very large batch holds up the other threads of a scan
+# When INVENTORY_SCAN_PROCESSES is more than 0, batch files larger than LARGE_BATCH_BYTES are unpickled by that many separate processes
+# A process can only send back a copy of what it loaded, so they are only used by scans that want a small summary of each batch
+LARGE_BATCH_BYTES = 1024 * 1024
+
+
+def get_scan_processes():
+    try:
+        return max(0, int(os.environ.get("INVENTORY_SCAN_PROCESSES", "0")))
+    except ValueError:
+        return 0
+
+
+# This function loads a batch file in one of the scan processes and returns its summary, None is summarised if there is no such file
+def summarise_batch_file(path, summarise):
+    try:
+        batch = load_record(path)
+    except FileNotFoundError:
+        batch = None
+    return summarise(batch)
+
+
+# This function loads one batch for a scan thread, a large batch is handed to the process pool when there is one
+def scan_batch(store, batch_number, summarise, process_pool):
+    if process_pool is not None:
+        try:
+            large = os.path.getsize(store.record_path(batch_number)) > LARGE_BATCH_BYTES
+        except OSError:
+            large = False
+        if large:
+            return process_pool.submit(summarise_batch_file, store.record_path(batch_number), summarise).result()
+    batch = store.load_batch(batch_number)
+    if summarise is None:
+        return batch
+    return summarise(batch)
+
+
+# This generator yields every batch in a list of batch numbers, in the same order, while the next ones are loaded in the background
+# If "summarise" is given it is called with each batch and its result is yielded instead, it must be a function defined in this file
+# so the scan processes can find it, and it is given None for a batch number that has no batch file
+# Only a few batches are loaded ahead of the one being yielded, so a scan never holds every batch in memory
+def scan_batches(store, batch_numbers, summarise=None):
+    workers = get_scan_workers()
+    if workers == 1:
+        for batch_number in batch_numbers:
+            yield scan_batch(store, batch_number, summarise, None)
+        return
+
+    with contextlib.ExitStack() as pools:
+        process_pool = None
+        if summarise is not None and get_scan_processes() > 0:
+            process_pool = pools.enter_context(concurrent.futures.ProcessPoolExecutor(get_scan_processes()))
+            # The processes are started here, before the threads, as starting a process copies the whole program
+            process_pool.submit(int).result()
+        thread_pool = pools.enter_context(concurrent.futures.ThreadPoolExecutor(workers))
+
+        loading = collections.deque()
+        for batch_number in batch_numbers:
+            loading.append(thread_pool.submit(scan_batch, store, batch_number, summarise, process_pool))
+            if len(loading) >= workers * 2:
+                yield loading.popleft().result()
+        while len(loading) > 0:
+            yield loading.popleft().result()
+
+
+# The storage backends decide how batch and component records are kept in the "Data" directory
+# "pickle" is the original layout which stores one pickle file per component plus one per batch
+# "batchfile" keeps each batch and all of its components together in one record, the batch's own pickle file
+# "lazy" keeps one record per batch as well, but only stores what its components share and the status of any component that differs
+# "sqlite" keeps every batch and component as a row in the Inventory.db database in the "Data" directory
+STORAGE_BACKENDS = ["pickle", "batchfile", "lazy", "sqlite"]
+
+
+# The record files can be laid out in the "Data" directory in two ways, chosen with the INVENTORY_LAYOUT environment variable
+# "flat" (the default) is the original layout with every record file in the "Data" directory itself
+# "dated" puts each record in a directory for the day it was made, taken from its batch number, for example "Data/2026/10/18/"
+# so that no directory grows past one day of records and the batches of a few days can be found without listing every file
+# The index files and the "Locks" directory stay in the "Data" directory with either layout
+DATA_LAYOUTS = ["flat", "dated"]
+
+
+def get_data_layout():
+    layout = os.environ.get("INVENTORY_LAYOUT", "flat")
+    if layout not in DATA_LAYOUTS:
+        layout = "flat"
+    return layout
+
+
+# This function returns the directory that a record belongs in, a record's name always starts with the date of its batch
+def record_directory(data_directory, name, layout):
+    if layout == "dated":
+        return data_directory + name[0:4] + os.sep + name[4:6] + os.sep + name[6:8] + os.sep
+    return data_directory
+
+
+# Every listing of the "Data" directory and the directories of the "dated" layout goes through this function, so that INVENTORY_STATS can time it
+def list_directory(directory):
+    return os.listdir(directory)
+
+
+# When the INVENTORY_SERVER environment variable holds the address of an inventory server, for example "http://127.0.0.1:8765",
+# the menu uses the server for everything and does not read the "Data" directory itself
+def get_server_address():
+    return os.environ.get("INVENTORY_SERVER", "")
+
+
+# This function returns the name of the storage backend in use, chosen with the INVENTORY_STORAGE environment variable
+def get_storage_backend():
+    backend = os.environ.get("INVENTORY_STORAGE", "pickle")
+    if backend not in STORAGE_BACKENDS:
+        backend = "pickle"
+    return backend
+
+
+# This function returns a store object for the "Data" directory which the menu operations use to load and save records
+# The first time a "Data" directory is used, any batches left in its write-ahead log by a station that stopped are finished
+def get_store(data_directory=None):
+    if data_directory is None and get_server_address() != "":
+        return RemoteStore(get_server_address())
+    if data_directory is None:
+        data_directory = get_data_directory()
+    if get_storage_backend() == "sqlite":
+        return SqliteStore(data_directory)
+    if data_directory not in replayed_logs:
+        replay_write_ahead_log(data_directory)
+    return file_store(data_directory, get_storage_backend())
+
+
+# This function returns the store of one of the backends that keep records in files
+def file_store(data_directory, backend):
+    if backend == "batchfile":
+        return BatchFileStore(data_directory)
+    if backend == "lazy":
+        return LazyBatchStore(data_directory)
+    return PickleStore(data_directory)
+
+
+# The list of all batches is shown a page at a time, only the batches on the page being shown are loaded
+BATCH_PAGE_SIZE = 50
+
+
+# This function returns the lowest and highest batch numbers made between two manufacture dates in the form YYYYMMDD
+# A batch number starts with its manufacture date, so the batches made between the dates are every batch number between these two
+def batch_number_range(start_date=None, end_date=None):
+    low = "0" * 12
+    high = "9" * 12
+    if start_date:
+        low = start_date + "0000"
+    if end_date:
+        high = end_date + "9999"
+    return low, high
+
+
+# This function picks the batch numbers on one page of the list of all batches from the batch index
+# A page starts after the "after" batch number, or ends before the "before" batch number to go back a page
+# The batch index is in batch number order, because each new batch number comes after the last one, so the page is found by bisection
+# "previous" and "next" are the batch numbers to give as "before" and "after" for the pages either side, None if there is no such page
+# "total" is how many batches were made between the dates, it is only counted when "count_total" is True
+def page_batch_numbers(batch_numbers, page_size, after=None, before=None, start_date=None, end_date=None, count_total=False):
+    low, high = batch_number_range(start_date, end_date)
+    first = bisect.bisect_left(batch_numbers, low)
+    last = bisect.bisect_right(batch_numbers, high)
+    if before is not None:
+        end = max(first, min(last, bisect.bisect_left(batch_numbers, before)))
+        start = max(first, end - page_size)
+    else:
+        start = first
+        if after is not None:
+            start = min(last, max(first, bisect.bisect_right(batch_numbers, after)))
+        end = min(last, start + page_size)
+
+    page = {"batch_numbers": list(batch_numbers[start:end]), "previous": None, "next": None, "total": None}
+    if start > first and end > start:
+        page["previous"] = batch_numbers[start]
+    if end < last and end > start:
+        page["next"] = batch_numbers[end - 1]
+    if count_total:
+        page["total"] = last - first
+    return page
+
+
+# The write-ahead log is the WriteAhead.log file in the "Data" directory, it is used when the INVENTORY_WAL environment variable is set
+# Creating a batch adds one line to it, flushed to the disk with a single fsync, before any of the batch's record files are written
+# The record files are then written without being flushed, and if the station stops part way through, the next station to use
+# the "Data" directory writes whatever is missing again from the log, so a batch is never left with only some of its files
+# The "sqlite" backend does not use it as the database has a write-ahead log of its own
+WRITE_AHEAD_LOG_NAME = "WriteAhead.log"
+
+# Once the log is larger than this, the record files of the batches in it are flushed to the disk and the log is emptied
+WRITE_AHEAD_LOG_CHECKPOINT_BYTES = 64 * 1024
+
+
+def write_ahead_log_enabled():
+    return os.environ.get("INVENTORY_WAL", "") not in ["", "0"]
+
+
+# This function returns what the write-ahead log keeps about a new batch, which is everything needed to make its records again
+def logged_batch_spec(store, batch):
+    return [batch.batch_number, get_storage_backend_of(store), batch.manufacture_date, batch.amount_components,
+            batch.component_type, batch.size, batch.location]
+
+
+# Returns the name of the backend a file store belongs to, the subclasses are checked first
+def get_storage_backend_of(store):
+    if isinstance(store, LazyBatchStore):
+        return "lazy"
+    if isinstance(store, BatchFileStore):
+        return "batchfile"
+    return "pickle"
+
+
+# Each entry of the log is one line, a crc32 of the json that follows it then the json itself
+# A line that was only partly written when a station stopped does not match its crc32, so it and anything after it are ignored
+def write_ahead_log_line(entry):
+    text = json.dumps(entry)
+    return ("%08x " % zlib.crc32(text.encode("utf-8")) + text + "\n").encode("utf-8")
+
+
+# This function returns the entry of one line of a log, without its newline, None is returned if the line does not match its crc32
+def read_write_ahead_log_line(line):
+    try:
+        if line[8:9] != b" " or int(line[0:8], 16) != zlib.crc32(line[9:]):
+            return None
+        return json.loads(line[9:].decode("utf-8"))
+    except ValueError:
+        return None
+
+
+def read_write_ahead_log(path):
+    entries = []
+    try:
+        with open(path, "rb") as log_file:
+            data = log_file.read()
+    except OSError:
+        return entries
+    for line in data.split(b"\n")[:-1]:
+        entry = read_write_ahead_log_line(line)
+        if entry is None:
+            break
+        entries.append(entry)
+    return entries
+
+
+# Returns the batches that were created in a list of log entries and have not been cancelled since
+def logged_batches(entries):
+    batches = collections.OrderedDict()
+    for entry in entries:
+        for spec in entry.get("create", []):
+            batches[spec[0]] = spec
+        for batch_number in entry.get("cancel", []):
+            batches.pop(batch_number, None)
+    return list(batches.values())
+
+
+# Returns the paths of the record files of a logged batch, the components' own files come first
+def logged_batch_paths(data_directory, spec):
+    store = file_store(data_directory, spec[1])
+    paths = []
+    if spec[1] == "pickle":
+        for position in range(1, spec[3] + 1):
+            paths.append(store.record_path(spec[0] + "-" + str(position).zfill(4)))
+    paths.append(store.record_path(spec[0]))
+    return paths
+
+
+# create class WriteAheadLog - adds entries to the write-ahead log of a "Data" directory with group commit
+# When several threads, for example those of the inventory server, create batches at once, one of them writes every entry
+# that is waiting with one write and one fsync while the others wait for it, instead of each of them flushing the log in turn
+class WriteAheadLog:
+    def __init__(self, data_directory):
+        self.data_directory = data_directory
+        self.path = data_directory + WRITE_AHEAD_LOG_NAME
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.last_queued = 0
+        self.last_written = 0
+        self.writing = False
+        self.failures = {}
+
+    # Adds an entry to the log and returns once it is on the disk, a problem writing it is raised in every thread whose entry it held
+    def commit(self, entry):
+        line = write_ahead_log_line(entry)
+        with self.condition:
+            self.waiting.append(line)
+            self.last_queued = self.last_queued + 1
+            number = self.last_queued
+            while self.last_written < number:
+                if self.writing:
+                    self.condition.wait()
+                    continue
+                lines = self.waiting
+                last = self.last_queued
+                self.waiting = []
+                self.writing = True
+                self.condition.release()
+                try:
+                    self.append(lines)
+                    problem = None
+                except Exception as error:
+                    problem = error
+                finally:
+                    self.condition.acquire()
+                    self.writing = False
+                    self.last_written = last
+                    self.condition.notify_all()
+                if problem is not None:
+                    for failed in range(last - len(lines) + 1, last + 1):
+                        self.failures[failed] = problem
+            problem = self.failures.pop(number, None)
+        if problem is not None:
+            raise problem
+
+    # The log is locked while it is added to, so that the entries of two stations are never mixed up
+    def append(self, lines):
+        with get_file_lock(self.data_directory, "WriteAheadLog"):
+            with open(self.path, "ab") as log_file:
+                log_file.write(b"".join(lines))
+                log_file.flush()
+                os.fsync(log_file.fileno())
+
+    # Once the log has grown past WRITE_AHEAD_LOG_CHECKPOINT_BYTES, or when "force" is True, the record files of the batches in it are flushed
+    # and those batches are taken out of the log. A batch whose files are not all there yet is still being written, so it is kept
+    # Only the files of the batches in the log and the directories they are in are flushed, and the log is not locked while they are,
+    # so other stations can keep adding batches. The log is read again afterwards and only the batches that were flushed are taken out
+    def checkpoint(self, force=False):
+        try:
+            if not force and os.path.getsize(self.path) < WRITE_AHEAD_LOG_CHECKPOINT_BYTES:
+                return
+        except OSError:
+            return
+        with get_file_lock(self.data_directory, "WriteAheadLog"):
+            flushed = set()
+            written_paths = []
+            for spec in logged_batches(read_write_ahead_log(self.path)):
+                paths = logged_batch_paths(self.data_directory, spec)
+                if all(os.path.isfile(path) for path in paths):
+                    flushed.add(spec[0])
+                    written_paths.extend(paths)
+
+        directories = set([self.data_directory])
+        for path in written_paths:
+            with open(path, "rb") as record_file:
+                os.fsync(record_file.fileno())
+            directories.add(os.path.dirname(path))
+        for directory in directories:
+            flush_directory(directory)
+
+        with get_file_lock(self.data_directory, "WriteAheadLog"):
+            kept = [spec for spec in logged_batches(read_write_ahead_log(self.path)) if spec[0] not in flushed]
+            if len(kept) > 0:
+                write_file_atomically(self.path, write_ahead_log_line({"create": kept}))
+            elif os.path.isfile(self.path):
+                os.remove(self.path)
+
+
+# This function flushes a directory to the disk, so the files that were added to it or renamed into it are kept if the computer stops
+# Windows cannot open a directory to flush it, it keeps a directory's entries up to date itself
+def flush_directory(directory):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    directory_handle = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory_handle)
+    finally:
+        os.close(directory_handle)
+
+
+# Each "Data" directory has one WriteAheadLog object so that the threads of this program share it
+write_ahead_logs = {}
+write_ahead_logs_guard = threading.Lock()
+
+
+def get_write_ahead_log(data_directory):
+    with write_ahead_logs_guard:
+        if data_directory not in write_ahead_logs:
+            write_ahead_logs[data_directory] = WriteAheadLog(data_directory)
+        return write_ahead_logs[data_directory]
+
+
+# This function returns True if a record file is all there and can be loaded
+def is_whole_record(path):
+    try:
+        return load_record(path) is not None
+    except Exception:
+        return False
+
+
+# The "Data" directories whose write-ahead log has been replayed by this program
+replayed_logs = set()
+
+
+# This function finishes every batch in the write-ahead log, any record file that is missing or was only partly written is written again
+# Files that are whole are left alone, as they may have been changed since, for example by finishing one of the components
+# Each batch is locked while it is checked, so a batch that another station is still creating is waited for and then left as it is
+# The batch numbers were added to the batch index before the batches were logged, so only the records and the serial and product indexes are written
+# The number of record files written again is returned, and printed if there were any
+def replay_write_ahead_log(data_directory):
+    replayed_logs.add(data_directory)
+    if not os.path.isfile(data_directory + WRITE_AHEAD_LOG_NAME):
+        return 0
+    written = 0
+    batches = logged_batches(read_write_ahead_log(data_directory + WRITE_AHEAD_LOG_NAME))
+    for spec in batches:
+        store = file_store(data_directory, spec[1])
+        with store.batch_lock(spec[0]):
+            batch, components = store.build_batch(spec[0], spec[2], spec[3], spec[4], spec[5], spec[6])
+            for component in store.prepare_new_batch(batch, components):
+                if not is_whole_record(store.record_path(component.serial)):
+                    save_record(store.record_path(component.serial), component)
+                    written = written + 1
+            if not is_whole_record(store.record_path(batch.batch_number)):
+                store.save_batch(batch)
+                written = written + 1
+                add_serial_index_entry(data_directory, batch)
+    get_write_ahead_log(data_directory).checkpoint(True)
+    if written > 0:
+        print("Replayed " + str(len(batches)) + " batch(es) from the write-ahead log, " + str(written) +
+              " record file(s) were written again", file=sys.stderr)
+    return written
+
+
+# create class PickleStore - the original storage layout with one pickle file per component and one per batch
+class PickleStore:
+    def __init__(self, data_directory):
+        self.data_directory = data_directory
+        self.layout = get_data_layout()
+
+    # Every record is stored in the "Data" directory, or the directory for its day, under its batch or serial number
+    def record_path(self, name):
+        return record_directory(self.data_directory, name, self.layout) + name + '.pck'
+
+    # The batch numbers and product search come from the index files in the "Data" directory
+    def batch_numbers(self):
+        return get_batch_index()
+
+    def new_batch_number(self, manufacture_date):
+        return new_batch_number(manufacture_date)
+
+    def add_batch_number(self, batch_number):
+        save_index(batch_number)
+
+    # The batch index lock is held while a new batch number is worked out and added, so two stations never use the same one
+    def batch_index_lock(self):
+        return get_file_lock(self.data_directory, "BatchIndex")
+
+    # Each batch has its own lock so that stations working on different batches do not wait for each other
+    def batch_lock(self, batch_number):
+        return get_file_lock(self.data_directory, batch_number)
+
+    # This works out the next batch number and adds it to the index straight away, while the batch index is locked
+    def reserve_batch_number(self, manufacture_date):
+        with self.batch_index_lock():
+            batch_number = self.new_batch_number(manufacture_date)
+            self.add_batch_number(batch_number)
+        return batch_number
+
+    # Reserves a batch number then makes and saves the new batch, the new batch is returned
+    def create_batch(self, manufacture_date, amount, component_type, size, location):
+        batch_number = self.reserve_batch_number(manufacture_date)
+        new_batch, components = self.build_batch(batch_number, manufacture_date, amount, component_type, size, location)
+        self.create_batch_records(new_batch, components)
+        return new_batch
+
+    # Yields each batch in a list of batch numbers for the list of all batches, the scan threads load the next few in the background
+    # A batch number that has been reserved but whose batch has not been written yet is left out
+    def list_batches(self, batch_numbers):
+        for batch in scan_batches(self, batch_numbers):
+            if batch is not None:
+                yield batch
+
+    # Returns one page of the list of all batches, see "page_batch_numbers", with the batches on it under "batches"
+    # A batch number that has been reserved but not written yet is left out, so a page can have fewer batches than the page size
+    def batch_page(self, page_size, after=None, before=None, start_date=None, end_date=None, count_total=False):
+        page = page_batch_numbers(self.batch_numbers() or [], page_size, after, before, start_date, end_date, count_total)
+        page["batches"] = list(self.list_batches(page["batch_numbers"]))
+        return page
+
+    def search_product(self, component_type, size):
+        return search_product_index(self.data_directory, component_type, size)
+
+    # The stock levels come from StockLevels.json and the changes to them in ProductIndex.log, so no batch files are opened
+    def stock_levels(self):
+        return get_stock_levels(self.data_directory)
+
+    def verify_stock_levels(self, repair=False):
+        return verify_stock_levels(self.data_directory, repair)
+
+    # Loads a batch through the batch cache, None is returned if there is no batch file with that batch number
+    def load_batch(self, batch_number):
+        return batch_cache.load(self.record_path(batch_number))
+
+    # A batch from the batch cache is changed in place before it is saved, so if it cannot be saved its cached copy is dropped
+    # The next load then reads the batch file, which still holds the batch as it was before the change
+    def forget_batch(self, batch_number):
+        batch_cache.invalidate(self.record_path(batch_number))
+
+    # Every time a batch is saved its cached copy is dropped and its entry in the product index is brought up to date
+    def save_batch(self, batch, durable=True):
+        save_record(self.record_path(batch.batch_number), batch, durable)
+        batch_cache.invalidate(self.record_path(batch.batch_number))
+        update_product_index(self.data_directory, batch)
+
+    # Makes a new batch and its components, the "lazy" backend does this without making any Component objects
+    def build_batch(self, batch_number, manufacture_date, amount, component_type, size, location):
+        return build_batch(batch_number, manufacture_date, amount, component_type, size, location)
+
+    # Gets a new batch ready to be saved and returns the components that are saved in files of their own, the batch is saved after them
+    def prepare_new_batch(self, batch, components):
+        return components
+
+    # Stores a newly created batch and all of its components, then adds the batch to the serial index
+    # With INVENTORY_WAL set the batch is written to the write-ahead log first, so its record files do not have to be flushed one by one
+    # The batch is locked while it is written, so a station replaying the log waits for it instead of writing the same files
+    def create_batch_records(self, batch, components):
+        if not write_ahead_log_enabled():
+            self.write_new_batch(batch, components, True)
+            return
+        with self.batch_lock(batch.batch_number):
+            get_write_ahead_log(self.data_directory).commit({"create": [logged_batch_spec(self, batch)]})
+            self.write_new_batch(batch, components, False)
+        get_write_ahead_log(self.data_directory).checkpoint()
+
+    def write_new_batch(self, batch, components, durable):
+        for component in self.prepare_new_batch(batch, components):
+            save_record(self.record_path(component.serial), component, durable)
+        self.save_batch(batch, durable)
+        add_serial_index_entry(self.data_directory, batch)
+
+    # Writes a batch that already exists again in this store's layout, this is used by the migrations
+    # It is never put in the write-ahead log, which would replay it with every component unfinished, so its records are flushed
+    # to the disk straight away, before the files it came from are removed
+    def rewrite_batch_records(self, batch, components):
+        with self.batch_lock(batch.batch_number):
+            self.write_new_batch(batch, components, True)
+
+    # Removes every record of a batch along with its entries in the serial and product indexes
+    # This is used to undo a batch creation that could not be completed, the write-ahead log is told first so the batch is not replayed
+    def delete_batch_records(self, batch):
+        if write_ahead_log_enabled():
+            get_write_ahead_log(self.data_directory).commit({"cancel": [batch.batch_number]})
+        for serial_number in batch.serial_numbers:
+            if os.path.isfile(self.record_path(serial_number)):
+                os.remove(self.record_path(serial_number))
+        if os.path.isfile(self.record_path(batch.batch_number)):
+            os.remove(self.record_path(batch.batch_number))
+        batch_cache.invalidate(self.record_path(batch.batch_number))
+        remove_serial_index_entry(self.data_directory, batch.batch_number)
+        remove_product_index_entry(self.data_directory, batch)
+
+    # The position of a component in its batch is worked out from the last 4 digits of its serial number
+    def find_component(self, batch, serial_number):
+        try:
+            position = int(serial_number[13:17]) - 1
+        except ValueError:
+            return None
+        if 0 <= position < len(batch.components) and batch.components[position].serial == serial_number:
+            return position
+        return None
+
+    # Loads the component with this serial number, None is returned if nothing matches
+    # The serial index says whether the component has its own file or is kept inside its batch record, so no directory listing is needed
+    def load_component(self, serial_number):
+        record = find_serial_record(self.data_directory, serial_number)
+        if record == "component" and os.path.isfile(self.record_path(serial_number)):
+            return load_record(self.record_path(serial_number))
+        elif record == "batch":
+            batch = self.load_batch(serial_number[0:12])
+            if batch is not None and is_lazy_batch(batch):
+                return materialise_component(batch, serial_number)
+            elif batch is not None:
+                position = self.find_component(batch, serial_number)
+                if position is not None:
+                    return batch.components[position]
+        return None
+
+    # Finishes one component while its batch is locked, the batch is loaded again so a change made by another station is not lost
+    # The finish the component had before is returned, so "Unfinished" means it has been finished, None is returned if there is no such component
+    def finish_component(self, serial_number, finish):
+        with self.batch_lock(serial_number[0:12]):
+            component = self.load_component(serial_number)
+            batch = self.load_batch(serial_number[0:12])
+            if component is None or batch is None:
+                return None
+            if component.finish != "Unfinished":
+                return component.finish
+            component.finish = finish
+            batch.batch_status[batch.serial_numbers.index(serial_number)] = component.status + "-" + finish
+            self.save_component(component, batch)
+        return "Unfinished"
+
+    # Allocates a batch to a warehouse while the batch is locked, the location it had before is returned
+    # If another station has allocated the batch already it is left as it is, None is returned if there is no such batch
+    def allocate_batch(self, batch_number, location):
+        with self.batch_lock(batch_number):
+            batch = self.load_batch(batch_number)
+            if batch is None:
+                return None
+            previous_location = batch.location
+            if previous_location == "Factory Floor - Warehouse Not Allocated" or previous_location == "None":
+                try:
+                    batch.location = location
+                    self.save_batch(batch)
+                except BaseException:
+                    self.forget_batch(batch_number)
+                    raise
+        return previous_location
+
+    # Gives many components of one batch the same finish, the position of each component in the batch is given
+    # The batch record, and any components kept inside it, are written once however many components are finished
+    # Batches from before the migration also have a file for each component, which holds its finish, so those files are written too
+    def finish_batch_components(self, batch, positions, finish):
+        try:
+            for position in positions:
+                status = batch.batch_status[position].split("-", 1)[0]
+                batch.batch_status[position] = status + "-" + finish
+                if len(getattr(batch, "components", [])) > 0:
+                    batch.components[position].finish = finish
+                elif not is_lazy_batch(batch) and os.path.isfile(self.record_path(batch.serial_numbers[position])):
+                    component = load_record(self.record_path(batch.serial_numbers[position]))
+                    component.finish = finish
+                    save_record(self.record_path(component.serial), component)
+            self.save_batch(batch)
+        except BaseException:
+            self.forget_batch(batch.batch_number)
+            raise
+
+    # Saves a component that has been changed along with its batch, which holds the status of every component
+    # If the batch keeps its components inside it, the changed component replaces its copy and the batch record is written once
+    # A lazy batch makes its components from the batch status, so only the batch is written
+    # The component and batch have already been changed, so if either cannot be saved the cached batch is dropped
+    def save_component(self, component, batch):
+        try:
+            if len(getattr(batch, "components", [])) > 0:
+                batch.components[self.find_component(batch, component.serial)] = component
+            elif not is_lazy_batch(batch):
+                save_record(self.record_path(component.serial), component)
+            self.save_batch(batch)
+        except BaseException:
+            self.forget_batch(batch.batch_number)
+            raise
+
+
+# create class BatchFileStore - keeps a batch and all of its components in a single record file
+# Creating a batch writes one file instead of one file per component, and components are found through their batch number
+# Batches that were stored before the migration still have their own component files, so those are read the original way
+class BatchFileStore(PickleStore):
+    def prepare_new_batch(self, batch, components):
+        batch.components = components
+        return []
+
+
+# create class LazyBatchStore - keeps only what the components of a batch share plus the status of any component that differs
+# Component objects are made from the batch when they are viewed or finished, so creating a batch makes and stores no Component objects
+class LazyBatchStore(BatchFileStore):
+    def build_batch(self, batch_number, manufacture_date, amount, component_type, size, location):
+        return build_lazy_batch(batch_number, manufacture_date, amount, component_type, size, location), []
+
+    def prepare_new_batch(self, batch, components):
+        if not is_lazy_batch(batch):
+            make_lazy_batch(batch)
+        return []
+
+
+# The tables and indexes of the Inventory.db database used by the "sqlite" storage backend
+# A component's status and finish are kept apart so that components can be looked up by their finish
+SQLITE_SCHEMA = ["CREATE TABLE IF NOT EXISTS batches (batch_number TEXT PRIMARY KEY, manufacture_date TEXT, "
+                 "component_type TEXT, size TEXT, location TEXT, amount_components INTEGER)",
+                 "CREATE TABLE IF NOT EXISTS components (serial TEXT PRIMARY KEY, batch_number TEXT NOT NULL, "
+                 "position INTEGER NOT NULL, status TEXT, finish TEXT) WITHOUT ROWID",
+                 "CREATE INDEX IF NOT EXISTS components_batch_number ON components (batch_number, position)",
+                 "CREATE INDEX IF NOT EXISTS components_finish ON components (finish)",
+                 "CREATE INDEX IF NOT EXISTS batches_product ON batches (component_type, size)",
+                 "CREATE INDEX IF NOT EXISTS batches_location ON batches (location)",
+                 "CREATE TABLE IF NOT EXISTS stock_levels (component_type TEXT, size TEXT, location TEXT, finish TEXT, "
+                 "amount INTEGER NOT NULL, PRIMARY KEY (component_type, size, location, finish))"]
+
+# The stock_levels table counts the components of each component type, size, location and finish the same way StockLevels.json does
+# A new batch adds its components in the transaction that writes it, and the triggers below change the counts in the same transaction
+# as a finish or a location, so the counts can never be out of step with the components
+SQLITE_FINISH_STATE = "CASE WHEN substr({0}, 1, 6) = 'Paint:' THEN 'Painted' ELSE {0} END"
+SQLITE_ADD_STOCK = "INSERT INTO stock_levels VALUES (?, ?, ?, ?, ?) ON CONFLICT (component_type, size, location, finish) " \
+                   "DO UPDATE SET amount = amount + excluded.amount"
+SQLITE_COUNT_STOCK = "SELECT batches.component_type, batches.size, batches.location, " + \
+                     SQLITE_FINISH_STATE.format("components.finish") + ", COUNT(*) FROM batches " \
+                     "JOIN components ON components.batch_number = batches.batch_number GROUP BY 1, 2, 3, 4"
+# Takes the components of one batch away from the stock levels of the component type, size and location it had
+SQLITE_REMOVE_BATCH_STOCK = "UPDATE stock_levels SET amount = amount - (SELECT COUNT(*) FROM components " \
+                            "WHERE components.batch_number = {0} AND " + SQLITE_FINISH_STATE.format("components.finish") + \
+                            " = stock_levels.finish) WHERE (component_type, size, location) = ({1})"
+SQLITE_SCHEMA.append("CREATE TRIGGER IF NOT EXISTS stock_levels_finish AFTER UPDATE OF finish ON components WHEN " +
+                     SQLITE_FINISH_STATE.format("OLD.finish") + " IS NOT " + SQLITE_FINISH_STATE.format("NEW.finish") + " BEGIN "
+                     "UPDATE stock_levels SET amount = amount - 1 WHERE (component_type, size, location, finish) = "
+                     "(SELECT component_type, size, location, " + SQLITE_FINISH_STATE.format("OLD.finish") + " FROM batches "
+                     "WHERE batch_number = OLD.batch_number); "
+                     "INSERT OR IGNORE INTO stock_levels SELECT component_type, size, location, " +
+                     SQLITE_FINISH_STATE.format("NEW.finish") + ", 0 FROM batches WHERE batch_number = NEW.batch_number; "
+                     "UPDATE stock_levels SET amount = amount + 1 WHERE (component_type, size, location, finish) = "
+                     "(SELECT component_type, size, location, " + SQLITE_FINISH_STATE.format("NEW.finish") + " FROM batches "
+                     "WHERE batch_number = NEW.batch_number); END")
+SQLITE_SCHEMA.append("CREATE TRIGGER IF NOT EXISTS stock_levels_move AFTER UPDATE OF component_type, size, location ON batches WHEN "
+                     "OLD.component_type IS NOT NEW.component_type OR OLD.size IS NOT NEW.size OR "
+                     "OLD.location IS NOT NEW.location BEGIN " +
+                     SQLITE_REMOVE_BATCH_STOCK.format("OLD.batch_number", "OLD.component_type, OLD.size, OLD.location") + "; "
+                     "INSERT OR IGNORE INTO stock_levels SELECT NEW.component_type, NEW.size, NEW.location, " +
+                     SQLITE_FINISH_STATE.format("finish") + ", 0 FROM components WHERE batch_number = NEW.batch_number "
+                     "GROUP BY 4; "
+                     "UPDATE stock_levels SET amount = amount + (SELECT COUNT(*) FROM components "
+                     "WHERE components.batch_number = NEW.batch_number AND " + SQLITE_FINISH_STATE.format("components.finish") +
+                     " = stock_levels.finish) WHERE component_type = NEW.component_type AND size = NEW.size "
+                     "AND location = NEW.location; END")
+
+# One connection is kept open for each database so that the menu does not reconnect for every operation
+# A connection can only be used by the thread that opened it, so each thread has its own, closed when the thread ends
+sqlite_connections = threading.local()
+
+
+# This function opens the Inventory.db database in a "Data" directory, making its tables the first time
+# WAL mode lets the database be read while it is being written to, so other programs can read it at the same time
+def get_sqlite_connection(data_directory):
+    path = data_directory + "Inventory.db"
+    if not hasattr(sqlite_connections, "connections"):
+        sqlite_connections.connections = {}
+    if path not in sqlite_connections.connections:
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            # A database made before the stock levels were kept has them counted from its components when the table is made
+            new_stock_levels = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' "
+                                                  "AND name = 'stock_levels'").fetchone()[0] == 0
+            for statement in SQLITE_SCHEMA:
+                connection.execute(statement)
+            if new_stock_levels:
+                connection.execute("INSERT OR IGNORE INTO stock_levels " + SQLITE_COUNT_STOCK)
+        sqlite_connections.connections[path] = connection
+    return sqlite_connections.connections[path]
+
+
+# This function closes this thread's connection to the database in a "Data" directory, if it has one
+def close_sqlite_connection(data_directory):
+    connection = getattr(sqlite_connections, "connections", {}).pop(data_directory + "Inventory.db", None)
+    if connection is not None:
+        connection.close()
+
+
+# create class SqliteStore - keeps every batch and component as a row in an SQLite database instead of in pickle files
+# Batches and components are found through the indexes of the database, so no files are listed or unpickled
+class SqliteStore:
+    def __init__(self, data_directory):
+        self.data_directory = data_directory
+        self.connection = get_sqlite_connection(data_directory)
+
+    # The same locks as the other storage backends are used, the database itself makes sure each write is whole
+    def batch_index_lock(self):
+        return get_file_lock(self.data_directory, "BatchIndex")
+
+    def batch_lock(self, batch_number):
+        return get_file_lock(self.data_directory, batch_number)
+
+    # A reserved batch number is kept as a batch row without any components until the batch is written
+    def reserve_batch_number(self, manufacture_date):
+        with self.batch_index_lock():
+            batch_number = self.new_batch_number(manufacture_date)
+            with self.connection:
+                self.connection.execute("INSERT INTO batches (batch_number, amount_components) VALUES (?, 0)", (batch_number,))
+        return batch_number
+
+    def create_batch(self, manufacture_date, amount, component_type, size, location):
+        batch_number = self.reserve_batch_number(manufacture_date)
+        new_batch, components = self.build_batch(batch_number, manufacture_date, amount, component_type, size, location)
+        self.create_batch_records(new_batch, components)
+        return new_batch
+
+    # The batch numbers come from the batches table in order, so the last one is always the newest batch
+    def batch_numbers(self):
+        rows = self.connection.execute("SELECT batch_number FROM batches WHERE amount_components > 0 "
+                                       "ORDER BY batch_number").fetchall()
+        return [row[0] for row in rows]
+
+    # The next batch number follows on from the newest batch the same way "new_batch_number" works it out from the index
+    def new_batch_number(self, manufacture_date):
+        last_batch_number = self.connection.execute("SELECT MAX(batch_number) FROM batches").fetchone()[0]
+        if last_batch_number is not None and last_batch_number[0:8] == manufacture_date:
+            return manufacture_date + str(int(last_batch_number[8:12]) + 1).zfill(4)
+        return manufacture_date + str(1).zfill(4)
+
+    # A batch is in the index as soon as its row is written, so there is nothing else to add
+    def add_batch_number(self, batch_number):
+        pass
+
+    # The list of all batches only shows the details of each batch, so the status of their components is not loaded
+    # Only the rows between the lowest and highest batch number asked for are read, so a page of batches only reads that page
+    def list_batches(self, batch_numbers):
+        wanted = set(batch_numbers)
+        if len(wanted) == 0:
+            return
+        for row in self.connection.execute("SELECT batch_number, manufacture_date, component_type, size, location, "
+                                           "amount_components FROM batches WHERE amount_components > 0 "
+                                           "AND batch_number BETWEEN ? AND ? ORDER BY batch_number",
+                                           (min(wanted), max(wanted))):
+            if row[0] in wanted:
+                batch = Batch(row[0], row[5], SerialNumberRange(row[0], row[5]), row[4])
+                batch.manufacture_date = row[1]
+                batch.component_type = row[2]
+                batch.size = row[3]
+                yield batch
+
+    # A page is read in batch number order from the primary key of the batches table, so the other batches are never read
+    def batch_page(self, page_size, after=None, before=None, start_date=None, end_date=None, count_total=False):
+        low, high = batch_number_range(start_date, end_date)
+        in_range = "FROM batches WHERE amount_components > 0 AND batch_number BETWEEN ? AND ? "
+        if before is not None:
+            rows = self.connection.execute("SELECT batch_number " + in_range + "AND batch_number < ? "
+                                           "ORDER BY batch_number DESC LIMIT ?", (low, high, before, page_size)).fetchall()
+            rows.reverse()
+        else:
+            rows = self.connection.execute("SELECT batch_number " + in_range + "AND batch_number > ? "
+                                           "ORDER BY batch_number LIMIT ?", (low, high, after or "", page_size)).fetchall()
+
+        page = {"batch_numbers": [row[0] for row in rows], "previous": None, "next": None, "total": None}
+        if len(rows) > 0:
+            if self.connection.execute("SELECT EXISTS (SELECT 1 " + in_range + "AND batch_number < ?)",
+                                       (low, high, rows[0][0])).fetchone()[0]:
+                page["previous"] = rows[0][0]
+            if self.connection.execute("SELECT EXISTS (SELECT 1 " + in_range + "AND batch_number > ?)",
+                                       (low, high, rows[-1][0])).fetchone()[0]:
+                page["next"] = rows[-1][0]
+        if count_total:
+            page["total"] = self.connection.execute("SELECT COUNT(*) " + in_range, (low, high)).fetchone()[0]
+        page["batches"] = list(self.list_batches(page["batch_numbers"]))
+        return page
+
+    def search_product(self, component_type, size):
+        rows = self.connection.execute("SELECT components.serial, batches.manufacture_date, batches.location, components.finish "
+                                       "FROM batches JOIN components ON components.batch_number = batches.batch_number "
+                                       "WHERE batches.component_type = ? AND batches.size = ? "
+                                       "ORDER BY components.serial", (component_type, size)).fetchall()
+        return [list(row) for row in rows]
+
+    def stock_levels(self):
+        stock_levels = {}
+        for component_type, size, location, state, amount in self.connection.execute(
+                "SELECT component_type, size, location, finish, amount FROM stock_levels WHERE amount != 0"):
+            stock_levels[stock_level_key(component_type, size, location, state)] = amount
+        return stock_levels
+
+    # The stock levels are counted again from the components table, with "repair" the table is filled again with the new counts
+    # The new counts are worked out inside the transaction that writes them, so a change made meanwhile by a station is not lost
+    def verify_stock_levels(self, repair=False):
+        stock_levels = self.stock_levels()
+        recounted = {}
+        for component_type, size, location, state, amount in self.connection.execute(SQLITE_COUNT_STOCK):
+            recounted[stock_level_key(component_type, size, location, state)] = amount
+        if repair and recounted != stock_levels:
+            with self.connection:
+                self.connection.execute("DELETE FROM stock_levels")
+                self.connection.execute("INSERT INTO stock_levels " + SQLITE_COUNT_STOCK)
+        return stock_levels, recounted
+
+    # Loads a batch and the status of each of its components, None is returned if there is no batch with that batch number
+    def load_batch(self, batch_number):
+        row = self.connection.execute("SELECT manufacture_date, component_type, size, location, amount_components "
+                                      "FROM batches WHERE batch_number = ?", (batch_number,)).fetchone()
+        if row is None:
+            return None
+        batch = Batch(batch_number, row[4], SerialNumberRange(batch_number, row[4]), row[3])
+        batch.manufacture_date = row[0]
+        batch.component_type = row[1]
+        batch.size = row[2]
+        for status, finish in self.connection.execute("SELECT status, finish FROM components WHERE batch_number = ? "
+                                                      "ORDER BY position", (batch_number,)):
+            batch.batch_status.append(status + "-" + finish)
+        return batch
+
+    # Saves the details of a batch, only the components whose status has changed are written
+    def save_batch(self, batch):
+        changed = []
+        for position, (status, finish) in enumerate(self.connection.execute(
+                "SELECT status, finish FROM components WHERE batch_number = ? ORDER BY position", (batch.batch_number,))):
+            if batch.batch_status[position] != status + "-" + finish:
+                changed.append(batch.batch_status[position].split("-", 1) + [batch.serial_numbers[position]])
+        with self.connection:
+            self.connection.execute("UPDATE batches SET manufacture_date = ?, component_type = ?, size = ?, location = ?, "
+                                    "amount_components = ? WHERE batch_number = ?",
+                                    (batch.manufacture_date, batch.component_type, batch.size, batch.location,
+                                     batch.amount_components, batch.batch_number))
+            self.connection.executemany("UPDATE components SET status = ?, finish = ? WHERE serial = ?", changed)
+
+    def build_batch(self, batch_number, manufacture_date, amount, component_type, size, location):
+        return build_lazy_batch(batch_number, manufacture_date, amount, component_type, size, location), []
+
+    # The batch and all of its components are written in one transaction, so either all of them are saved or none are
+    # Its components are added to the stock levels in the same transaction
+    def create_batch_records(self, batch, components):
+        rows = []
+        amounts = {}
+        for position in range(0, len(batch.serial_numbers)):
+            status, finish = batch.batch_status[position].split("-", 1)
+            rows.append((batch.serial_numbers[position], batch.batch_number, position, status, finish))
+            amounts[finish_state(finish)] = amounts.get(finish_state(finish), 0) + 1
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO batches VALUES (?, ?, ?, ?, ?, ?)",
+                                    (batch.batch_number, batch.manufacture_date, batch.component_type, batch.size,
+                                     batch.location, batch.amount_components))
+            self.connection.executemany("INSERT INTO components VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.executemany(SQLITE_ADD_STOCK, [(batch.component_type, batch.size, batch.location, state,
+                                                            amounts[state]) for state in amounts])
+
+    def delete_batch_records(self, batch):
+        with self.connection:
+            self.connection.execute(SQLITE_REMOVE_BATCH_STOCK.format("?1", "SELECT component_type, size, location FROM batches "
+                                                                           "WHERE batch_number = ?1"), (batch.batch_number,))
+            self.connection.execute("DELETE FROM components WHERE batch_number = ?", (batch.batch_number,))
+            self.connection.execute("DELETE FROM batches WHERE batch_number = ?", (batch.batch_number,))
+
+    # Loads the component with this serial number, None is returned if nothing matches
+    def load_component(self, serial_number):
+        row = self.connection.execute("SELECT batches.manufacture_date, batches.component_type, batches.size, "
+                                      "components.status, components.finish FROM components "
+                                      "JOIN batches ON batches.batch_number = components.batch_number "
+                                      "WHERE components.serial = ?", (serial_number,)).fetchone()
+        if row is None:
+            return None
+        return Component(row[0], row[1], serial_number, row[2], row[3], row[4])
+
+    # Only the row of the component that has been changed is written, the rest of its batch is left alone
+    def save_component(self, component, batch):
+        with self.connection:
+            self.connection.execute("UPDATE components SET status = ?, finish = ? WHERE serial = ?",
+                                    (component.status, component.finish, component.serial))
+
+    # Only an unfinished component is changed, so a component finished by another station at the same time keeps its finish
+    def finish_component(self, serial_number, finish):
+        with self.connection:
+            changed = self.connection.execute("UPDATE components SET finish = ? WHERE serial = ? AND finish = 'Unfinished'",
+                                              (finish, serial_number)).rowcount
+        if changed == 1:
+            return "Unfinished"
+        row = self.connection.execute("SELECT finish FROM components WHERE serial = ?", (serial_number,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    # The location is read and changed in one transaction, which BEGIN IMMEDIATE locks before the read,
+    # so the previous location given back is the one that was really replaced, as the file stores give it
+    def allocate_batch(self, batch_number, location):
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute("SELECT location FROM batches WHERE batch_number = ?", (batch_number,)).fetchone()
+            if row is None:
+                return None
+            previous_location = row[0]
+            if previous_location == "Factory Floor - Warehouse Not Allocated" or previous_location == "None":
+                self.connection.execute("UPDATE batches SET location = ? WHERE batch_number = ?", (location, batch_number))
+        return previous_location
+
+    def finish_batch_components(self, batch, positions, finish):
+        rows = []
+        for position in positions:
+            status = batch.batch_status[position].split("-", 1)[0]
+            batch.batch_status[position] = status + "-" + finish
+            rows.append((finish, batch.serial_numbers[position]))
+        with self.connection:
+            self.connection.executemany("UPDATE components SET finish = ? WHERE serial = ?", rows)
+
+
+# These functions turn batches and components into json and back, which is how the inventory server and its menus pass them
+def batch_to_json(batch, statuses=True):
+    batch_json = {"batch_number": batch.batch_number, "manufacture_date": batch.manufacture_date,
+                  "component_type": batch.component_type, "size": batch.size, "location": batch.location,
+                  "amount_components": batch.amount_components}
+    if statuses:
+        batch_json["batch_status"] = list(batch.batch_status)
+    return batch_json
+
+
+def batch_from_json(batch_json):
+    batch = Batch(batch_json["batch_number"], batch_json["amount_components"],
+                  SerialNumberRange(batch_json["batch_number"], batch_json["amount_components"]), batch_json["location"])
+    batch.manufacture_date = batch_json["manufacture_date"]
+    batch.component_type = batch_json["component_type"]
+    batch.size = batch_json["size"]
+    for status in batch_json.get("batch_status", []):
+        batch.batch_status.append(status)
+    return batch
+
+
+# Search results are sent grouped by batch, the same way the product index keeps them, which is much smaller than a row per component
+# Each group is the batch number, manufacture date, location, amount of components and the finish of any component that is not "Unfinished"
+def search_groups_from_rows(rows):
+    groups = []
+    for serial, manufacture_date, location, finish in rows:
+        if len(groups) == 0 or groups[-1][0] != serial[0:12]:
+            groups.append([serial[0:12], manufacture_date, location, 0, {}])
+        groups[-1][3] = groups[-1][3] + 1
+        if finish != "Unfinished":
+            groups[-1][4][serial[13:17]] = finish
+    return groups
+
+
+def search_rows_from_groups(groups):
+    rows = []
+    for batch_number, manufacture_date, location, amount, finishes in groups:
+        for x in range(1, amount + 1):
+            suffix = str(x).zfill(4)
+            rows.append([batch_number + "-" + suffix, manufacture_date, location, finishes.get(suffix, "Unfinished")])
+    return rows
+
+
+def component_to_json(component):
+    return {"serial": component.serial, "manufacture_date": component.manufacture_date,
+            "component_type": component.component_type, "size": component.size, "status": component.status,
+            "finish": component.finish}
+
+
+def component_from_json(component_json):
+    return Component(component_json["manufacture_date"], component_json["component_type"], component_json["serial"],
+                     component_json["size"], component_json["status"], component_json["finish"])
+
+
+# create class RemoteStore - used by the menu when it is a client of an inventory server
+# It has the same methods the menu uses on the other stores, but each one is a request to the server, which owns the "Data" directory
+class RemoteStore:
+    def __init__(self, address):
+        self.address = address.rstrip("/")
+
+    # Sends a request to the server and returns the json it answers with, None is returned if the server says it was not found
+    # A problem reported by the server, such as a component that cannot be finished, is raised as a ValueError
+    # urllib.request takes a while to import, so it is only imported by a station that uses a server
+    def request(self, method, path, body=None):
+        import urllib.error
+        import urllib.request
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+        server_request = urllib.request.Request(self.address + path, data, {"Content-Type": "application/json"}, method=method)
+        try:
+            with urllib.request.urlopen(server_request) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as error:
+            if error.code == 404:
+                return None
+            raise ValueError(json.loads(error.read().decode("utf-8"))["error"])
+
+    def batch_numbers(self):
+        return self.request("GET", "/batch-numbers")
+
+    def new_batch_number(self, manufacture_date):
+        return self.request("GET", "/batch-numbers/next?" + urllib.parse.urlencode({"date": manufacture_date}))["batch_number"]
+
+    def create_batch(self, manufacture_date, amount, component_type, size, location):
+        return batch_from_json(self.request("POST", "/batches", {"date": manufacture_date, "amount": amount,
+                                                                  "component_type": component_type, "size": size,
+                                                                  "location": location}))
+
+    # Many batches are sent in one request, so the server creates them as one transaction the same way "create_batches" does
+    def create_batches(self, batch_specs, manufacture_date):
+        return self.request("POST", "/batches", {"date": manufacture_date, "specs": batch_specs})
+
+    def list_batches(self, batch_numbers):
+        for batch_json in self.request("GET", "/batches"):
+            yield batch_from_json(batch_json)
+
+    # Only the page being shown is sent by the server
+    def batch_page(self, page_size, after=None, before=None, start_date=None, end_date=None, count_total=False):
+        query = {"limit": page_size}
+        for name, value in [("after", after), ("before", before), ("from", start_date), ("to", end_date)]:
+            if value:
+                query[name] = value
+        if count_total:
+            query["total"] = "1"
+        page = self.request("GET", "/batches/page?" + urllib.parse.urlencode(query))
+        page["batches"] = [batch_from_json(batch_json) for batch_json in page["batches"]]
+        return page
+
+    def load_batch(self, batch_number):
+        batch_json = self.request("GET", "/batches/" + urllib.parse.quote(batch_number))
+        if batch_json is None:
+            return None
+        return batch_from_json(batch_json)
+
+    def load_component(self, serial_number):
+        component_json = self.request("GET", "/components/" + urllib.parse.quote(serial_number))
+        if component_json is None:
+            return None
+        return component_from_json(component_json)
+
+    def allocate_batch(self, batch_number, location):
+        answer = self.request("POST", "/batches/" + urllib.parse.quote(batch_number) + "/allocate", {"location": location})
+        if answer is None:
+            return None
+        return answer["previous_location"]
+
+    def search_product(self, component_type, size):
+        groups = self.request("GET", "/search?" + urllib.parse.urlencode({"component_type": component_type, "size": size}))
+        return search_rows_from_groups(groups)
+
+    def stock_levels(self):
+        return self.request("GET", "/stock-levels")
+
+    def finish_component(self, serial_number, finish):
+        answer = self.request("POST", "/components/" + urllib.parse.quote(serial_number) + "/finish", {"finish": finish})
+        if answer is None:
+            return None
+        return answer["previous_finish"]
+
+    def finish_components(self, serial_numbers, finish):
+        return self.request("POST", "/finish", {"serials": serial_numbers, "finish": finish})
+
+
+# This function copies every batch in a "Data" directory into its Inventory.db database for the "sqlite" storage backend
+# The pickle files are left where they are, so the other storage backends can still be used with the same "Data" directory
+# The amount of batches copied and the amount skipped because they were already in the database are returned
+def migrate_to_sqlite(data_directory):
+    pickle_store = PickleStore(data_directory)
+    sqlite_store = SqliteStore(data_directory)
+    batches_migrated = 0
+    batches_skipped = 0
+
+    json_data = get_batch_index()
+    if json_data is None:
+        json_data = []
+
+    for batch in pickle_store.list_batches(json_data):
+        batch_number = batch.batch_number
+        if sqlite_store.load_batch(batch_number) is not None:
+            batches_skipped = batches_skipped + 1
+            continue
+        sqlite_store.create_batch_records(batch, [])
+        batches_migrated = batches_migrated + 1
+    return batches_migrated, batches_skipped
+
+
+# This function converts an existing "Data" directory from the "pickle" layout to the "batchfile" or "lazy" layout
+# Each batch record is written in the new layout before the separate component files are removed
+# The "sqlite" backend removes no files, so its second number is the amount of batches that were already in the database
+def migrate_data_directory(data_directory, backend="batchfile"):
+    if backend == "lazy":
+        return migrate_to_lazy_batches(data_directory)
+    if backend == "sqlite":
+        return migrate_to_sqlite(data_directory)
+
+    store = BatchFileStore(data_directory)
+    batches_migrated = 0
+    files_removed = 0
+
+    json_data = get_batch_index()
+    if json_data is None:
+        json_data = []
+
+    for batch in store.list_batches(json_data):
+        batch_number = batch.batch_number
+        # Batches that are lazy or already hold their components do not need converting
+        if is_lazy_batch(batch) or len(getattr(batch, "components", [])) > 0:
+            continue
+
+        components = []
+        for serial_number in batch.serial_numbers:
+            path = store.record_path(serial_number)
+            if os.path.isfile(path):
+                components.append(load_record(path))
+
+        # A batch is only converted when every one of its component files was found
+        if len(components) != len(batch.serial_numbers):
+            print("Skipping batch " + batch_number + ": " + str(len(batch.serial_numbers) - len(components)) +
+                  " component file(s) missing")
+            continue
+
+        store.rewrite_batch_records(batch, components)
+        for serial_number in batch.serial_numbers:
+            os.remove(store.record_path(serial_number))
+            files_removed = files_removed + 1
+        batches_migrated = batches_migrated + 1
+
+    return batches_migrated, files_removed
+
+
+# This function converts every batch to a lazy batch, the batch status already holds the status and finish of every component
+# so the component files and any components kept inside the batch record are no longer needed
+def migrate_to_lazy_batches(data_directory):
+    store = LazyBatchStore(data_directory)
+    batches_migrated = 0
+    files_removed = 0
+
+    json_data = get_batch_index()
+    if json_data is None:
+        json_data = []
+
+    for batch in store.list_batches(json_data):
+        if is_lazy_batch(batch):
+            continue
+
+        serial_numbers = list(batch.serial_numbers)
+        store.rewrite_batch_records(make_lazy_batch(batch), [])
+        for serial_number in serial_numbers:
+            if os.path.isfile(store.record_path(serial_number)):
+                os.remove(store.record_path(serial_number))
+                files_removed = files_removed + 1
+        batches_migrated = batches_migrated + 1
+
+    return batches_migrated, files_removed
+
+
+# This function checks if a file name is a batch record, in the form YYYYMMDDXXXX.pck, or a component record, YYYYMMDDXXXX-XXXX.pck
+def is_record_file_name(file_name):
+    if len(file_name) == 16:
+        return file_name[0:12].isdigit() and file_name[12:16] == ".pck"
+    if len(file_name) == 21:
+        return is_serial_number(file_name[0:17]) and file_name[17:21] == ".pck"
+    return False
+
+
+# This function moves every record file in the "Data" directory into the "flat" or "dated" layout and returns how many were moved
+# Each file is renamed rather than copied, so a record is never half written, and the index files do not change as they only hold numbers
+# It should be run while no station is using the "Data" directory, then INVENTORY_LAYOUT is set to the new layout
+def migrate_data_layout(data_directory, layout):
+    files_moved = 0
+    if layout == "dated":
+        for file_name in list_directory(data_directory):
+            if is_record_file_name(file_name):
+                directory = record_directory(data_directory, file_name, "dated")
+                os.makedirs(directory, exist_ok=True)
+                os.replace(data_directory + file_name, directory + file_name)
+                files_moved = files_moved + 1
+    else:
+        for directory in list(dated_directories(data_directory)):
+            for file_name in list_directory(directory):
+                if is_record_file_name(file_name):
+                    os.replace(directory + file_name, data_directory + file_name)
+                    files_moved = files_moved + 1
+            # The day, month and year directories are removed once they are empty
+            for empty_directory in [directory, os.path.dirname(directory[:-1]), os.path.dirname(os.path.dirname(directory[:-1]))]:
+                try:
+                    os.rmdir(empty_directory)
+                except OSError:
+                    break
+    batch_cache.clear()
+    return files_moved
+
+
+# This generator yields the path of every record file in the "Data" directory, in the layout chosen with INVENTORY_LAYOUT
+def record_file_paths(data_directory):
+    if get_data_layout() == "dated":
+        directories = dated_directories(data_directory)
+    else:
+        directories = [data_directory]
+    for directory in directories:
+        for file_name in sorted(list_directory(directory)):
+            if is_record_file_name(file_name):
+                yield directory + file_name
+
+
+# This function saves every record file in the "Data" directory again in the "pickle" or "json" record format
+# Records already in that format are left alone, it returns how many records were converted and how many were already converted
+# Each record is replaced whole, so it can be run again if it is stopped part way through
+def migrate_record_format(data_directory, record_format):
+    records_converted = 0
+    records_skipped = 0
+    previous_format = os.environ.get("INVENTORY_RECORD_FORMAT")
+    os.environ["INVENTORY_RECORD_FORMAT"] = record_format
+    try:
+        for path in record_file_paths(data_directory):
+            with open(path, 'rb') as in_file:
+                data = in_file.read()
+            if data.startswith(RECORD_MAGIC) == (record_format == "json"):
+                records_skipped = records_skipped + 1
+                continue
+            save_record(path, decode_record(data))
+            records_converted = records_converted + 1
+    finally:
+        if previous_format is None:
+            os.environ.pop("INVENTORY_RECORD_FORMAT")
+        else:
+            os.environ["INVENTORY_RECORD_FORMAT"] = previous_format
+    batch_cache.clear()
+    return records_converted, records_skipped
+
+
+# This generator yields the batch number of every batch file in a list of file names
+def batch_record_names(list_of_files):
+    for file_name in list_of_files:
+        # This code is checking to see if the file matches the criteria for a batch file including the file type and length of the file name
+        if file_name[12:16] == ".pck" and len(file_name) == 16:
+            # Attempts to convert any matching filenames to integers since a batch file should not contain any letters or non integer characters
+            try:
+                int(file_name[0:12])
+                yield file_name[0:12]
+            except ValueError:
+                pass
+
+
+# This generator yields the directories of the "dated" layout for every day between two dates in the form YYYYMMDD, in date order
+# Only the year and month directories that can hold those days are listed, so the directories of other years are never read
+def dated_directories(data_directory, start_date=None, end_date=None):
+    low, high = batch_number_range(start_date, end_date)
+    for year in sorted(list_directory(data_directory)):
+        if len(year) != 4 or not year.isdigit() or not low[0:4] <= year <= high[0:4]:
+            continue
+        for month in sorted(list_directory(data_directory + year)):
+            if len(month) != 2 or not month.isdigit() or not low[0:6] <= year + month <= high[0:6]:
+                continue
+            for day in sorted(list_directory(data_directory + year + os.sep + month)):
+                if len(day) == 2 and day.isdigit() and low[0:8] <= year + month + day <= high[0:8]:
+                    yield data_directory + year + os.sep + month + os.sep + day + os.sep
+
+
+# This function returns the batch number of every batch file in the "Data" directory made between two dates, in order
+# With the "dated" layout only the directories of those days are listed, with the "flat" layout every file has to be listed
+# If a "scan_report" dictionary is given, the amount of directories listed and files looked at are added to it
+def batch_record_numbers(data_directory, start_date=None, end_date=None, scan_report=None):
+    if scan_report is None:
+        scan_report = {}
+    scan_report.setdefault("directories", 0)
+    scan_report.setdefault("files", 0)
+
+    low, high = batch_number_range(start_date, end_date)
+    if get_data_layout() == "dated":
+        batch_numbers = []
+        for directory in dated_directories(data_directory, start_date, end_date):
+            list_of_files = list_directory(directory)
+            scan_report["directories"] = scan_report["directories"] + 1
+            scan_report["files"] = scan_report["files"] + len(list_of_files)
+            batch_numbers.extend(batch_record_names(list_of_files))
+        return sorted(batch_numbers)
+
+    # "os.listdir()" SOURCE: https://stackoverflow.com/questions/3207219/how-do-i-list-all-files-of-a-directory
+    # We found this code which lists all the files in a directory which we use throughout the program in different ways
+    list_of_files = list_directory(data_directory)
+    scan_report["directories"] = scan_report["directories"] + 1
+    scan_report["files"] = scan_report["files"] + len(list_of_files)
+
+    # The minimum amount of files that should exist for a batch is 2 and 3 if you include the index file
+    # With the "batchfile" storage backend a batch is a single file, so 2 files including the index is enough
+    if len(list_of_files) < 2:
+        return []
+    return sorted(batch_number for batch_number in batch_record_names(list_of_files) if low <= batch_number <= high)
+
+
+# The last time the batch index had to be rebuilt by looking at every file, how long it took and how many files were looked at
+last_index_scan = {}
+
+
+# This function is used to restore the BatchIndex.json file by looking for every batch file in the "Data" directory
+# It is the last resort, when the index cannot be recovered from BatchIndex.checkpoint and BatchIndex.log, see "recover_batch_index"
+# How long it took and how many files were looked at are kept in "last_index_scan" and printed, as it can take a long time
+def restore_batch_index(data_directory):
+    start = time.perf_counter()
+    scan_report = {}
+    # The batch numbers are sorted so that the last one in the index is always the newest batch
+    list_of_batches = batch_record_numbers(data_directory, scan_report=scan_report)
+    last_index_scan.clear()
+    last_index_scan.update(scan_report, batches=len(list_of_batches), seconds=time.perf_counter() - start)
+
+    # If batch files are located then they are added to the BatchIndex.json file
+    # BatchIndex.log is started again as every batch number is now in BatchIndex.json
+    if len(list_of_batches) > 0:
+        print("Rebuilt the batch index from " + str(len(list_of_batches)) + " batch file(s), looking at " +
+              str(scan_report["files"]) + " file(s) in " + str(scan_report["directories"]) + " director(ies) in " +
+              "%.3f" % last_index_scan["seconds"] + " seconds", file=sys.stderr)
+        save_index_checkpoint(data_directory, list_of_batches)
+        write_file_atomically(data_directory + "BatchIndex.json", json.dumps(list_of_batches))
+        reset_index_log(data_directory, list_of_batches)
+        return list_of_batches
+
+    # If no batches are found then we just dump the basic [] to the file
+    else:
+        save_index_checkpoint(data_directory, [])
+        write_file_atomically(data_directory + "BatchIndex.json", json.dumps([]))
+        reset_index_log(data_directory, [])
+        return None
+
+
+# BatchIndex.checkpoint is a second copy of BatchIndex.json, written each time BatchIndex.json is written in full
+# Together with BatchIndex.log, which holds every batch number added since, it is enough to recover a lost or damaged BatchIndex.json
+# without looking at the batch files
+def save_index_checkpoint(data_directory, json_data):
+    write_file_atomically(data_directory + "BatchIndex.checkpoint", json.dumps(json_data))
+
+
+# This function recovers the batch index from BatchIndex.checkpoint and BatchIndex.log, None is returned if that is not possible
+# The batch numbers only ever grow, so any batch number in the log that comes after the last one in the checkpoint is added to it
+def recover_batch_index(data_directory):
+    try:
+        with open(data_directory + "BatchIndex.checkpoint") as checkpoint_file:
+            checkpoint = parse_batch_index(checkpoint_file.read())
+    except OSError:
+        return None
+    header = read_index_log_header(data_directory)
+    if header is None and repair_index_log(data_directory):
+        header = read_index_log_header(data_directory)
+    if checkpoint is None or header is None or len(checkpoint) < header[1]:
+        return None
+    log_entries = read_index_log_entries(data_directory)
+    if log_entries is None:
+        return None
+
+    json_data = checkpoint + [batch_number for batch_number in log_entries if len(checkpoint) == 0 or batch_number > checkpoint[-1]]
+    save_index_checkpoint(data_directory, json_data)
+    write_file_atomically(data_directory + "BatchIndex.json", json.dumps(json_data))
+    reset_index_log(data_directory, json_data)
+    print("Recovered the batch index of " + str(len(json_data)) + " batch(es) from BatchIndex.checkpoint and BatchIndex.log",
+          file=sys.stderr)
+    return json_data
+
+
+# This function repairs BatchIndex.log when the program stopped part way through adding a line to it
+# A batch number is added to the log before any of its batch's files are written, so the part written line is simply removed
+# False is returned if the header of the log is damaged, as then the log cannot be trusted
+def repair_index_log(data_directory):
+    try:
+        with open(data_directory + "BatchIndex.log", 'r+b') as log_file:
+            header = log_file.read(INDEX_LOG_HEADER_LENGTH).decode("ascii").split()
+            if len(header) != 4 or header[0] != "LAST" or header[2] != "SNAPSHOT" or not header[3].isdigit():
+                return False
+            log_size = os.fstat(log_file.fileno()).st_size
+            log_file.truncate(log_size - (log_size - INDEX_LOG_HEADER_LENGTH) % INDEX_LOG_ENTRY_LENGTH)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+    except (OSError, UnicodeDecodeError):
+        return False
+    return read_index_log_header(data_directory) is not None
+
+
+# The BatchIndex.json file can be checked in two ways, chosen with the INVENTORY_INDEX_VALIDATION environment variable
+# "parsed" (the default) reads the json once and checks the list of batch numbers in it
+# "characters" is the original check which looks at every character of the file before it is read as json
+def get_index_validation_mode():
+    if os.environ.get("INVENTORY_INDEX_VALIDATION") == "characters":
+        return "characters"
+    return "parsed"
+
+
+# This function is the original check of the BatchIndex.json file and returns how many errors were found in it
+def count_batch_index_errors(read_json_file):
+    # The "index_errors" variable is declared as the integer 0 to represent no errors
+    # Each time a problem is found with the batch file, for example incorrect formatting or unaccepted characters, the "index_errors" variable is increased by 1 for each error
+    index_errors = 0
+
+    # A file which simply has [] in it is a correct but empty json file
+    if len(read_json_file) == 2 and read_json_file[0] == "[" and read_json_file[1] == "]":
+        index_errors = 0
+    # If the file is empty then an error is found
+    elif len(read_json_file) == 0:
+        index_errors = index_errors + 1
+    # If the file is less than the minimum length possible for a batch number to exist but in the correct format, an error is found
+    elif len(read_json_file) < 16 and read_json_file[0] == "[" and read_json_file[-1] == "]":
+        index_errors = index_errors + 1
+    # If the file has less than two bits in it, an error is found
+    elif len(read_json_file) < 2:
+        index_errors = index_errors + 1
+    # If the file does not start and end with [ and ] then an error is found
+    elif read_json_file[0] != "[" or read_json_file[-1] != "]":
+        index_errors = index_errors + 1
+    # If the file is in the correct format then the program checks for unaccepted characters
+    elif read_json_file[0] == "[" and read_json_file[-1] == "]":
+        # If the second and second last character in the file is " then characters are checked, else an error is found
+        if read_json_file[1] == '"' and read_json_file[-2] == '"':
+            for x in range(2, len(read_json_file) - 2):
+                # If any letters are found then an error is found
+                if read_json_file[x].isupper() or read_json_file[x].islower():
+                    index_errors = index_errors + 1
+                else:
+                    # If any bits cannot be converted to integers (batch numbers) then an error is found
+                    try:
+                        int(read_json_file[x])
+                    except ValueError:
+                        if read_json_file[x] == '"' or read_json_file[x] == "," or read_json_file[x] == " ":
+                            index_errors = index_errors
+                        else:
+                            index_errors = index_errors + 1
+        else:
+            index_errors = index_errors + 1
+
+    return index_errors
+
+
+# This function reads the contents of the BatchIndex.json file once and checks the list instead of every character
+# The file must hold a list of 12 digit batch numbers, anything else means it is corrupt and None is returned
+def parse_batch_index(read_json_file):
+    try:
+        json_data = json.loads(read_json_file)
+    except ValueError:
+        return None
+
+    if not isinstance(json_data, list):
+        return None
+    for batch_number in json_data:
+        if not isinstance(batch_number, str) or len(batch_number) != 12 or not batch_number.isdigit() or not batch_number.isascii():
+            return None
+    return json_data
+
+
+# This function is used to open the BatchIndex.json file for use in the program
+# This code exists as a function so that it can be repeatedly called on whenever needed
+# The index files are replaced whole when they are written, so most of the time the batch index can be read without locking it
+# If anything is missing, corrupt or out of date it is read again while it is locked, and repaired if it needs to be
+def get_batch_index():
+
+    # Calling this function returns the location of the "Data" folder
+    data_directory = get_data_directory()
+    json_data = peek_batch_index(data_directory)
+    if json_data is not None:
+        return json_data
+    with get_file_lock(data_directory, "BatchIndex"):
+        return read_batch_index(data_directory)
+
+
+# This function reads the batch index without locking or changing it, None is returned if it would have to be repaired
+# A line that another station is adding to BatchIndex.log at the same moment looks like a corrupt log, so that is read again while locked
+def peek_batch_index(data_directory):
+    try:
+        json_data = batch_index_cache.load(data_directory + "BatchIndex.json")
+    except OSError:
+        return None
+    header = read_index_log_header(data_directory)
+    if json_data is None or header is None or header[1] != len(json_data):
+        return None
+    log_entries = read_index_log_entries(data_directory)
+    if log_entries is None:
+        return None
+    return json_data + log_entries
+
+
+# The batch index is repaired in steps, starting with the one that reads the least:
+# a part written last line of BatchIndex.log is removed, then a lost or damaged BatchIndex.json is recovered from BatchIndex.checkpoint
+# and BatchIndex.log, and only if neither works is every file in the "Data" directory looked at to find the batch files
+def read_batch_index(data_directory):
+
+    # "os.path.isfile()" SOURCE: https://stackoverflow.com/questions/82831/how-do-i-check-whether-a-file-exists-without-exceptions
+    # We found this code which checks if a file exists which helps prevent errors from crashing the program
+    # If the BatchIndex.json file does not exist then it is recovered, or restored from the batch files
+    if not os.path.isfile(data_directory + 'BatchIndex.json'):
+        json_data = recover_batch_index(data_directory)
+        if json_data is not None:
+            return json_data
+        return restore_batch_index(data_directory)
+
+    # The file is opened with the read function instead of load which allows us to inspect the file without causing the program to return an error
+    with open(data_directory + "BatchIndex.json") as json_file:
+        read_json_file = json_file.read()
+
+    # The contents of the file are checked using the validation mode in use, None means the file is corrupt
+    if get_index_validation_mode() == "characters":
+        json_data = None
+        if count_batch_index_errors(read_json_file) == 0:
+            json_data = parse_batch_index(read_json_file)
+    else:
+        json_data = parse_batch_index(read_json_file)
+
+    # If errors are found then recovery, and then restoration, is attempted
+    if json_data is None:
+        recovered_index = recover_batch_index(data_directory)
+        if recovered_index is not None:
+            return recovered_index
+        return restore_batch_index(data_directory)
+
+    # Batch numbers added since BatchIndex.json was last written are read from BatchIndex.log
+    # If there is no log yet it is started from BatchIndex.json, along with the first checkpoint
+    # An index that is simply [] and has no log yet comes from before the log was used, or was made by hand, so it is restored/populated once
+    # After that an empty index is trusted, as every batch is added to the log before any of its files are written
+    if not os.path.isfile(data_directory + "BatchIndex.log"):
+        if json_data == []:
+            restored_index = restore_batch_index(data_directory)
+            if restored_index is not None:
+                return restored_index
+            return []
+        save_index_checkpoint(data_directory, json_data)
+        reset_index_log(data_directory, json_data)
+
+    # If the program stopped part way through adding a line to the log, the part written line is removed
+    header = read_index_log_header(data_directory)
+    if header is None and repair_index_log(data_directory):
+        header = read_index_log_header(data_directory)
+
+    # BatchIndex.json holding fewer batch numbers than the log says it should means it has been damaged or replaced with an older copy
+    if header is not None and len(json_data) < header[1]:
+        recovered_index = recover_batch_index(data_directory)
+        if recovered_index is not None:
+            return recovered_index
+        return restore_batch_index(data_directory)
+
+    # If the program stopped after BatchIndex.json was rewritten but before the log was started again, the log is out of date
+    # BatchIndex.json already holds every batch number in that case, so the log is started again from it
+    if header is not None and header[1] != len(json_data):
+        reset_index_log(data_directory, json_data)
+    log_entries = read_index_log_entries(data_directory)
+    if log_entries is None:
+        return restore_batch_index(data_directory)
+    return json_data + log_entries
+
+
+# This function reads and checks BatchIndex.json for the batch index cache, None is returned if it is corrupt
+def load_batch_index_file(path):
+    with open(path) as json_file:
+        read_json_file = json_file.read()
+    if get_index_validation_mode() == "characters" and count_batch_index_errors(read_json_file) != 0:
+        return None
+    return parse_batch_index(read_json_file)
+
+
+# BatchIndex.json only has to be read again once it has been rewritten
+batch_index_cache = BatchCache(4, load_batch_index_file)
+
+
+# The BatchIndex.log file holds the batch numbers that have been added since BatchIndex.json was last written
+# It starts with a fixed size header line holding the last batch number and how many batch numbers are in BatchIndex.json
+# This is followed by one 13 character line for each batch number added since, so adding a batch is a single append to the file
+# The last batch number is always the last line of the file, or the header if no lines have been added, so it is found without reading the whole file
+INDEX_LOG_HEADER_LENGTH = 38
+INDEX_LOG_ENTRY_LENGTH = 13
+
+# BatchIndex.log is folded back into BatchIndex.json once it holds as many batch numbers as BatchIndex.json, and at least this many
+INDEX_LOG_COMPACT_MINIMUM = 1000
+
+
+# This function starts a new BatchIndex.log after BatchIndex.json has been written with the full list of batch numbers
+def reset_index_log(data_directory, json_data):
+    last_batch_number = "0" * 12
+    if len(json_data) > 0:
+        last_batch_number = json_data[-1]
+    write_file_atomically(data_directory + "BatchIndex.log",
+                          "LAST " + last_batch_number + " SNAPSHOT " + str(len(json_data)).zfill(10) + "\n")
+
+
+# This function reads the header of BatchIndex.log and returns the last batch number, the amount of batch numbers in BatchIndex.json
+# and the amount of lines added to the log since, None is returned if the log is missing or corrupt
+def read_index_log_header(data_directory):
+    try:
+        with open(data_directory + "BatchIndex.log", 'rb') as log_file:
+            header = log_file.read(INDEX_LOG_HEADER_LENGTH).decode("ascii").split()
+            log_size = os.fstat(log_file.fileno()).st_size
+            log_entries = (log_size - INDEX_LOG_HEADER_LENGTH) // INDEX_LOG_ENTRY_LENGTH
+
+            # A line that was only partly written means the log is corrupt
+            if (log_size - INDEX_LOG_HEADER_LENGTH) % INDEX_LOG_ENTRY_LENGTH != 0:
+                return None
+            if len(header) != 4 or header[0] != "LAST" or header[2] != "SNAPSHOT" or not header[3].isdigit():
+                return None
+
+            last_batch_number = header[1]
+            if log_entries > 0:
+                log_file.seek(INDEX_LOG_HEADER_LENGTH + (log_entries - 1) * INDEX_LOG_ENTRY_LENGTH)
+                last_batch_number = log_file.read(12).decode("ascii")
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    return last_batch_number, int(header[3]), log_entries
+
+
+# This function reads every batch number added to BatchIndex.log since BatchIndex.json was written, None is returned if the log is corrupt
+def read_index_log_entries(data_directory):
+    if read_index_log_header(data_directory) is None:
+        return None
+    with open(data_directory + "BatchIndex.log") as log_file:
+        log_file.seek(INDEX_LOG_HEADER_LENGTH)
+        log_entries = log_file.read().split()
+    for batch_number in log_entries:
+        if len(batch_number) != 12 or not batch_number.isdigit():
+            return None
+    return log_entries
+
+
+# This function writes every batch number into BatchIndex.json and starts BatchIndex.log again
+# BatchIndex.checkpoint is written first, so if the program stops part way through there is always a whole copy to recover from
+def compact_batch_index(data_directory):
+    json_data = get_batch_index()
+    if json_data is None:
+        json_data = []
+    save_index_checkpoint(data_directory, json_data)
+    write_file_atomically(data_directory + "BatchIndex.json", json.dumps(json_data))
+    reset_index_log(data_directory, json_data)
+
+
+# The purpose of this function is to add a batch number to the index of batch numbers used
+# The batch number is appended to BatchIndex.log so the cost does not grow with the amount of batches in the system
+def save_index(batch_number):
+
+    data_directory = get_data_directory()
+
+    # The batch index is locked so that two stations do not add to the log at the same time
+    with get_file_lock(data_directory, "BatchIndex"):
+        # If BatchIndex.log is missing or corrupt, loading the index creates it again
+        header = read_index_log_header(data_directory)
+        if header is None:
+            get_batch_index()
+            header = read_index_log_header(data_directory)
+
+        # The new line is flushed to the disk before the lock is let go
+        with open(data_directory + "BatchIndex.log", 'a') as log_file:
+            log_file.write(batch_number + "\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        # Once the log has grown as large as BatchIndex.json it is folded back into it
+        if header[2] + 1 >= max(INDEX_LOG_COMPACT_MINIMUM, header[1]):
+            compact_batch_index(data_directory)
+
+
+# The purpose of this function is to generate the next batch number based on previously used numbers
+# The last batch number used is read from BatchIndex.log without loading the whole index
+def new_batch_number(manufacture_date):
+    data_directory = get_data_directory()
+    with get_file_lock(data_directory, "BatchIndex"):
+        header = read_index_log_header(data_directory)
+        if header is None:
+            get_batch_index()
+            header = read_index_log_header(data_directory)
+
+    # "str().zfill()" SOURCE: https://stackoverflow.com/questions/339007/nicest-way-to-pad-zeroes-to-a-string
+    # We found the code snippet above which allows us to pad the batch numbers with zero's to make the correct format
+
+    # This if statement detects whether or not the index is empty, if it is the batch number is the current date and 1
+    if header is not None and header[0] != "0" * 12:
+        # Get last batch number, identify its date, identify the last serial and calculate the next in the sequence
+        last_batch_number = header[0]
+        last_batch_date = last_batch_number[0:8]
+        last_batch_serial = int(last_batch_number[8:12])
+        next_batch_serial = last_batch_serial + 1
+
+        # If the last batch number is the current date, the number is increased by one (if it's less than the maximum)
+        if last_batch_date == manufacture_date:
+            next_batch_number = manufacture_date + str(next_batch_serial).zfill(4)
+            return next_batch_number
+
+        # If the last batch number is not the current date, then the next batch number is the current date starting at 1
+        elif last_batch_date != manufacture_date:
+            next_batch_number = manufacture_date + str(1).zfill(4)
+            return next_batch_number
+
+    else:
+        next_batch_number = manufacture_date + str(1).zfill(4)
+        return next_batch_number
+
+
+# The serial and product indexes are kept like the batch index, so changing one batch costs the same however many batches there are
+# "<name>.json" holds the whole index as it was when it was last written and "<name>.log" has a line for each batch changed since,
+# written with "write_ahead_log_line" so a line that was only partly written is found. The first line of the log is the "generation"
+# of the index file that it goes with. Once the log is as large as the index file, and at least INDEX_FILE_COMPACT_BYTES, the index file
+# is written again with the next generation and the log is started again
+INDEX_FILE_COMPACT_BYTES = 256 * 1024
+
+
+# create class IndexFile - an index of a "Data" directory that is kept in memory and brought up to date from its log
+# The index file is read once, and after that only the lines added to the log since it was last read, so a lookup is a dictionary
+# lookup. A log with a new file number means the index file has been written again, so the index file is read again as well
+# Each kind of index is a class based on this one, which says how its index file is read and written and how a line changes it
+# "log_name" is the log the index is brought up to date from, and the lock held while it is changed, if it is not the index's own
+class IndexFile:
+    def __init__(self, data_directory, name, log_name=None):
+        if log_name is None:
+            log_name = name
+        self.data_directory = data_directory
+        self.log_name = log_name
+        self.path = data_directory + name + ".json"
+        self.log_path = data_directory + log_name + ".log"
+        # The threads of this program share the index, so only one of them reads or changes it at a time
+        self.lock = threading.RLock()
+        self.clear()
+
+    # Forgets the index, so it is read from its files again
+    def clear(self):
+        with self.lock:
+            self.loaded = False
+            self.generation = 0
+            self.log_generation = None
+            self.log_number = None
+            self.log_offset = 0
+            self.index_bytes = 0
+            self.empty()
+
+    # This reads the index file, index files from before the logs were added hold only the index and are generation 0
+    # False is returned if it is missing or corrupt
+    def load_index(self):
+        self.clear()
+        try:
+            with open(self.path, "rb") as index_file:
+                data = index_file.read()
+            json_data = json.loads(data.decode("utf-8"))
+            if isinstance(json_data, dict) and "generation" in json_data:
+                if not isinstance(json_data["generation"], int) or "index" not in json_data:
+                    return False
+                self.generation = json_data["generation"]
+                json_data = json_data["index"]
+            self.read_index(json_data)
+        except (OSError, ValueError):
+            self.clear()
+            return False
+        self.loaded = True
+        self.index_bytes = len(data)
+        return True
+
+    # This reads the lines added to the log since it was last read, the index file is read first if it has not been read yet
+    # or the log has been started again since. False is returned if the index file is missing or corrupt, a whole line of the log
+    # is corrupt, or the log goes with a different generation of the index file. A log with the generation before the index file's
+    # has already been written into it, this happens when a station stops between writing the index file and starting the log again
+    def read_log(self):
+        try:
+            with open(self.log_path, "rb") as log_file:
+                log_number = os.fstat(log_file.fileno()).st_ino
+                if not self.loaded or log_number != self.log_number:
+                    if not self.load_index():
+                        return False
+                    self.log_number = log_number
+                log_file.seek(self.log_offset)
+                data = log_file.read()
+        except FileNotFoundError:
+            # There is no log until the index is first changed
+            if not self.loaded or self.log_number is not None:
+                return self.load_index()
+            return True
+
+        # The last piece has no newline after it, it is a line that is still being written or was only partly written
+        for line in data.split(b"\n")[:-1]:
+            entry = read_write_ahead_log_line(line)
+            if not isinstance(entry, dict):
+                return False
+            if self.log_generation is None:
+                self.log_generation = entry.get("generation")
+                if self.log_generation != self.generation and self.log_generation != self.generation - 1:
+                    return False
+            elif self.log_generation == self.generation:
+                self.apply(entry)
+            self.log_offset = self.log_offset + len(line) + 1
+        return True
+
+    # This brings the index up to date with its files, False is returned if the index has to be rebuilt
+    # Another station may write the index file again while it is being read, so it is read a few times before giving up
+    def refresh(self):
+        with self.lock:
+            for attempt in range(0, 3):
+                if self.read_log():
+                    return True
+                self.clear()
+            return False
+
+    # This returns once the index is up to date, it is only locked if it has to be rebuilt
+    def update(self):
+        with self.lock:
+            if self.refresh():
+                return
+        with get_file_lock(self.data_directory, self.log_name):
+            with self.lock:
+                self.catch_up()
+
+    # This brings the index up to date while it is locked, before it is changed
+    # If it cannot be, it is rebuilt, and if the log does not go with the index file it is started again
+    # A line at the end of the log that was only partly written, by a station that stopped, is cut off
+    def catch_up(self):
+        if not self.refresh():
+            self.rebuild()
+        elif self.log_number is None or self.log_generation != self.generation:
+            self.start_log()
+        elif os.path.getsize(self.log_path) > self.log_offset:
+            os.truncate(self.log_path, self.log_offset)
+
+    # This adds lines to the log while the index is locked, with "missing_only" a line is only added if its batch is not in the index
+    # The lines are all for different batches, as each one is finished from the index as it was before any of them
+    # The index file is written again once the log is large enough
+    # The lines are flushed to the disk after the lock is let go, so other stations can add to the log while this one waits for the disk
+    # It still returns only once they are flushed, and a flush also flushes any lines added before them by other stations
+    def add_lines(self, lines, missing_only=False):
+        with get_file_lock(self.data_directory, self.log_name):
+            with self.lock:
+                self.catch_up()
+                if missing_only:
+                    lines = [line for line in lines if line["batch"] not in self.entries]
+                if len(lines) == 0:
+                    return
+                log_file = open(self.log_path, "ab")
+                try:
+                    for line in lines:
+                        self.prepare_line(line)
+                        log_file.write(write_ahead_log_line(line))
+                    log_file.flush()
+                    self.read_log()
+                    if self.log_offset >= max(INDEX_FILE_COMPACT_BYTES, self.index_bytes):
+                        self.compact()
+                except BaseException:
+                    log_file.close()
+                    raise
+        with log_file:
+            os.fsync(log_file.fileno())
+
+    # This starts the log again for the generation of the index file
+    def start_log(self):
+        write_file_atomically(self.log_path, write_ahead_log_line({"generation": self.generation}))
+        self.log_number = os.stat(self.log_path).st_ino
+        self.log_generation = self.generation
+        self.log_offset = os.path.getsize(self.log_path)
+
+    # This writes the whole index into the index file, with the next generation, and starts the log again
+    def compact(self):
+        self.generation = self.generation + 1
+        self.write_index()
+        self.start_log()
+
+    def write_index(self):
+        data = json.dumps({"generation": self.generation, "index": self.index_json()})
+        write_file_atomically(self.path, data)
+        self.index_bytes = len(data)
+
+    # This makes the index again from the batch records, while it is locked, when its files cannot be used
+    # The new index file has a later generation than the log, so the log is never added to it if the station stops before starting it again
+    def rebuild(self):
+        log_generation = None
+        try:
+            with open(self.log_path, "rb") as log_file:
+                header = read_write_ahead_log_line(log_file.readline()[:-1])
+            if isinstance(header, dict) and isinstance(header.get("generation"), int):
+                log_generation = header["generation"]
+        except OSError:
+            pass
+        self.clear()
+        self.rebuild_index()
+        self.loaded = True
+        if log_generation is not None:
+            self.generation = log_generation
+        self.compact()
+
+    # Each kind of index has its own version of these: "empty" empties the index in memory, "read_index" fills it from the json of
+    # its index file and raises ValueError if it is not an index, "apply" makes the change of one line of the log, "prepare_line"
+    # finishes a line before it is written, "index_json" returns the index to write into the index file and "rebuild_index" makes the
+    # index from the batch records
+    def empty(self):
+        self.entries = {}
+
+    def read_index(self, json_data):
+        raise ValueError("No index")
+
+    def apply(self, line):
+        pass
+
+    def prepare_line(self, line):
+        pass
+
+    def index_json(self):
+        return {}
+
+    def rebuild_index(self):
+        pass
+
+
+# Each "Data" directory has one object for each of its indexes so that the threads of this program share them
+index_files = {}
+index_files_guard = threading.Lock()
+
+
+def get_index_file(data_directory, index_class):
+    with index_files_guard:
+        if (data_directory, index_class) not in index_files:
+            index_files[(data_directory, index_class)] = index_class(data_directory)
+        return index_files[(data_directory, index_class)]
+
+
+# This forgets every index that has been read, so they are read from their files again
+def clear_index_files():
+    with index_files_guard:
+        index_files.clear()
+
+
+# The SerialIndex.json file lists every batch number with the amount of components in the batch and where they are stored
+# "component" means each component has its own pickle file and "batch" means the components are kept inside the batch record
+# A serial number is its batch number followed by its position in the batch, so this is enough to go straight to a component's record
+def serial_index_entry(batch):
+    if batch is None:
+        return [0, "missing"]
+    if len(getattr(batch, "components", [])) > 0 or is_lazy_batch(batch):
+        return [len(batch.serial_numbers), "batch"]
+    return [len(batch.serial_numbers), "component"]
+
+
+# create class SerialIndex - the serial index of a "Data" directory, kept in SerialIndex.json and SerialIndex.log
+# Each line of the log is a batch number with its entry, the entry is None once the batch's records have been deleted
+class SerialIndex(IndexFile):
+    def __init__(self, data_directory):
+        IndexFile.__init__(self, data_directory, "SerialIndex")
+
+    def read_index(self, json_data):
+        if not isinstance(json_data, dict):
+            raise ValueError("Not a serial index")
+        self.entries = json_data
+
+    def apply(self, line):
+        if line["entry"] is None:
+            self.entries.pop(line["batch"], None)
+        else:
+            self.entries[line["batch"]] = line["entry"]
+
+    def index_json(self):
+        return self.entries
+
+    # Batches in the batch index that have no batch record yet are left out, they are added when their records are written
+    def rebuild_index(self):
+        batch_numbers = get_batch_index() or []
+        for batch_number, entry in zip(batch_numbers, scan_batches(PickleStore(self.data_directory), batch_numbers,
+                                                                   serial_index_entry)):
+            if entry[1] != "missing":
+                self.entries[batch_number] = entry
+
+
+# This function returns a copy of the serial index of a "Data" directory, it is rebuilt if SerialIndex.json is missing or corrupt
+def get_serial_index(data_directory):
+    serial_index = get_index_file(data_directory, SerialIndex)
+    serial_index.update()
+    with serial_index.lock:
+        return dict(serial_index.entries)
+
+
+# This function adds or updates the serial index entry of a batch after its records have been written
+def add_serial_index_entry(data_directory, batch):
+    get_index_file(data_directory, SerialIndex).add_lines([{"batch": batch.batch_number, "entry": serial_index_entry(batch)}])
+
+
+# This function removes the serial index entry of a batch whose records have been deleted
+def remove_serial_index_entry(data_directory, batch_number):
+    get_index_file(data_directory, SerialIndex).add_lines([{"batch": batch_number, "entry": None}])
+
+
+# This function returns where the component with this serial number is stored, "component" or "batch", or None if it does not exist
+# Only the batch of the serial number is looked at. A batch that is not in the serial index, because the station that made it stopped
+# before adding it, is loaded and added to the index, unless another station has added it meanwhile
+def find_serial_record(data_directory, serial_number):
+    if len(serial_number) != 17 or serial_number[12:13] != "-":
+        return None
+    try:
+        position = int(serial_number[13:17])
+    except ValueError:
+        return None
+
+    serial_index = get_index_file(data_directory, SerialIndex)
+    serial_index.update()
+    entry = serial_index.entries.get(serial_number[0:12])
+    if entry is None:
+        batch = PickleStore(data_directory).load_batch(serial_number[0:12])
+        if batch is None:
+            return None
+        entry = serial_index_entry(batch)
+        serial_index.add_lines([{"batch": batch.batch_number, "entry": entry}], True)
+    if position < 1 or position > entry[0]:
+        return None
+    return entry[1]
+
+
+# The ProductIndex.json file is used by the product search so that it never has to open any batch or component files
+# Batches are grouped by their component type and size, for example "Rudder Pivot Pin|10mm diameter x 75mm length"
+# Each batch keeps its manufacture date, location and amount of components, plus the finish of every component that is no longer "Unfinished"
+def product_index_key(component_type, size):
+    return component_type + "|" + size
+
+
+# This function returns the product index key and entry of a batch for the scans that rebuild the product index
+def product_index_record(batch):
+    if batch is None:
+        return None
+    return [product_index_key(batch.component_type, batch.size), product_index_entry(batch)]
+
+
+def product_index_entry(batch):
+    finishes = {}
+    # A lazy batch already knows which components differ from the shared status so only those are looked at
+    if is_lazy_batch(batch):
+        positions = sorted(batch.batch_status.overrides)
+    else:
+        positions = range(0, len(batch.batch_status))
+    for x in positions:
+        # The batch status is the status and finish joined by "-", for example "Manufactured-Paint:AB12"
+        finish = batch.batch_status[x].split("-", 1)[1]
+        if finish != "Unfinished":
+            finishes[batch.serial_numbers[x][13:17]] = finish
+    return {"date": batch.manufacture_date, "location": batch.location, "amount": len(batch.serial_numbers),
+            "finishes": finishes}
+
+
+# Each line of ProductIndex.log is a batch number with the product index key and entry from its "product_index_record"
+# A batch number with no batch record, because the batch was never written or its records were deleted, has the key and entry None
+# When the line is written it is given "stock", the change it makes to the stock levels
+def product_index_line(batch_number, record):
+    if record is None:
+        return {"batch": batch_number, "key": None, "entry": None}
+    return {"batch": batch_number, "key": record[0], "entry": record[1]}
+
+
+# create class ProductIndex - the product index of a "Data" directory, kept in ProductIndex.json and ProductIndex.log
+# "products" holds the batches of each product index key for the product search, and "entries" holds the key of every batch number
+# in the index, or None for a batch number that has no batch, so a batch number is only looked up in the batch records once
+# "checked" is how many batch numbers at the start of the batch index are known to be in the index
+class ProductIndex(IndexFile):
+    def __init__(self, data_directory):
+        IndexFile.__init__(self, data_directory, "ProductIndex")
+
+    def empty(self):
+        self.entries = {}
+        self.products = {}
+        self.checked = 0
+
+    # The index file holds "products" and the batch numbers with no batch under "empty"
+    # Index files from before the log was added hold only the products
+    def read_index(self, json_data):
+        if not isinstance(json_data, dict):
+            raise ValueError("Not a product index")
+        empty = []
+        if "products" in json_data:
+            empty = json_data.get("empty")
+            json_data = json_data["products"]
+        if not isinstance(json_data, dict) or not isinstance(empty, list):
+            raise ValueError("Not a product index")
+        for key in json_data:
+            if not isinstance(json_data[key], dict):
+                raise ValueError("Not a product index")
+            for batch_number in json_data[key]:
+                self.entries[batch_number] = key
+        for batch_number in empty:
+            self.entries[batch_number] = None
+        self.products = json_data
+
+    def apply(self, line):
+        key = self.entries.get(line["batch"])
+        if key is not None:
+            del self.products[key][line["batch"]]
+            if len(self.products[key]) == 0:
+                del self.products[key]
+        self.entries[line["batch"]] = line["key"]
+        if line["key"] is not None:
+            self.products.setdefault(line["key"], {})[line["batch"]] = line["entry"]
+
+    def index_json(self):
+        return {"products": self.products,
+                "empty": sorted(batch_number for batch_number in self.entries if self.entries[batch_number] is None)}
+
+    # The change a line makes to the stock levels is worked out from the batch's entry before it, while the index is locked
+    def prepare_line(self, line):
+        line["stock"] = {}
+        key = self.entries.get(line["batch"])
+        if key is not None:
+            add_stock_levels(line["stock"], key, self.products[key][line["batch"]], -1)
+        if line["key"] is not None:
+            add_stock_levels(line["stock"], line["key"], line["entry"], 1)
+
+    # StockLevels.json is written after each generation of ProductIndex.json, with the stock levels counted from it
+    def write_index(self):
+        IndexFile.write_index(self)
+        write_file_atomically(self.data_directory + "StockLevels.json",
+                              json.dumps({"generation": self.generation, "index": count_stock_levels(self.products)}))
+
+    def rebuild_index(self):
+        for line in restore_product_index(self.data_directory, get_batch_index() or []):
+            self.apply(line)
+
+
+# This function makes the product index lines of a list of batches from their batch records, for rebuilding and checking the index
+def restore_product_index(data_directory, batch_numbers):
+    lines = []
+    for batch_number, record in zip(batch_numbers, scan_batches(PickleStore(data_directory), batch_numbers, product_index_record)):
+        lines.append(product_index_line(batch_number, record))
+    return lines
+
+
+# This function returns the product index of a "Data" directory brought up to date, it is rebuilt if ProductIndex.json is missing or corrupt
+# Batch numbers added to the batch index since it was last checked, that are not in the product index yet, are looked up in their
+# batch records without locking the index, then added unless another station has added them meanwhile. A batch that is still being
+# made is added with no batch and its own line replaces that once it is written, so every batch number is only looked up once
+def get_product_index(data_directory):
+    product_index = get_index_file(data_directory, ProductIndex)
+    product_index.update()
+    batch_numbers = get_batch_index() or []
+    with product_index.lock:
+        missing_batches = [batch_number for batch_number in batch_numbers[product_index.checked:]
+                           if batch_number not in product_index.entries]
+    if len(missing_batches) > 0:
+        product_index.add_lines(restore_product_index(data_directory, missing_batches), True)
+    with product_index.lock:
+        product_index.checked = len(batch_numbers)
+    return product_index
+
+
+# This function brings the product index entry of a batch up to date after the batch has been saved
+def update_product_index(data_directory, batch):
+    get_index_file(data_directory, ProductIndex).add_lines([product_index_line(batch.batch_number, product_index_record(batch))])
+
+
+# This function marks a batch whose records have been deleted as having no batch in the product index
+def remove_product_index_entry(data_directory, batch):
+    get_index_file(data_directory, ProductIndex).add_lines([product_index_line(batch.batch_number, None)])
+
+
+# This function returns the serial number, manufacture date, location and finish of every component of a type and size
+# The rows come from the product index in batch order, so no component or batch files are opened
+def search_product_index(data_directory, component_type, size):
+    product_index = get_product_index(data_directory)
+    rows = []
+    with product_index.lock:
+        batches = product_index.products.get(product_index_key(component_type, size), {})
+        for batch_number in sorted(batches):
+            entry = batches[batch_number]
+            for x in range(1, entry["amount"] + 1):
+                suffix = str(x).zfill(4)
+                rows.append([batch_number + "-" + suffix, entry["date"], entry["location"],
+                             entry["finishes"].get(suffix, "Unfinished")])
+    return rows
+
+
+# The stock levels count the components of each component type, size, location and finish, so a stock check is one lookup
+# The counts are keyed like the product index, for example "Winglet Attachment Strut|A380 Series|Dubai|Unfinished"
+# A paint finish is counted as "Painted" whatever its paint code, so the finish is "Unfinished", "Polished" or "Painted"
+def finish_state(finish):
+    if finish[0:6] == "Paint:":
+        return "Painted"
+    return finish
+
+
+def stock_level_key(component_type, size, location, state):
+    return product_index_key(component_type, size) + "|" + location + "|" + state
+
+
+# This function adds the components of one product index entry to the stock levels, or takes them away when "sign" is -1
+# A count that reaches 0 is removed so the stock levels only hold stock that exists
+def add_stock_levels(stock_levels, key, entry, sign):
+    amounts = {"Unfinished": entry["amount"] - len(entry["finishes"])}
+    for finish in entry["finishes"].values():
+        amounts[finish_state(finish)] = amounts.get(finish_state(finish), 0) + 1
+    for state in amounts:
+        stock_key = key + "|" + entry["location"] + "|" + state
+        stock_levels[stock_key] = stock_levels.get(stock_key, 0) + sign * amounts[state]
+        if stock_levels[stock_key] == 0:
+            del stock_levels[stock_key]
+
+
+# This function counts the stock levels of every batch in the product index
+def count_stock_levels(product_index):
+    stock_levels = {}
+    for key in product_index:
+        for batch_number in product_index[key]:
+            add_stock_levels(stock_levels, key, product_index[key][batch_number], 1)
+    return stock_levels
+
+
+# create class StockLevels - the stock levels of a "Data" directory, kept in StockLevels.json and brought up to date from ProductIndex.log
+# Each line of the product index log holds the change it makes to the stock levels, so they change in the same write as the product
+# index, and reading them only needs StockLevels.json and the log, not the whole product index
+class StockLevels(IndexFile):
+    def __init__(self, data_directory):
+        IndexFile.__init__(self, data_directory, "StockLevels", "ProductIndex")
+
+    def read_index(self, json_data):
+        if not isinstance(json_data, dict):
+            raise ValueError("Not stock levels")
+        for stock_key in json_data:
+            if not isinstance(json_data[stock_key], int):
+                raise ValueError("Not stock levels")
+        self.entries = json_data
+
+    def apply(self, line):
+        for stock_key in line.get("stock", {}):
+            self.entries[stock_key] = self.entries.get(stock_key, 0) + line["stock"][stock_key]
+            if self.entries[stock_key] == 0:
+                del self.entries[stock_key]
+
+    def index_json(self):
+        return self.entries
+
+    # StockLevels.json is only written with the product index, so the stock levels are made again by writing the product index again
+    def rebuild(self):
+        product_index = get_index_file(self.data_directory, ProductIndex)
+        with product_index.lock:
+            product_index.catch_up()
+            product_index.compact()
+        self.clear()
+        self.refresh()
+
+
+# This function returns the stock levels of a "Data" directory, no batch files or product index are read
+def get_stock_levels(data_directory):
+    stock_levels = get_index_file(data_directory, StockLevels)
+    stock_levels.update()
+    with stock_levels.lock:
+        return dict(stock_levels.entries)
+
+
+# This function counts the stock levels again from every batch record, which is how they are checked for the "stock-levels" tool
+# The stock levels the stations read and the recounted ones are returned. With "repair", when they differ, the product index entries
+# that differ from the batch records are replaced and the stock levels are counted again from the product index
+# The product index is locked throughout so no batch changes it meanwhile
+def verify_stock_levels(data_directory, repair=False):
+    with get_file_lock(data_directory, "ProductIndex"):
+        product_index = get_product_index(data_directory)
+        stock_levels = get_stock_levels(data_directory)
+        recounted = {}
+        differing = []
+        for line in restore_product_index(data_directory, get_batch_index() or []):
+            if line["key"] is not None:
+                add_stock_levels(recounted, line["key"], line["entry"], 1)
+            with product_index.lock:
+                key = product_index.entries.get(line["batch"])
+                if key != line["key"] or (key is not None and product_index.products[key][line["batch"]] != line["entry"]):
+                    differing.append(line)
+        if repair and stock_levels != recounted:
+            product_index.add_lines(differing)
+            with product_index.lock:
+                product_index.compact()
+    return stock_levels, recounted
+
+
+# The component types made in the factory and the sizes or fitment types that each one comes in
+# "Door Seal Clamp Handle" only comes in one size so its size is left empty
+COMPONENT_SIZES = {"Winglet Attachment Strut": ["A320 Series", "A380 Series"],
+                   "Door Seal Clamp Handle": [""],
+                   "Rudder Pivot Pin": ["10mm diameter x 75mm length", "12mm diameter x 100mm length",
+                                        "16mm diameter x 150mm length"]}
+
+
+# This function makes a new batch and its components using the Batch and Component classes
+def build_batch(batch_number, manufacture_date, amount, component_type, size, location):
+    # Necessary variables are declared here for later use
+    component_status = "Manufactured"
+    component_finish = "Unfinished"
+
+    # Generate is used instead of amount so that the serial numbers begin at 1 and not 0
+    generate = amount + 1
+    serial_numbers = []
+    components = []
+
+    # A new batch is created by making an instance of the batch class and passing necessary parameters
+    new_batch = Batch(batch_number, amount, serial_numbers, location)
+
+    # This range is used to generate component serial numbers and apply attributes to each class object
+    for x in range(1, generate):
+        # The current serial is the batch number concatenated with a newly generated unique serial number
+        current_serial_number = (str(batch_number) + "-" + str(x).zfill(4))
+        # A list of all serial numbers are generated here to be applied to the batch class
+        serial_numbers.append(current_serial_number)
+        new_component = Component(manufacture_date, component_type, current_serial_number, size,
+                                  component_status, component_finish)
+        new_component.pick_component(new_batch)
+        components.append(new_component)
+
+    return new_batch, components
+
+
+# This function checks a batch spec used by "create_batches" and returns a description of the problem, or None if it is correct
+def check_batch_spec(spec):
+    if not isinstance(spec, dict):
+        return "a batch spec must have an amount, component_type and size"
+    amount = spec.get("amount")
+    if not isinstance(amount, int) or isinstance(amount, bool) or amount < 1 or amount > 9999:
+        return "amount must be a whole number from 1 to 9999"
+    if spec.get("component_type") not in COMPONENT_SIZES:
+        return "component_type must be one of " + ", ".join(COMPONENT_SIZES)
+    if spec.get("size", "") not in COMPONENT_SIZES[spec["component_type"]]:
+        if spec["component_type"] == "Door Seal Clamp Handle":
+            return "a Door Seal Clamp Handle has no size"
+        return "size of a " + spec["component_type"] + " must be one of " + ", ".join(COMPONENT_SIZES[spec["component_type"]])
+    return None
+
+
+# This function creates many batches at once without any dialogs, for example for the manufacturing execution system
+# Each batch spec is a dictionary with an "amount", "component_type" and "size", and every spec is checked before anything is written
+# The batch numbers are reserved in the batch index first, while it is locked, so another station cannot use the same ones
+# The batches are created as one transaction: if any of them cannot be written, the ones already written are removed again
+# A summary is returned with the batch numbers created, the amount of components and how long it took
+def create_batches(batch_specs, manufacture_date=None):
+    start_time = time.perf_counter()
+
+    for x in range(0, len(batch_specs)):
+        problem = check_batch_spec(batch_specs[x])
+        if problem is not None:
+            raise ValueError("Batch spec " + str(x + 1) + ": " + problem)
+
+    if manufacture_date is None:
+        manufacture_date = datetime.datetime.today().strftime('%Y%m%d')
+
+    # A station using an inventory server has the server create the batches, as only the server locks the "Data" directory
+    store = get_store()
+    if isinstance(store, RemoteStore):
+        return store.create_batches(batch_specs, manufacture_date)
+
+    # The batch numbers follow on from the last batch number used, and a day can only have 9999 batches
+    batch_numbers = []
+    with store.batch_index_lock():
+        first_batch_number = store.new_batch_number(manufacture_date)
+        first_serial = int(first_batch_number[8:12])
+        if first_serial + len(batch_specs) - 1 > 9999:
+            raise ValueError("Only " + str(10000 - first_serial) + " more batches can be created on " + manufacture_date)
+        for x in range(0, len(batch_specs)):
+            batch_numbers.append(store.reserve_batch_number(manufacture_date))
+
+    location = "Factory Floor - Warehouse Not Allocated"
+    created_batches = []
+    total_components = 0
+
+    try:
+        for x in range(0, len(batch_specs)):
+            new_batch, components = store.build_batch(batch_numbers[x], manufacture_date, batch_specs[x]["amount"],
+                                                      batch_specs[x]["component_type"], batch_specs[x].get("size", ""), location)
+            # The batch is remembered before it is written so that a batch which is only partly written is removed as well
+            created_batches.append(new_batch)
+            store.create_batch_records(new_batch, components)
+            total_components = total_components + new_batch.amount_components
+    except Exception:
+        # The reserved batch numbers stay in the batch index, the list of all batches leaves out any that have no batch
+        for new_batch in created_batches:
+            store.delete_batch_records(new_batch)
+        raise
+
+    seconds = time.perf_counter() - start_time
+    return {"batch_numbers": [new_batch.batch_number for new_batch in created_batches],
+            "components": total_components, "seconds": seconds,
+            "batches_per_second": len(created_batches) / seconds if seconds > 0 else 0.0,
+            "components_per_second": total_components / seconds if seconds > 0 else 0.0}
+
+
+# This function reads batch specs from a CSV file with the columns amount, component_type and size, or from a JSON list
+def load_batch_specs(path):
+    if path.lower().endswith(".json"):
+        with open(path) as json_file:
+            batch_specs = json.load(json_file)
+        if not isinstance(batch_specs, list):
+            raise ValueError(path + " must hold a list of batch specs")
+        return batch_specs
+
+    batch_specs = []
+    with open(path, newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            amount = (row.get("amount") or "").strip()
+            batch_specs.append({"amount": int(amount) if amount.isdigit() else amount,
+                                "component_type": (row.get("component_type") or "").strip(),
+                                "size": (row.get("size") or "").strip()})
+    return batch_specs
+
+
+# This function checks a finish is "Polished" or "Paint:" followed by a paint code of two letters and two numbers
+# The finish is returned with the letters of the paint code in capitals, the same as the finish dialog does, a ValueError is raised otherwise
+def check_finish(finish):
+    # A station could send a number or a list as the finish, which has no paint code to read
+    if not isinstance(finish, str):
+        raise ValueError('the finish must be "Polished" or "Paint:" followed by a paint code in the form AAXX')
+    if finish == "Polished":
+        return finish
+    paint_code = finish[6:]
+    if finish[0:6] == "Paint:" and len(paint_code) == 4 and paint_code[0:2].isalpha() and paint_code[2:4].isdigit():
+        return "Paint:" + paint_code[0:2].upper() + paint_code[2:]
+    raise ValueError('the finish must be "Polished" or "Paint:" followed by a paint code in the form AAXX, not "' + finish + '"')
+
+
+# This function checks a serial number is in the form YYYYMMDDXXXX-XXXX
+def is_serial_number(serial_number):
+    return len(serial_number) == 17 and serial_number[12:13] == "-" and serial_number[0:12].isdigit() and serial_number[13:17].isdigit()
+
+
+# This function turns a list of serial numbers and serial number ranges into a list of serial numbers
+# A range is two serial numbers of the same batch joined by "..", the second one can be just its last 4 digits
+# For example "202610180003-0001..0500" is the first 500 components of batch 202610180003
+def expand_serial_numbers(items):
+    serial_numbers = []
+    for item in items:
+        for part in item.replace(",", " ").split():
+            if ".." not in part:
+                if not is_serial_number(part):
+                    raise ValueError(part + " is not a serial number in the form YYYYMMDDXXXX-XXXX")
+                serial_numbers.append(part)
+                continue
+
+            first, last = part.split("..", 1)
+            if len(last) == 4:
+                last = first[0:13] + last
+            if not is_serial_number(first) or not is_serial_number(last) or first[0:12] != last[0:12]:
+                raise ValueError(part + " is not a range of serial numbers from one batch, for example 202610180003-0001..0500")
+            if int(first[13:17]) > int(last[13:17]):
+                raise ValueError(part + " starts after it ends")
+            for x in range(int(first[13:17]), int(last[13:17]) + 1):
+                serial_numbers.append(first[0:13] + str(x).zfill(4))
+    return serial_numbers
+
+
+# This function gives many components the same finish at once without any dialogs, for example a whole range painted by the paint shop
+# Every serial number is checked before anything is written: it must be in a batch and not finished already
+# The components are grouped by batch so that each batch record is written once, a summary is returned like "create_batches" does
+def finish_components(serial_numbers, finish):
+    start_time = time.perf_counter()
+    finish = check_finish(finish)
+    store = get_store()
+    if isinstance(store, RemoteStore):
+        return store.finish_components(serial_numbers, finish)
+
+    # Every batch the serial numbers belong to is locked, in order, until the finish has been applied
+    # so another station cannot finish one of the components between it being checked and it being finished
+    lock_batch_numbers = sorted(set(serial_number[0:12] for serial_number in serial_numbers if is_serial_number(serial_number)))
+    with contextlib.ExitStack() as locks:
+        for batch_number in lock_batch_numbers:
+            locks.enter_context(store.batch_lock(batch_number))
+
+        # The position of each component is found in its batch, a serial number given more than once is only finished once
+        batches = collections.OrderedDict()
+        positions = collections.OrderedDict()
+        problems = []
+        for serial_number in serial_numbers:
+            if not is_serial_number(serial_number):
+                problems.append(serial_number + " is not a serial number in the form YYYYMMDDXXXX-XXXX")
+                continue
+            batch_number = serial_number[0:12]
+            if batch_number not in batches:
+                batches[batch_number] = store.load_batch(batch_number)
+                positions[batch_number] = set()
+            # The position of a component in its batch is worked out from the last 4 digits of its serial number
+            batch = batches[batch_number]
+            position = int(serial_number[13:17]) - 1
+            if batch is None or position < 0 or position >= len(batch.serial_numbers) or batch.serial_numbers[position] != serial_number:
+                problems.append("no component found with the serial number " + serial_number)
+                continue
+            current_finish = batch.batch_status[position].split("-", 1)[1]
+            if current_finish != "Unfinished":
+                problems.append("the component " + serial_number + " has already been finished with " + current_finish)
+            else:
+                positions[batch_number].add(position)
+
+        if len(problems) > 0:
+            more = ""
+            if len(problems) > 10:
+                more = "\n" + "and " + str(len(problems) - 10) + " more"
+            raise ValueError(str(len(problems)) + " serial number(s) cannot be finished:" + "\n" + "\n".join(problems[0:10]) + more)
+
+        total_components = 0
+        for batch_number in batches:
+            if len(positions[batch_number]) > 0:
+                store.finish_batch_components(batches[batch_number], sorted(positions[batch_number]), finish)
+                total_components = total_components + len(positions[batch_number])
+
+    seconds = time.perf_counter() - start_time
+    return {"finish": finish, "components": total_components,
+            "batches": len([batch_number for batch_number in positions if len(positions[batch_number]) > 0]),
+            "seconds": seconds}
+
+
+# The report screens are built from generators that yield one line at a time
+# "format_report" joins the heading and the lines once at the end, adding to a string in a loop copies it every time
+def format_report(heading, lines):
+    return "\n".join(itertools.chain(heading, lines))
+
+
+# The shortened component sizes and types used in the list of all batches, the stored values are not changed
+# For example the size "10mm diamter x 75mm length" is changed to "10mm//75mm" to display the important details
+# If the size is empty "", applies to Door Handle component type, it is changed to N/A to make that clear to the user
+DISPLAY_SIZES = {"10mm diameter x 75mm length": "10mm//75mm",
+                 "12mm diameter x 100mm length": "12mm//100mm",
+                 "16mm diameter x 150mm length": "16mm//150mm",
+                 "": "N/A"}
+DISPLAY_TYPES = {"Winglet Attachment Strut": "Winglet Strut",
+                 "Door Seal Clamp Handle": "Door Handle",
+                 "Rudder Pivot Pin": "Rudder Pin"}
+
+
+# This generator yields one line of the list of all batches for each batch it is given
+def batch_list_lines(batches):
+    for batch_data in batches:
+        size = DISPLAY_SIZES.get(batch_data.size, batch_data.size)
+        component_type = DISPLAY_TYPES.get(batch_data.component_type, batch_data.component_type)
+        # This code checks if the batch has not been allocated to either the Paisley or Dubai location yet
+        location = batch_data.location
+        if location == "Factory Floor - Warehouse Not Allocated":
+            location = "-"
+        yield batch_data.batch_number + "\t" + "\t" + component_type + "\t" + "\t" + " "*3 + size + "\t" + "\t" + " "*4 + location + "\t" + "\t" + str(batch_data.amount_components)
+
+
+# This function makes the list of all batches message, "batches" can be any iterable of batches so they are loaded one at a time
+def batch_list_report(batches):
+    # The format of the printed message is crafted specifically to provide a clean readable output
+    message = "Batch Number" + "\t" + "\t" + "Component Type" + "\t" + "\t" + " "*3 + "Size/Fitment" + "\t" + "\t" + " "*3 + "Location" + "\t" + "\t" + "Quantity"
+    table_format = "-"*12 + "\t" + "\t" + "-"*14 + "\t" + "\t" + " "*3 + "-"*12 + "\t" + "\t" + " "*3 + "-"*8 + "\t" + "\t" + "-"*8
+    return format_report([message, table_format], batch_list_lines(batches))
+
+
+# These generators yield the serial number, and the serial number and status, of each component in a batch
+def batch_serial_lines(batch_data):
+    for serial in batch_data.serial_numbers:
+        yield serial
+
+
+def batch_status_lines(batch_data):
+    for serial, status in zip(batch_data.serial_numbers, batch_data.batch_status):
+        yield serial + ": " + status
+
+
+# These functions make the two messages showing the components of a batch
+# Every status line ends with a new line, so one is added after the last one
+def batch_serials_report(batch_data):
+    return format_report(["Component Serial Numbers", "-"*24], batch_serial_lines(batch_data))
+
+
+def batch_status_report(batch_data):
+    return format_report(["Component(s) Status", "-"*19], batch_status_lines(batch_data)) + "\n"
+
+
+# This generator yields a line of the search results for each matching component that is finished, or unfinished
+def product_lines(matching_components, finished):
+    for serial, manufacture_date, location, finish in matching_components:
+        if (finish != "Unfinished") == finished:
+            # This code checks if the default location of the component is true and changes it to display better
+            if location == "Factory Floor - Warehouse Not Allocated":
+                location = "Unallocated"
+            formatted_date = manufacture_date[0:4] + "-" + manufacture_date[4:6] + "-" + manufacture_date[6:8]
+            yield serial + "\t" + "\t" + "\t" + location + "\t" + "\t" + finish + "\t" + "\t" + formatted_date
+
+
+# This function makes the search results message for either the finished or unfinished components
+# It returns None if no components match so that no message box is shown
+def product_report(matching_components, component_type, size, finished):
+    lines = product_lines(matching_components, finished)
+    first_line = next(lines, None)
+    if first_line is None:
+        return None
+
+    if finished:
+        title = "Finished Products" + "\n" + "-"*17
+    else:
+        title = "Unfinished Products" + "\n" + "-"*19
+    # The message output to the user is different depending on the component type
+    if component_type != "Door Seal Clamp Handle":
+        message = title + "\n" + "\n" + 'The following "' + size + '" ' + \
+                  component_type + "(s), are currently available in stock:" + "\n" + "\n" + "\n" + \
+                  "Component Serial#" + "\t" + "\t" + "\t" + "Location" + "\t" + "\t" + "Finish" + "\t" \
+                  + "\t" + "Date"
+    else:
+        message = title + "\n" + "\n" + "The following " + component_type + \
+                  "(s), are currently available in stock:" + "\n" + "\n" + "\n" + "Component Serial#" + "\t" \
+                  + "\t" + "\t" + "Location" + "\t" + "\t" + "Finish" + "\t" + "\t" + "Date"
+    table_format = "-" * 17 + "\t" + "\t" + "\t" + "-" * 8 + "\t" + "\t" + "-" * 6 + "\t" + "\t" + "-" * 4
+    return format_report([message, table_format, first_line], lines)
+
+
+# This generator yields a line of the stock levels for each component type, size, location and finish there is stock of
+# The stock levels are keyed "component type|size|location|finish", sorting the keys groups each product's lines together
+def stock_level_lines(stock_levels):
+    for key in sorted(stock_levels):
+        component_type, size, location, state = key.split("|")
+        if location == "Factory Floor - Warehouse Not Allocated":
+            location = "Unallocated"
+        yield DISPLAY_TYPES.get(component_type, component_type) + "\t" + "\t" + " "*3 + DISPLAY_SIZES.get(size, size) + \
+            "\t" + "\t" + " "*3 + location + "\t" + "\t" + state + "\t" + "\t" + str(stock_levels[key])
+
+
+# This function makes the stock levels message, None is returned if there is no stock so that no message box is shown
+def stock_levels_report(stock_levels):
+    if len(stock_levels) == 0:
+        return None
+    message = "Component Type" + "\t" + "\t" + " "*3 + "Size/Fitment" + "\t" + "\t" + " "*3 + "Location" + "\t" + "\t" + "Finish" + "\t" + "\t" + "Quantity"
+    table_format = "-"*14 + "\t" + "\t" + " "*3 + "-"*12 + "\t" + "\t" + " "*3 + "-"*8 + "\t" + "\t" + "-"*6 + "\t" + "\t" + "-"*8
+    return format_report(["Stock Levels" + "\n" + "-"*12 + "\n", message, table_format], stock_level_lines(stock_levels))
+
+
+# This function returns the stock levels that differ between two counts, as lines saying what each one counted
+def stock_level_differences(stock_levels, recounted):
+    differences = []
+    for key in sorted(set(stock_levels) | set(recounted)):
+        if stock_levels.get(key, 0) != recounted.get(key, 0):
+            differences.append(key + ": " + str(stock_levels.get(key, 0)) + " counted, " + str(recounted.get(key, 0)) +
+                               " in the batch records")
+    return differences
+
+
+# This function reads the dates typed in to filter the list of all batches, in the form YYYYMMDD-YYYYMMDD or a single date YYYYMMDD
+# The first and last date are returned, None is returned if the dates are not valid
+def parse_date_range(text):
+    dates = text.replace(" ", "").split("-")
+    if len(dates) == 1:
+        dates = dates * 2
+    if len(dates) != 2:
+        return None
+    for date in dates:
+        try:
+            datetime.datetime.strptime(date, '%Y%m%d')
+        except ValueError:
+            return None
+    if len(dates[0]) != 8 or len(dates[1]) != 8 or dates[0] > dates[1]:
+        return None
+    return dates[0], dates[1]
+
+
+# create class InventoryRequestHandler - answers the requests that the menus of the stations send to the inventory server
+# Each request is answered with json, problems are answered with {"error": ...} and a 400 or 404 status, or 500 if the "Data" directory cannot be used
+# Requests run at the same time on separate threads, the locks of the "Data" directory keep them apart where they need to be
+# http.server takes a while to import, so "serve" imports it and combines this class with http.server.BaseHTTPRequestHandler
+class InventoryRequestHandler:
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.answer_request("GET")
+
+    def do_POST(self):
+        self.answer_request("POST")
+
+    # Requests are only logged when the INVENTORY_SERVER_LOG environment variable is set, so a busy server is not slowed down
+    def log_message(self, format, *arguments):
+        if os.environ.get("INVENTORY_SERVER_LOG"):
+            super().log_message(format, *arguments)
+
+    def send_json(self, status, answer):
+        data = json.dumps(answer).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_text(self, status, text):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def answer_request(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        # The stats of the server are answered as text for monitoring tools, they are only kept when INVENTORY_STATS is set
+        if method == "GET" and url.path == "/metrics":
+            if not stats_enabled():
+                self.send_json(404, {"error": "the server was started without INVENTORY_STATS set"})
+            else:
+                self.send_text(200, metrics_text())
+            return
+        parts = [urllib.parse.unquote(part) for part in url.path.strip("/").split("/")]
+        query = dict(urllib.parse.parse_qsl(url.query))
+        body = {}
+        if method == "POST":
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+            except ValueError:
+                length = -1
+            # Reading a length below 0 would wait for the station to close the connection, so it is answered straight away
+            if length < 0:
+                self.send_json(400, {"error": "the Content-Length header must be a whole number of bytes"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            except ValueError:
+                self.send_json(400, {"error": "the request must be json"})
+                return
+
+        try:
+            status, answer = answer_inventory_request(get_store(self.server.data_directory), method, parts, query, body)
+        except (KeyError, TypeError, ValueError) as error:
+            status, answer = 400, {"error": str(error)}
+        # A file of the "Data" directory that cannot be read or written, for example on a share that has gone away, is the server's problem
+        except OSError as error:
+            status, answer = 500, {"error": "the Data directory could not be used: " + str(error)}
+        if status == 404 and answer is None:
+            answer = {"error": "not found"}
+        self.send_json(status, answer)
+
+
+# This function works out the answer to one request to the inventory server and returns its status and json
+# The parts are the pieces of the path, for example ["batches", "202610180001", "allocate"]
+def answer_inventory_request(store, method, parts, query, body):
+    if method == "GET" and parts == ["batch-numbers"]:
+        return 200, store.batch_numbers() or []
+    if method == "GET" and parts == ["batch-numbers", "next"]:
+        return 200, {"batch_number": store.new_batch_number(query["date"])}
+    if method == "GET" and parts == ["batches"]:
+        return 200, [batch_to_json(batch, False) for batch in store.list_batches(store.batch_numbers() or [])]
+    if method == "GET" and parts == ["batches", "page"]:
+        page = store.batch_page(max(1, int(query.get("limit", BATCH_PAGE_SIZE))), query.get("after"), query.get("before"),
+                                query.get("from"), query.get("to"), query.get("total") == "1")
+        page["batches"] = [batch_to_json(batch, False) for batch in page["batches"]]
+        return 200, page
+    if method == "POST" and parts == ["batches"] and "specs" in body:
+        if not isinstance(body["specs"], list):
+            raise ValueError("specs must be a list of batch specs")
+        return 200, create_batches(body["specs"], body.get("date"))
+    if method == "POST" and parts == ["batches"]:
+        problem = check_batch_spec(body)
+        if problem is not None:
+            raise ValueError(problem)
+        manufacture_date = body.get("date") or datetime.datetime.today().strftime('%Y%m%d')
+        new_batch = store.create_batch(manufacture_date, body["amount"], body["component_type"], body.get("size", ""),
+                                       body.get("location", "Factory Floor - Warehouse Not Allocated"))
+        return 200, batch_to_json(new_batch)
+    if method == "GET" and len(parts) == 2 and parts[0] == "batches":
+        batch = store.load_batch(parts[1])
+        if batch is None:
+            return 404, None
+        return 200, batch_to_json(batch)
+    if method == "POST" and len(parts) == 3 and parts[0] == "batches" and parts[2] == "allocate":
+        if body.get("location") not in ["Paisley", "Dubai"]:
+            raise ValueError('the location must be "Paisley" or "Dubai"')
+        previous_location = store.allocate_batch(parts[1], body["location"])
+        if previous_location is None:
+            return 404, None
+        return 200, {"previous_location": previous_location}
+    if method == "GET" and len(parts) == 2 and parts[0] == "components":
+        component = store.load_component(parts[1])
+        if component is None:
+            return 404, None
+        return 200, component_to_json(component)
+    if method == "POST" and len(parts) == 3 and parts[0] == "components" and parts[2] == "finish":
+        previous_finish = store.finish_component(parts[1], check_finish(body.get("finish", "")))
+        if previous_finish is None:
+            return 404, None
+        return 200, {"previous_finish": previous_finish}
+    if method == "POST" and parts == ["finish"]:
+        if not isinstance(body["serials"], list) or not all(isinstance(item, str) for item in body["serials"]):
+            raise ValueError("serials must be a list of serial numbers or ranges of serial numbers")
+        return 200, finish_components(expand_serial_numbers(body["serials"]), body["finish"])
+    if method == "GET" and parts == ["search"]:
+        return 200, search_groups_from_rows(store.search_product(query["component_type"], query.get("size", "")))
+    if method == "GET" and parts == ["stock-levels"]:
+        return 200, store.stock_levels()
+    return 404, None
+
+
+# This function runs the inventory server until it is stopped, it owns the "Data" directory for every station that uses it
+# Only this program reads and writes the "Data" directory, and the batches and indexes it has read are kept in memory between requests
+def serve(host, port):
+    # The server uses the "Data" directory itself, even if INVENTORY_SERVER is set where it is started
+    os.environ.pop("INVENTORY_SERVER", None)
+    import http.server
+    handler = type("InventoryRequestHandler", (InventoryRequestHandler, http.server.BaseHTTPRequestHandler), {})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.data_directory = get_data_directory()
+    print("Inventory server for " + server.data_directory + " (" + get_storage_backend() + " storage) on http://" +
+          host + ":" + str(server.server_address[1]))
+    print("Set INVENTORY_SERVER=http://" + host + ":" + str(server.server_address[1]) + " on each station to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# This function runs the command line tools that are used without the menu, for example "python inventory-system.py migrate"
+def run_command(arguments):
+    parser = argparse.ArgumentParser(prog="inventory-system.py", description="PPEC Inventory System tools")
+    commands = parser.add_subparsers(dest="command")
+    migrate_command = commands.add_parser("migrate", help="convert the Data directory to a single file per batch storage backend")
+    migrate_command.add_argument("--to", choices=["batchfile", "lazy", "sqlite"], default="batchfile", help="storage backend to convert to")
+    create_command = commands.add_parser("create-batches", help="create batches from a CSV or JSON file of batch specs")
+    create_command.add_argument("specs", help="CSV file with the columns amount, component_type and size, or a JSON list")
+    finish_command = commands.add_parser("finish", help="give many components the same finish")
+    finish_command.add_argument("finish", help='"Polished" or "Paint:" followed by a paint code, for example Paint:AA12')
+    finish_command.add_argument("serials", nargs="*", help="serial numbers or ranges, for example 202610180003-0001..0500")
+    finish_command.add_argument("--file", help="file of serial numbers or ranges separated by spaces, commas or new lines")
+    layout_command = commands.add_parser("migrate-layout", help="move the record files into the flat or dated layout")
+    layout_command.add_argument("--to", choices=DATA_LAYOUTS, default="dated", help="layout to move the record files to")
+    records_command = commands.add_parser("migrate-records", help="save every record file again in the pickle or json format")
+    records_command.add_argument("--to", choices=RECORD_FORMATS, default="json", help="record format to convert to")
+    index_command = commands.add_parser("rebuild-index", help="repair the batch index, or rebuild it from the batch files")
+    index_command.add_argument("--full", action="store_true", help="look at every file in the Data directory instead of recovering")
+    stock_command = commands.add_parser("stock-levels", help="show how many components there are of each type, size, location and finish")
+    stock_command.add_argument("--verify", action="store_true", help="count the stock again from every batch and report any difference")
+    stock_command.add_argument("--repair", action="store_true", help="count the stock again and save the new counts if they differ")
+    serve_command = commands.add_parser("serve", help="run the inventory server that the menus of the stations connect to")
+    serve_command.add_argument("--host", default="127.0.0.1", help="address to listen on, 127.0.0.1 only allows this computer")
+    serve_command.add_argument("--port", type=int, default=8765)
+    options = parser.parse_args(arguments)
+
+    if options.command == "migrate":
+        if options.to == "sqlite":
+            batches_migrated, batches_skipped = migrate_to_sqlite(get_data_directory())
+            print("Migrated " + str(batches_migrated) + " batch(es), " + str(batches_skipped) + " were already in Inventory.db")
+        else:
+            batches_migrated, files_removed = migrate_data_directory(get_data_directory(), options.to)
+            print("Migrated " + str(batches_migrated) + " batch(es), removed " + str(files_removed) + " component file(s)")
+        print("Set INVENTORY_STORAGE=" + options.to + " to store new batches in the same layout")
+    elif options.command == "migrate-layout":
+        files_moved = migrate_data_layout(get_data_directory(), options.to)
+        print("Moved " + str(files_moved) + " record file(s)")
+        print("Set INVENTORY_LAYOUT=" + options.to + " so the stations look for the records in the same layout")
+    elif options.command == "migrate-records":
+        records_converted, records_skipped = migrate_record_format(get_data_directory(), options.to)
+        print("Converted " + str(records_converted) + " record(s), " + str(records_skipped) + " were already " + options.to)
+        print("Set INVENTORY_RECORD_FORMAT=" + options.to + " so new records are saved in the same format")
+    elif options.command == "rebuild-index":
+        data_directory = get_data_directory()
+        with get_file_lock(data_directory, "BatchIndex"):
+            if options.full:
+                json_data = restore_batch_index(data_directory)
+            else:
+                json_data = read_batch_index(data_directory)
+        print("The batch index holds " + str(len(json_data or [])) + " batch number(s)")
+    elif options.command == "create-batches":
+        try:
+            summary = create_batches(load_batch_specs(options.specs))
+        except (OSError, ValueError) as error:
+            print("No batches were created: " + str(error))
+            sys.exit(1)
+        for batch_number in summary["batch_numbers"]:
+            print(batch_number)
+        print("Created %d batch(es) with %d component(s) in %.3f seconds (%.1f batches/s, %.1f components/s)" %
+              (len(summary["batch_numbers"]), summary["components"], summary["seconds"],
+               summary["batches_per_second"], summary["components_per_second"]))
+    elif options.command == "stock-levels":
+        store = get_store(get_data_directory())
+        if options.verify or options.repair:
+            stock_levels, recounted = store.verify_stock_levels(options.repair)
+            differences = stock_level_differences(stock_levels, recounted)
+            for line in differences:
+                print(line)
+            if len(differences) == 0:
+                print("The stock levels match the batch records")
+            elif options.repair:
+                print("Repaired " + str(len(differences)) + " stock level(s) from the batch records")
+            else:
+                print(str(len(differences)) + " stock level(s) differ from the batch records, use --repair to save the new counts")
+                sys.exit(1)
+        else:
+            print(stock_levels_report(store.stock_levels()) or "There is no stock in the system")
+    elif options.command == "serve":
+        serve(options.host, options.port)
+    elif options.command == "finish":
+        try:
+            items = list(options.serials)
+            if options.file is not None:
+                with open(options.file) as serials_file:
+                    items.append(serials_file.read())
+            serial_numbers = expand_serial_numbers(items)
+            if len(serial_numbers) == 0:
+                raise ValueError("no serial numbers were given")
+            summary = finish_components(serial_numbers, options.finish)
+        except (OSError, ValueError) as error:
+            print("No components were finished: " + str(error))
+            sys.exit(1)
+        print("Finished %d component(s) in %d batch(es) with %s in %.3f seconds" %
+              (summary["components"], summary["batches"], summary["finish"], summary["seconds"]))
+    else:
+        parser.print_help()
+
+
+# When the INVENTORY_STATS environment variable is set, each menu action and the functions that read and write the "Data" directory
+# are counted and timed, along with the files they open and the bytes they read and write
+# "1" prints the stats when the program ends, any other value is the path of a text file they are written to instead,
+# and the inventory server also answers them at /metrics. When it is not set the functions are left exactly as they are
+def get_stats_setting():
+    return os.environ.get("INVENTORY_STATS", "")
+
+
+def stats_enabled():
+    return get_stats_setting() not in ["", "0"]
+
+
+# The menu actions, and the inventory server's answer to a request, are the operations a user waits for
+MENU_ACTIONS = ["create_batch", "list_all_batches", "view_batch_details", "view_component_details",
+                "allocate_manufactured_stock", "search_product", "finish_component", "view_stock_levels"]
+STATS_ACTIONS = MENU_ACTIONS + ["answer_inventory_request"]
+# The functions that read and write the batch index, the record files and the directory listings
+STATS_PRIMITIVES = ["get_batch_index", "save_index", "load_record", "save_record", "list_directory"]
+
+# The upper bound in seconds of each bucket of the latency histograms, a call slower than the last bound goes in one more bucket
+STATS_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# The counts and histogram of each instrumented function, any thread can add to them while "stats_lock" is held
+operation_stats = {}
+stats_lock = threading.Lock()
+# Each thread keeps the names of the instrumented functions it is inside, so a file it opens is counted for all of them
+stats_local = threading.local()
+# The actions that are running, the scan threads load batches for them so what those threads read is counted for the actions too
+running_actions = collections.Counter()
+
+
+def new_operation_stats():
+    return {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * (len(STATS_BUCKETS) + 1),
+            "files_opened": 0, "bytes_read": 0, "bytes_written": 0}
+
+
+# This function returns how many bytes the current thread has read and written so far, including what SQLite reads
+# It comes from /proc/thread-self/io which only Linux has, None is returned anywhere else and the bytes are left out
+def thread_io():
+    try:
+        with open("/proc/thread-self/io", "rb") as io_file:
+            counters = io_file.read().split()
+        return int(counters[1]), int(counters[3])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Returns the names that something done on this thread is counted for, a scan thread that is not inside an action counts for the running actions
+def stats_names():
+    names = list(getattr(stats_local, "names", []))
+    if not any(name in STATS_ACTIONS for name in names):
+        names.extend(running_actions)
+    return names
+
+
+# The audit hook counts every file that is opened while an instrumented function runs, /proc is left out as the stats read it themselves
+def count_opened_file(event, arguments):
+    if event != "open" or not isinstance(arguments[0], (str, bytes)) or str(arguments[0]).startswith("/proc/"):
+        return
+    names = stats_names()
+    if len(names) > 0:
+        with stats_lock:
+            for name in names:
+                stats = operation_stats.setdefault(name, new_operation_stats())
+                stats["files_opened"] = stats["files_opened"] + 1
+
+
+# This function adds one call of an instrumented function to its stats
+# The bytes a scan thread reads outside of any action are also added to the actions running, so an action's bytes include its scan threads
+def record_call(name, seconds, error, io_before, io_after, outermost):
+    with stats_lock:
+        stats = operation_stats.setdefault(name, new_operation_stats())
+        stats["calls"] = stats["calls"] + 1
+        stats["seconds"] = stats["seconds"] + seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        bucket = bisect.bisect_left(STATS_BUCKETS, seconds)
+        stats["buckets"][bucket] = stats["buckets"][bucket] + 1
+        if error:
+            stats["errors"] = stats["errors"] + 1
+        if io_before is not None and io_after is not None:
+            names = [name]
+            if outermost and name not in STATS_ACTIONS:
+                names.extend(running_actions)
+            for counted in names:
+                counted_stats = operation_stats.setdefault(counted, new_operation_stats())
+                counted_stats["bytes_read"] = counted_stats["bytes_read"] + io_after[0] - io_before[0]
+                counted_stats["bytes_written"] = counted_stats["bytes_written"] + io_after[1] - io_before[1]
+
+
+# This function returns a copy of a function which records every call of it in "operation_stats"
+# The time does not include reading /proc/thread-self/io, which is done before the clock starts and after it stops
+def instrument(name, function):
+    def instrumented(*arguments, **keywords):
+        if not hasattr(stats_local, "names"):
+            stats_local.names = []
+        outermost = len(stats_local.names) == 0
+        stats_local.names.append(name)
+        if name in STATS_ACTIONS:
+            with stats_lock:
+                running_actions[name] = running_actions[name] + 1
+        io_before = thread_io()
+        error = False
+        start = time.perf_counter()
+        try:
+            return function(*arguments, **keywords)
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            io_after = thread_io()
+            stats_local.names.pop()
+            if name in STATS_ACTIONS:
+                with stats_lock:
+                    running_actions[name] = running_actions[name] - 1
+                    if running_actions[name] == 0:
+                        del running_actions[name]
+            record_call(name, seconds, error, io_before, io_after, outermost)
+    instrumented.__name__ = function.__name__
+    instrumented.__wrapped__ = function
+    return instrumented
+
+
+# This function replaces the named functions of a module with instrumented copies
+# Every call of one of these functions looks up its name in the module, so the stores, the server and the menu all use the copies
+def instrument_functions(module, names):
+    for name in names:
+        if not hasattr(getattr(module, name), "__wrapped__"):
+            setattr(module, name, instrument(name, getattr(module, name)))
+
+
+# The storage functions and the server's answer are instrumented when this module is imported with INVENTORY_STATS set,
+# so a program that imports it afterwards, like the menu, gets the instrumented copies, the menu then instruments its own actions
+def instrument_program():
+    module = sys.modules[__name__]
+    if hasattr(module.load_record, "__wrapped__"):
+        return
+    instrument_functions(module, STATS_PRIMITIVES + ["answer_inventory_request"])
+    sys.addaudithook(count_opened_file)
+    atexit.register(dump_stats)
+
+
+# Returns the time that a share of the calls in a histogram took at most, to the upper bound of the bucket it falls in
+def histogram_percentile(buckets, share):
+    wanted = share * sum(buckets)
+    total = 0
+    for x in range(0, len(buckets)):
+        total = total + buckets[x]
+        if total >= wanted and total > 0:
+            if x < len(STATS_BUCKETS):
+                return STATS_BUCKETS[x]
+            return float("inf")
+    return 0.0
+
+
+# This function makes a table of the stats of every instrumented function that has been called, the actions first
+def stats_report():
+    lines = ["%-28s %7s %6s %10s %9s %9s %9s %9s %7s %12s %12s" % ("Operation", "Calls", "Errors", "Total (s)", "Mean (ms)",
+                                                                "p50 (ms)", "p95 (ms)", "Max (ms)", "Files", "Bytes read",
+                                                                "Bytes written")]
+    with stats_lock:
+        for name in STATS_ACTIONS + STATS_PRIMITIVES:
+            stats = operation_stats.get(name)
+            if stats is None or stats["calls"] == 0:
+                continue
+            lines.append("%-28s %7d %6d %10.3f %9.2f %9.2f %9.2f %9.2f %7d %12d %12d" %
+                         (name, stats["calls"], stats["errors"], stats["seconds"], stats["seconds"] / stats["calls"] * 1000,
+                          histogram_percentile(stats["buckets"], 0.5) * 1000, histogram_percentile(stats["buckets"], 0.95) * 1000,
+                          stats["max_seconds"] * 1000, stats["files_opened"], stats["bytes_read"], stats["bytes_written"]))
+    if thread_io() is None:
+        lines.append("The bytes read and written are only counted on Linux")
+    return "\n".join(lines) + "\n"
+
+
+# This function makes the stats in the Prometheus text format, which the inventory server answers at /metrics
+# The histogram buckets count every call up to their bound, so the last one, "+Inf", is the same as the number of calls
+def metrics_text():
+    lines = ["# HELP inventory_operation_seconds Time taken by the menu actions and the storage functions",
+             "# TYPE inventory_operation_seconds histogram"]
+    counters = [["errors", "Calls that raised an error"], ["files_opened", "Files opened"], ["bytes_read", "Bytes read"],
+                ["bytes_written", "Bytes written"]]
+    with stats_lock:
+        names = [name for name in STATS_ACTIONS + STATS_PRIMITIVES if name in operation_stats]
+        for name in names:
+            stats = operation_stats[name]
+            total = 0
+            for x in range(0, len(stats["buckets"])):
+                total = total + stats["buckets"][x]
+                if x < len(STATS_BUCKETS):
+                    bound = repr(STATS_BUCKETS[x])
+                else:
+                    bound = "+Inf"
+                lines.append('inventory_operation_seconds_bucket{operation="' + name + '",le="' + bound + '"} ' + str(total))
+            lines.append('inventory_operation_seconds_sum{operation="' + name + '"} ' + repr(stats["seconds"]))
+            lines.append('inventory_operation_seconds_count{operation="' + name + '"} ' + str(stats["calls"]))
+        for counter in counters:
+            lines.append("# HELP inventory_operation_" + counter[0] + "_total " + counter[1])
+            lines.append("# TYPE inventory_operation_" + counter[0] + "_total counter")
+            for name in names:
+                lines.append("inventory_operation_" + counter[0] + '_total{operation="' + name + '"} ' +
+                             str(operation_stats[name][counter[0]]))
+    return "\n".join(lines) + "\n"
+
+
+# When the program ends the stats are printed, or written to the file INVENTORY_STATS names
+def dump_stats():
+    if not stats_enabled():
+        return
+    if get_stats_setting() == "1":
+        sys.stderr.write(stats_report())
+    else:
+        with open(get_stats_setting(), "w") as stats_file:
+            stats_file.write(stats_report())
+            stats_file.write("\n")
+            stats_file.write(metrics_text())
+
+
+if stats_enabled():
+    instrument_program()